@@ -1,19 +1,35 @@
-from flask import Flask
+from flask import Flask, jsonify, request, g, has_app_context
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
 import mysql.connector
 from mysql.connector import Error
 import os
+import logging
 from dotenv import load_dotenv
+from app.db_utils import ElasticPool, PoolExhausted
+from app.cache import LRUTTLCache
+from app.logging_setup import setup_logging
+from app.avatars import init_avatars
+from app.assets import init_assets
+from app.compression import init_compression
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Инициализация расширений
 bcrypt = Bcrypt()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager.login_message_category = 'info'
 
+# Кэш пользователей воркера: избавляет от SELECT * FROM users на каждый запрос.
+# Сбрасывается явно при изменении профиля, пароля и аватара.
+user_cache = LRUTTLCache(
+    maxsize=int(os.getenv('USER_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('USER_CACHE_TTL', 300))
+)
+
 # Глобальная переменная для пула
 mysql_pool = None
 
@@ -22,7 +38,7 @@ def init_db():
     global mysql_pool
     try:
         mysql_url = os.getenv('MYSQL_URL')
-        print(f"🔄 Инициализация пула соединений...")
+        logger.info("Инициализация пула соединений")
         
         if mysql_url and mysql_url.strip() and mysql_url != 'mysql://':
             from urllib.parse import urlparse
@@ -39,10 +55,14 @@ def init_db():
             port = parsed.port or 3306
             
             # СОЗДАЕМ ПУЛ, А НЕ ОДНО СОЕДИНЕНИЕ
-            mysql_pool = mysql.connector.pooling.MySQLConnectionPool(
+            mysql_pool = ElasticPool(
                 pool_name="lumi_pool",
-                pool_size=5,
-                pool_reset_session=True,
+                min_size=int(os.getenv('DB_POOL_MIN', 1)),
+                pool_size=int(os.getenv('DB_POOL_SIZE', 5)),
+                max_overflow=int(os.getenv('DB_POOL_OVERFLOW', 5)),
+                max_waiters=int(os.getenv('DB_POOL_MAX_WAITERS', 20)),
+                acquire_timeout=float(os.getenv('DB_POOL_TIMEOUT', 3)),
+                reset_session=True,
                 host=hostname,
                 user=username,
                 password=password,
@@ -51,56 +71,89 @@ def init_db():
                 autocommit=True,
                 connection_timeout=10
             )
-            print(f"✅ Пул соединений создан для {hostname}")
+            logger.info("Пул соединений создан для %s", hostname)
             return True
     except Error as e:
-        print(f"❌ Ошибка создания пула: {e}")
+        logger.error("Ошибка создания пула: %s", e)
         return False
 
-def get_db():
-    """Получение соединения из пула"""
+def _acquire_db():
+    """Получение соединения из пула.
+
+    Если свободных соединений нет дольше дедлайна, бросает PoolExhausted,
+    который превращается в ответ 503 с Retry-After.
+    """
     global mysql_pool
     try:
         if mysql_pool is None:
-            print("🔄 Пул не инициализирован, создаем...")
+            logger.warning("Пул не инициализирован, создаем")
             init_db()
             
         if mysql_pool:
-            conn = mysql_pool.get_connection()
-            print(f"✅ Соединение получено из пула")
+            conn = mysql_pool.acquire()
+            logger.debug("Соединение получено из пула")
             return conn
         else:
-            print("❌ Не удалось создать пул соединений")
+            logger.error("Не удалось создать пул соединений")
             return None
     except Error as e:
-        print(f"❌ Ошибка получения соединения из пула: {e}")
+        logger.error("Ошибка получения соединения из пула: %s", e)
         return None
 
+def get_db():
+    """Соединение текущего запроса.
+
+    Внутри контекста приложения соединение берётся из пула при первом
+    обращении и переиспользуется всеми вызовами до teardown_appcontext.
+    Вне контекста (фоновые задачи, CLI) выдаётся отдельное соединение.
+    """
+    if not has_app_context():
+        return _acquire_db()
+    if 'db_conn' not in g:
+        conn = _acquire_db()
+        if conn is None:
+            return None
+        g.db_conn = conn
+    return g.db_conn
+
 def close_db(conn):
-    """Возврат соединения в пул"""
-    if conn and conn.is_connected():
+    """Возврат соединения в пул.
+
+    Соединение текущего запроса возвращается только в teardown_appcontext.
+    """
+    if conn and has_app_context() and g.get('db_conn') is conn:
+        return
+    if conn:
+        try:
+            conn.close()
+            logger.debug("Соединение возвращено в пул")
+        except Error as e:
+            logger.warning("Ошибка при возврате соединения: %s", e)
+
+def release_db(exception=None):
+    """Возврат соединения запроса в пул при завершении контекста"""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
         try:
             conn.close()
-            print("✅ Соединение возвращено в пул")
+            logger.debug("Соединение запроса возвращено в пул")
         except Error as e:
-            print(f"⚠️ Ошибка при возврате соединения: {e}")
+            logger.warning("Ошибка при возврате соединения: %s", e)
 
 def create_app():
     """Фабрика приложения Flask"""
     app = Flask(__name__)
-    print("🚀 CREATE_APP началась")
+    setup_logging(app)
     
-    # Проверяем переменные окружения
-    print("🔄 Проверяем переменные окружения...")
+    # Проверяем переменные окружения (только наличие, без значений)
     env_vars = ['MYSQL_URL', 'DB_HOST', 'DB_USER', 'DB_NAME', 'DB_PORT', 'SECRET_KEY']
-    for var in env_vars:
-        value = os.getenv(var)
-        if value:
-            print(f"   {var}: {value[:20]}..." if len(str(value)) > 20 else f"   {var}: {value}")
-        else:
-            print(f"   {var}: НЕ НАЙДЕНА")
+    missing = [var for var in env_vars if not os.getenv(var)]
+    if missing:
+        logger.info("Не заданы переменные окружения: %s", ', '.join(missing))
     
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+    # Ограничение размера тела запроса (загрузки, импорт); больше — 413
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
     
     # Конфигурация базы данных
     app.config['MYSQL_HOST'] = os.getenv('DB_HOST', 'localhost')
@@ -112,16 +165,50 @@ def create_app():
     bcrypt.init_app(app)
     login_manager.init_app(app)
     
+    # Возврат g.db_conn в пул; регистрируется до миграций при старте, иначе
+    # взятое ими соединение не вернётся в пул
+    app.teardown_appcontext(release_db)
+
     # Инициализация пула соединений
     with app.app_context():
         init_db()
-        print("✅ Пул соединений инициализирован")
+        # Миграции при старте (по умолчанию применяются командой flask migrate)
+        if os.getenv('AUTO_MIGRATE') == '1':
+            from app.migrations import apply_migrations
+            conn = get_db()
+            if conn is not None:
+                apply_migrations(conn)
+    
+    @app.errorhandler(PoolExhausted)
+    def handle_pool_exhausted(e):
+        """Быстрый отказ вместо зависшего запроса, когда пул исчерпан"""
+        if request.path.startswith('/api/'):
+            response = jsonify({'error': 'Сервер перегружен, попробуйте позже'})
+        else:
+            response = app.response_class('Сервер перегружен, попробуйте позже', mimetype='text/plain')
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+    init_avatars(app)
+    init_assets(app)
+    init_compression(app)
+
+    @app.errorhandler(413)
+    def handle_too_large(e):
+        message = 'Файл слишком большой'
+        if request.path.startswith('/api/'):
+            return jsonify({'error': message}), 413
+        return app.response_class(message, status=413, mimetype='text/plain')
     
     from app.models import User
     
     @login_manager.user_loader
     def load_user(user_id):
-        print(f"👤 LOAD_USER вызвана для user_id: {user_id}")
+        user = user_cache.get(int(user_id))
+        if user is not None:
+            return user
+        
         conn = get_db()
         if conn is None:
             return None
@@ -133,7 +220,7 @@ def create_app():
             cursor.close()
             
             if user_data:
-                return User(
+                user = User(
                     id=user_data['id'],
                     username=user_data['username'],
                     email=user_data.get('email'),
@@ -141,11 +228,15 @@ def create_app():
                     first_name=user_data.get('first_name'),
                     last_name=user_data.get('last_name'),
                     avatar_path=user_data.get('avatar_path'),
-                    gender=user_data.get('gender')
+                    gender=user_data.get('gender'),
+                    avatar_renditions=user_data.get('avatar_renditions'),
+                    data_version=user_data.get('data_version') or 0
                 )
+                user_cache.set(user.id, user)
+                return user
             return None
         except Error as e:
-            print(f"Ошибка загрузки пользователя: {e}")
+            logger.error("Ошибка загрузки пользователя: %s", e)
             return None
         finally:
             close_db(conn)
@@ -157,5 +248,8 @@ def create_app():
     app.register_blueprint(auth_blueprint, url_prefix='/auth')
     app.register_blueprint(main_blueprint)
     
-    print("✅ Приложение Lumi инициализировано")
+    from app.cli import register_cli
+    register_cli(app)
+    
+    logger.info("Приложение Lumi инициализировано")
     return app
\ No newline at end of file
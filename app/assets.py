@@ -0,0 +1,156 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+from flask import abort, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него раздаётся только gzip
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # без минификатора в сборку попадает исходный JS
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+logger = logging.getLogger(__name__)
+
+ASSET_CACHE_SECONDS = 365 * 24 * 3600
+# Аватары уже называются по содержимому и меняются во время работы
+EXCLUDED_DIRS = ('avatars',)
+# Сжатый вариант сохраняется, только если он заметно меньше исходника
+MIN_COMPRESSION_GAIN = 0.9
+
+_manifest = {}
+_build_dir = None
+
+
+def _fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def scan_static(static_dir):
+    """{'images/1.png': '<хеш>'} для всех файлов static, кроме EXCLUDED_DIRS"""
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        if root == static_dir:
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+        for name in files:
+            if name.startswith('.'):
+                continue
+            path = os.path.join(root, name)
+            manifest[os.path.relpath(path, static_dir).replace(os.sep, '/')] = _fingerprint(path)
+    return manifest
+
+
+def minify(filename, data):
+    """Минифицированный JS/CSS, если установлены rjsmin/rcssmin; иначе data как есть"""
+    if filename.endswith('.js') and rjsmin is not None:
+        return rjsmin.jsmin(data.decode('utf-8')).encode('utf-8')
+    if filename.endswith('.css') and rcssmin is not None:
+        return rcssmin.cssmin(data.decode('utf-8')).encode('utf-8')
+    return data
+
+
+def build_assets(static_dir, build_dir, minify_sources=True):
+    """Манифест, минифицированные JS/CSS и предсжатые .gz/.br варианты в build_dir.
+
+    minify_sources=False — сборка без минификации (flask build-assets --no-minify).
+
+    Хеш считается по исходнику, поэтому совпадает с манифестом, вычисленным
+    при старте без сборки.
+    """
+    manifest = scan_static(static_dir)
+    compressed = 0
+    for filename, fingerprint in manifest.items():
+        with open(os.path.join(static_dir, filename), 'rb') as f:
+            source = f.read()
+        data = minify(filename, source) if minify_sources else source
+        if data is not source:
+            target = os.path.join(build_dir, fingerprint, filename)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+        variants = [('gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('br', brotli.compress(data, quality=11)))
+        for ext, payload in variants:
+            if len(payload) > len(data) * MIN_COMPRESSION_GAIN:
+                continue
+            target = os.path.join(build_dir, fingerprint, f"{filename}.{ext}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(payload)
+            compressed += 1
+    with open(os.path.join(build_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    return manifest, compressed
+
+
+def asset_build_dir(app):
+    return os.getenv('ASSET_BUILD_DIR', os.path.join(app.root_path, 'static_build'))
+
+
+def asset_url_for(endpoint, **values):
+    """url_for для шаблонов: файлы из манифеста получают адрес с хешем содержимого"""
+    if endpoint == 'static':
+        fingerprint = _manifest.get(values.get('filename'))
+        if fingerprint:
+            values['fingerprint'] = fingerprint
+            return url_for('assets', **values)
+    return url_for(endpoint, **values)
+
+
+def init_assets(app):
+    """Манифест статики и маршрут /assets/<хеш>/<файл> с immutable-кэшированием.
+
+    Манифест берётся из ASSET_BUILD_DIR (результат flask build-assets), а если
+    его нет — считается при старте.
+    """
+    global _manifest, _build_dir
+
+    _build_dir = asset_build_dir(app)
+    manifest_path = os.path.join(_build_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            _manifest = json.load(f)
+    else:
+        _manifest = scan_static(app.static_folder)
+    logger.info("Манифест статики: %d файлов", len(_manifest))
+
+    def serve_asset(fingerprint, filename):
+        if _manifest.get(filename) != fingerprint:
+            abort(404)
+        path = os.path.join(_build_dir, fingerprint, filename)
+        if not os.path.exists(path):
+            path = os.path.join(app.static_folder, filename)
+        accepted = request.accept_encodings
+        for ext, encoding in (('br', 'br'), ('gz', 'gzip')):
+            variant = os.path.join(_build_dir, fingerprint, f"{filename}.{ext}")
+            if accepted[encoding] and os.path.exists(variant):
+                response = send_file(variant, download_name=os.path.basename(filename),
+                                     max_age=ASSET_CACHE_SECONDS, etag=False)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_file(path, max_age=ASSET_CACHE_SECONDS, etag=False)
+        response.headers['ETag'] = f'"{fingerprint}"'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.add_url_rule('/assets/<fingerprint>/<path:filename>', 'assets', serve_asset)
+    app.jinja_env.globals['url_for'] = asset_url_for
@@ -3,6 +3,9 @@ from flask_login import login_user, logout_user, login_required, current_user
 from app.models import User
 from app import get_db, close_db, bcrypt
 from mysql.connector import Error
+import logging
+
+logger = logging.getLogger(__name__)
 
 auth = Blueprint('auth', __name__)
 
@@ -111,7 +114,7 @@ def register():
                     """, (user.id, 28, 5, True, True))
                     conn.commit()
                 except Error as e:
-                    print(f"Database error while creating cycle_settings: {e}")
+                    logger.error("Database error while creating cycle_settings: %s", e)
                     flash('Ошибка при создании настроек цикла', 'error')
                     return render_template('register.html')
                 finally:
@@ -0,0 +1,237 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request
+from PIL import Image, ImageOps, UnidentifiedImageError
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+AVATAR_SIZES = (64, 128, 256)
+AVATAR_MAX_BYTES = int(os.getenv('AVATAR_MAX_BYTES', 5 * 1024 * 1024))
+# Ограничение на размер исходника в пикселях: проверяется по заголовку до декодирования.
+# По умолчанию 8 пикселей на байт лимита файла (~40 Мп при 5 МБ); то же значение
+# получает Image.MAX_IMAGE_PIXELS, чтобы Pillow не декодировал «бомбы» больше него
+AVATAR_MAX_PIXELS = int(os.getenv('AVATAR_MAX_PIXELS', AVATAR_MAX_BYTES * 8))
+Image.MAX_IMAGE_PIXELS = AVATAR_MAX_PIXELS
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+# Входит в хеш имени: при смене параметров кодирования имена файлов меняются
+RENDITION_VERSION = 'v1'
+# Файлы моложе этого возраста сборщик не трогает: их может дописывать фоновая задача
+GC_GRACE_SECONDS = int(os.getenv('AVATAR_GC_GRACE_SECONDS', 3600))
+AVATAR_CACHE_SECONDS = 365 * 24 * 3600
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('AVATAR_WORKERS', 2)),
+                               thread_name_prefix='avatar')
+
+
+class AvatarError(ValueError):
+    """Загруженный файл нельзя использовать как аватар"""
+
+
+def open_bounded(data):
+    """Открывает изображение, проверяя размеры по заголовку до полного декодирования.
+
+    Любая ошибка разбора (не изображение, «бомба», обрезанный или битый файл)
+    превращается в AvatarError.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        if width * height > AVATAR_MAX_PIXELS:
+            raise AvatarError(f'Изображение слишком большое ({width}x{height})')
+        if image.format not in ('JPEG', 'PNG', 'WEBP', 'GIF', 'BMP'):
+            raise AvatarError('Поддерживаются JPEG, PNG, WebP, GIF и BMP')
+        # verify() проверяет структуру файла без декодирования пикселей,
+        # после него изображение нужно открыть заново
+        image.verify()
+        return Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError:
+        raise AvatarError('Изображение слишком большое')
+    except UnidentifiedImageError:
+        raise AvatarError('Файл должен быть изображением')
+    except (OSError, SyntaxError):
+        raise AvatarError('Файл повреждён или обрезан')
+
+
+def check_avatar(data):
+    """Проверка загрузки в запросе: заголовок, структура и пробное декодирование
+    в уменьшенном масштабе (обрезанный JPEG виден только при декодировании)"""
+    image = open_bounded(data)
+    try:
+        image.draft('RGB', (max(AVATAR_SIZES), max(AVATAR_SIZES)))
+        image.load()
+    except Image.DecompressionBombError:
+        raise AvatarError('Изображение слишком большое')
+    except (OSError, SyntaxError, ValueError):
+        raise AvatarError('Файл повреждён или обрезан')
+
+
+def content_name(data):
+    """Имя по содержимому: одинаковые загрузки дают одни и те же файлы"""
+    digest = hashlib.sha256(data)
+    digest.update(RENDITION_VERSION.encode())
+    return digest.hexdigest()[:20]
+
+
+def _rendition_paths(basename):
+    return {str(size): {ext: f"avatars/{basename}_{size}.{ext}" for ext in ('jpg', 'webp')}
+            for size in AVATAR_SIZES}
+
+
+def render_avatar(data, avatars_dir, basename=None):
+    """Квадратные рендиции AVATAR_SIZES в progressive JPEG и WebP.
+
+    Файлы называются по хешу содержимого; если они уже есть (тот же файл
+    загружен раньше), повторно не кодируются.
+    Возвращает {'64': {'jpg': 'avatars/...', 'webp': 'avatars/...'}, ...}.
+    """
+    basename = basename or content_name(data)
+    renditions = _rendition_paths(basename)
+    existing = [os.path.join(avatars_dir, os.path.basename(path))
+                for paths in renditions.values() for path in paths.values()]
+    if all(os.path.exists(path) for path in existing):
+        # Обновляем mtime, чтобы сборщик мусора не удалил файлы до записи в БД
+        for path in existing:
+            os.utime(path)
+        return renditions
+
+    image = open_bounded(data)
+    # JPEG декодируется сразу в уменьшенном масштабе
+    image.draft('RGB', (max(AVATAR_SIZES) * 2, max(AVATAR_SIZES) * 2))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.split()[-1])
+        image = background
+
+    for size in AVATAR_SIZES:
+        square = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for ext, options in (('jpg', {'format': 'JPEG', 'quality': JPEG_QUALITY,
+                                      'optimize': True, 'progressive': True}),
+                             ('webp', {'format': 'WEBP', 'quality': WEBP_QUALITY, 'method': 6})):
+            filename = os.path.basename(renditions[str(size)][ext])
+            tmp_path = os.path.join(avatars_dir, f".{filename}.{os.getpid()}.tmp")
+            square.save(tmp_path, **options)
+            os.replace(tmp_path, os.path.join(avatars_dir, filename))
+    return renditions
+
+
+def _store_renditions(user_id, renditions):
+    """Запись путей рендиций в users (в фоновом потоке — своё соединение)"""
+    from app import get_db, close_db, user_cache
+
+    conn = get_db()
+    if conn is None:
+        raise Error('Нет соединения с БД')
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "UPDATE users SET avatar_path = %s, avatar_renditions = %s WHERE id = %s",
+                (renditions[str(max(AVATAR_SIZES))]['jpg'], json.dumps(renditions), user_id)
+            )
+        conn.commit()
+    finally:
+        close_db(conn)
+    user_cache.invalidate(user_id)
+
+
+def process_avatar(user_id, data, avatars_dir):
+    """Фоновая задача: рендиции и запись в БД"""
+    started = time.perf_counter()
+    try:
+        renditions = render_avatar(data, avatars_dir)
+        _store_renditions(user_id, renditions)
+        # Прежний аватар пользователя больше ни на что не ссылается
+        _collect_garbage_job(avatars_dir)
+        logger.info("Аватар пользователя %s обработан за %.0f ms",
+                    user_id, (time.perf_counter() - started) * 1000)
+        return renditions
+    except Exception as e:
+        logger.exception("Ошибка обработки аватара пользователя %s: %s", user_id, e)
+        raise
+
+
+def submit_avatar(user_id, data, avatars_dir):
+    """Ставит обработку аватара в пул потоков, не блокируя запрос"""
+    return _executor.submit(process_avatar, user_id, data, avatars_dir)
+
+
+def referenced_files(conn):
+    """Имена файлов в static/avatars, на которые ссылается хотя бы один пользователь"""
+    referenced = set()
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT avatar_path, avatar_renditions FROM users
+            WHERE avatar_path IS NOT NULL OR avatar_renditions IS NOT NULL
+        """)
+        for avatar_path, renditions in cursor.fetchall():
+            if avatar_path:
+                referenced.add(os.path.basename(avatar_path))
+            for paths in (json.loads(renditions) if renditions else {}).values():
+                referenced.update(os.path.basename(path) for path in paths.values())
+    return referenced
+
+
+def collect_garbage(conn, avatars_dir, grace_seconds=GC_GRACE_SECONDS, dry_run=False):
+    """Удаляет файлы аватаров, на которые не ссылается ни одна строка users.
+
+    Возвращает список удалённых (при dry_run — подлежащих удалению) файлов.
+    """
+    referenced = referenced_files(conn)
+    cutoff = time.time() - grace_seconds
+    removed = []
+    for entry in os.scandir(avatars_dir):
+        if not entry.is_file() or entry.name in referenced or entry.name.startswith('.git'):
+            continue
+        if entry.stat().st_mtime > cutoff:
+            continue
+        if not dry_run:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+        removed.append(entry.name)
+    return removed
+
+
+def _collect_garbage_job(avatars_dir):
+    from app import get_db, close_db
+
+    conn = get_db()
+    if conn is None:
+        return []
+    try:
+        removed = collect_garbage(conn, avatars_dir)
+    except Exception as e:
+        logger.exception("Ошибка сборки мусора аватаров: %s", e)
+        return []
+    finally:
+        close_db(conn)
+    if removed:
+        logger.info("Удалены неиспользуемые аватары: %d", len(removed))
+    return removed
+
+
+def submit_garbage_collection(avatars_dir):
+    """Фоновая сборка мусора (после удаления или замены аватара)"""
+    return _executor.submit(_collect_garbage_job, avatars_dir)
+
+
+def init_avatars(app):
+    """Долгое кэширование аватаров: имена файлов зависят от содержимого"""
+
+    @app.after_request
+    def cache_avatars(response):
+        if response.status_code == 200 and request.path.startswith('/static/avatars/'):
+            response.cache_control.public = True
+            response.cache_control.max_age = AVATAR_CACHE_SECONDS
+            response.cache_control.immutable = True
+        return response
@@ -0,0 +1,229 @@
+from app.importer import ImportRowError, parse_date, parse_number, parse_text, validate_row
+from app.rollups import apply_mood_change
+from app.statistics import note_sentiment
+
+MAX_OPERATIONS = 200
+GROUP_MAX_ROWS = 100
+TEXT_MAX_LENGTH = 500
+
+# Вставки, которые выполняются одной executemany для подряд идущих операций.
+# Только те, чьи результаты не содержат id: id строк многострочного INSERT
+# не обязаны идти подряд (auto_increment_increment, innodb_autoinc_lock_mode=2)
+GROUPED_SQL = {
+    ('hourly_moods', 'upsert'): """
+        INSERT INTO hourly_moods (user_id, date, hour, mood, note)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE mood = VALUES(mood), note = VALUES(note)
+    """,
+}
+
+# Создание записей: по одной, id каждой берётся из cursor.lastrowid
+CREATE_SQL = {
+    'goals': "INSERT INTO goals (user_id, text, date) VALUES (%s, %s, %s)",
+    'joys': "INSERT INTO joys (user_id, text, date) VALUES (%s, %s, %s)",
+}
+
+DELETE_SQL = {
+    'mood_entries': "DELETE FROM mood_entries WHERE id = %s AND user_id = %s",
+    'hourly_moods': "DELETE FROM hourly_moods WHERE id = %s AND user_id = %s",
+    'goals': "DELETE FROM goals WHERE id = %s AND user_id = %s",
+    'joys': "DELETE FROM joys WHERE id = %s AND user_id = %s",
+}
+
+OPERATIONS = {
+    'mood_entries': ('upsert', 'update', 'delete'),
+    'hourly_moods': ('upsert', 'delete'),
+    'goals': ('create', 'update', 'delete'),
+    'joys': ('create', 'update', 'delete'),
+}
+
+
+class BatchError(ValueError):
+    """Операция пакета не прошла проверку"""
+
+
+def _id(data):
+    value = data.get('id')
+    if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+        raise BatchError("нужен целый id записи")
+    return value
+
+
+def _text(data, required=True):
+    value = data.get('text')
+    if value is None and not required:
+        return None
+    value = str(value or '').strip()
+    if not value:
+        raise BatchError("текст не может быть пустым")
+    if len(value) > TEXT_MAX_LENGTH:
+        raise BatchError(f"текст длиннее {TEXT_MAX_LENGTH} символов")
+    return value
+
+
+def _date_or_none(data):
+    if not data.get('date'):
+        return None
+    try:
+        return parse_date(data['date'])
+    except ImportRowError as e:
+        raise BatchError(str(e))
+
+
+def validate_operation(op, user_id):
+    """{'resource', 'op', 'data'} -> (resource, action, параметры)"""
+    if not isinstance(op, dict):
+        raise BatchError("операция должна быть объектом")
+    resource, action, data = op.get('resource'), op.get('op'), op.get('data') or {}
+    if not isinstance(resource, str) or action not in OPERATIONS.get(resource, ()):
+        raise BatchError(f"неподдерживаемая операция {action!r} для {resource!r}")
+    if not isinstance(data, dict):
+        raise BatchError("data должен быть объектом")
+
+    try:
+        if action == 'delete':
+            return resource, action, (_id(data), user_id)
+        if action == 'upsert':
+            kind = 'mood' if resource == 'mood_entries' else 'hourly'
+            return resource, action, validate_row(kind, data, user_id)
+        if action == 'create':
+            return resource, action, (user_id, _text(data), _date_or_none(data))
+    except ImportRowError as e:
+        raise BatchError(str(e))
+
+    # update
+    if resource == 'mood_entries':
+        mood = None
+        if data.get('mood') is not None:
+            try:
+                mood = parse_number(data['mood'], 'mood', 1, 10)
+            except ImportRowError as e:
+                raise BatchError(str(e))
+        note = data.get('note')
+        if note is not None:
+            try:
+                note = parse_text(note, 'note')
+            except ImportRowError as e:
+                raise BatchError(str(e))
+        if mood is None and note is None:
+            raise BatchError("нужно указать mood или note")
+        return resource, action, (_id(data), mood, note)
+    if resource == 'goals':
+        completed = data.get('completed')
+        text = _text(data, required=False)
+        if text is None and completed is None:
+            raise BatchError("нужно указать text или completed")
+        return resource, action, (_id(data), text, None if completed is None else int(bool(completed)))
+    return resource, action, (_id(data), _text(data))
+
+
+def validate_batch(operations, user_id):
+    """Проверка всего пакета до обращения к БД.
+
+    Возвращает (операции, ошибки), ошибки — список {'index', 'error'}.
+    """
+    validated, errors = [], []
+    for index, op in enumerate(operations):
+        try:
+            validated.append(validate_operation(op, user_id))
+        except BatchError as e:
+            errors.append({'index': index, 'error': str(e)})
+    return validated, errors
+
+
+def _run_single(cursor, user_id, resource, action, params):
+    """Одна негруппируемая операция -> результат"""
+    if resource == 'mood_entries' and action == 'upsert':
+        _, entry_date, mood, _, _ = params
+        cursor.execute(
+            "SELECT id, mood FROM mood_entries WHERE user_id = %s AND date = %s FOR UPDATE",
+            (user_id, entry_date)
+        )
+        existing = cursor.fetchone()
+        cursor.execute("""
+            INSERT INTO mood_entries (user_id, date, mood, note, note_sentiment)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE mood = VALUES(mood), note = VALUES(note),
+                note_sentiment = VALUES(note_sentiment)
+        """, params)
+        entry_id = existing[0] if existing else cursor.lastrowid
+        apply_mood_change(cursor, user_id, entry_date, existing[1] if existing else None, mood)
+        return {'ok': True, 'id': entry_id}
+
+    if resource == 'mood_entries':
+        entry_id = params[0]
+        cursor.execute(
+            "SELECT date, mood FROM mood_entries WHERE id = %s AND user_id = %s FOR UPDATE",
+            (entry_id, user_id)
+        )
+        existing = cursor.fetchone()
+        if not existing:
+            return {'ok': True, 'affected': 0}
+        if action == 'delete':
+            cursor.execute(DELETE_SQL[resource], params)
+            apply_mood_change(cursor, user_id, existing[0], existing[1], None)
+            return {'ok': True, 'affected': 1}
+        _, mood, note = params
+        cursor.execute(
+            "UPDATE mood_entries SET mood = COALESCE(%s, mood), note = COALESCE(%s, note), "
+            "note_sentiment = CASE WHEN %s IS NULL THEN note_sentiment ELSE %s END "
+            "WHERE id = %s AND user_id = %s",
+            (mood, note, note, note_sentiment(note), entry_id, user_id)
+        )
+        if mood is not None:
+            apply_mood_change(cursor, user_id, existing[0], existing[1], mood)
+        return {'ok': True, 'affected': 1}
+
+    if action == 'create':
+        cursor.execute(CREATE_SQL[resource], params)
+        return {'ok': True, 'id': cursor.lastrowid}
+    if action == 'delete':
+        cursor.execute(DELETE_SQL[resource], params)
+    elif resource == 'goals':
+        goal_id, text, completed = params
+        cursor.execute(
+            "UPDATE goals SET text = COALESCE(%s, text), completed = COALESCE(%s, completed) "
+            "WHERE id = %s AND user_id = %s",
+            (text, completed, goal_id, user_id)
+        )
+    else:
+        joy_id, text = params
+        cursor.execute(
+            "UPDATE joys SET text = %s WHERE id = %s AND user_id = %s",
+            (text, joy_id, user_id)
+        )
+    return {'ok': True, 'affected': cursor.rowcount}
+
+
+def run_batch(conn, user_id, operations):
+    """Выполнение проверенного пакета в одной транзакции.
+
+    Порядок операций сохраняется; подряд идущие upsert почасового настроения
+    объединяются в executemany. При ошибке БД откатывается весь пакет.
+    """
+    results = [None] * len(operations)
+    conn.start_transaction()
+    try:
+        with conn.cursor(buffered=True) as cursor:
+            index = 0
+            while index < len(operations):
+                resource, action, params = operations[index]
+                key = (resource, action)
+                if key not in GROUPED_SQL:
+                    results[index] = _run_single(cursor, user_id, resource, action, params)
+                    index += 1
+                    continue
+
+                end = index
+                while (end < len(operations) and end - index < GROUP_MAX_ROWS
+                       and operations[end][:2] == key):
+                    end += 1
+                cursor.executemany(GROUPED_SQL[key], [operations[i][2] for i in range(index, end)])
+                for i in range(index, end):
+                    results[i] = {'ok': True}
+                index = end
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return results
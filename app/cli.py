@@ -0,0 +1,316 @@
+import statistics as pystats
+import sys
+import time
+
+import click
+
+from app import get_db, close_db
+from app.migrations import MIGRATIONS, applied_versions, apply_migrations, explain_hot_queries
+
+
+class _CountingCursor:
+    """Курсор, считающий обращения к БД"""
+
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, *args, **kwargs):
+        self._counter[0] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+
+class _CountingConnection:
+    """Соединение, выдающее считающие курсоры"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.queries = [0]
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return _CountingCursor(self._conn.cursor(*args, **kwargs), self.queries)
+
+
+def register_cli(app):
+    """Регистрация служебных команд: flask --app "app:create_app()" <команда>"""
+
+    @app.cli.command('migrate')
+    @click.option('--target', type=int, default=None, help='Применить миграции до этой версии включительно')
+    @click.option('--status', is_flag=True, help='Только показать состояние миграций')
+    def migrate(target, status):
+        """Применение миграций схемы БД"""
+        conn = get_db()
+        if conn is None:
+            click.echo('Нет соединения с БД', err=True)
+            sys.exit(1)
+        try:
+            if status:
+                done = applied_versions(conn)
+                for version, description, _ in MIGRATIONS:
+                    mark = 'x' if version in done else ' '
+                    click.echo(f"[{mark}] {version:03d} {description}")
+                return
+            applied = apply_migrations(conn, target)
+            if applied:
+                click.echo(f"Применены миграции: {', '.join(map(str, applied))}")
+            else:
+                click.echo('Схема актуальна')
+        finally:
+            close_db(conn)
+
+    @app.cli.command('check-indexes')
+    def check_indexes():
+        """EXPLAIN горячих запросов; код выхода 1 при полном сканировании таблиц"""
+        conn = get_db()
+        if conn is None:
+            click.echo('Нет соединения с БД', err=True)
+            sys.exit(1)
+        try:
+            problems = explain_hot_queries(conn)
+        finally:
+            close_db(conn)
+        for name, table in problems:
+            click.echo(f"FULL SCAN: {name} ({table})", err=True)
+        if problems:
+            sys.exit(1)
+        click.echo('Все горячие запросы используют индексы')
+
+    @app.cli.command('bench-stats')
+    @click.option('--user-id', type=int, required=True, help='Пользователь, для которого считается статистика')
+    @click.option('--runs', type=click.IntRange(min=1), default=50, show_default=True)
+    def bench_stats(user_id, runs):
+        """Замер generate_user_statistics: число запросов и задержка"""
+        from app.statistics import generate_user_statistics
+
+        conn = get_db()
+        if conn is None:
+            click.echo('Нет соединения с БД', err=True)
+            sys.exit(1)
+        try:
+            counting = _CountingConnection(conn)
+            generate_user_statistics(counting, user_id)  # прогрев
+            counting.queries[0] = 0
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                generate_user_statistics(counting, user_id)
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            close_db(conn)
+
+        timings.sort()
+        click.echo(f"запросов на вызов: {counting.queries[0] / runs:.1f}")
+        click.echo(f"p50: {pystats.median(timings):.2f} ms")
+        click.echo(f"p95: {timings[int(len(timings) * 0.95) - 1]:.2f} ms")
+        click.echo(f"max: {timings[-1]:.2f} ms")
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--user-id', type=int, default=None, help='Пересчитать только этого пользователя')
+    def rebuild_rollups(user_id):
+        """Пересчёт сводок настроения по mood_entries (исправление расхождений)"""
+        from app.rollups import rebuild_user_rollup, rebuild_all_rollups
+
+        conn = get_db()
+        if conn is None:
+            click.echo('Нет соединения с БД', err=True)
+            sys.exit(1)
+        try:
+            conn.start_transaction()
+            cursor = conn.cursor()
+            try:
+                if user_id is None:
+                    rebuild_all_rollups(cursor)
+                else:
+                    rebuild_user_rollup(cursor, user_id)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        finally:
+            close_db(conn)
+        click.echo('Сводки пересчитаны' if user_id is None else f"Сводка пользователя {user_id} пересчитана")
+
+    @app.cli.command('backfill-sentiment')
+    @click.option('--all', 'recompute', is_flag=True, help='Пересчитать и уже размеченные заметки')
+    def backfill_sentiment(recompute):
+        """Флаги тональности для заметок, сохранённых без них"""
+        from app.statistics import backfill_note_sentiment
+
+        conn = get_db()
+        if conn is None:
+            click.echo('Нет соединения с БД', err=True)
+            sys.exit(1)
+        try:
+            cursor = conn.cursor()
+            try:
+                processed = backfill_note_sentiment(cursor, recompute=recompute)
+            finally:
+                cursor.close()
+        finally:
+            close_db(conn)
+        click.echo(f"Обработано заметок: {processed}")
+
+    @app.cli.command('rebuild-avatars')
+    @click.option('--all', 'rebuild_all', is_flag=True, help='Пересоздать рендиции и для уже обработанных аватаров')
+    def rebuild_avatars(rebuild_all):
+        """Рендиции для аватаров, загруженных до появления обработки"""
+        import os
+        from app.avatars import AvatarError, process_avatar
+
+        conn = get_db()
+        if conn is None:
+            click.echo('Нет соединения с БД', err=True)
+            sys.exit(1)
+        try:
+            with conn.cursor() as cursor:
+                query = "SELECT id, avatar_path FROM users WHERE avatar_path IS NOT NULL"
+                if not rebuild_all:
+                    query += " AND avatar_renditions IS NULL"
+                cursor.execute(query)
+                users = cursor.fetchall()
+        finally:
+            close_db(conn)
+
+        static_dir = os.path.join(app.root_path, 'static')
+        avatars_dir = os.path.join(static_dir, 'avatars')
+        for user_id, avatar_path in users:
+            source = os.path.join(static_dir, avatar_path)
+            try:
+                with open(source, 'rb') as f:
+                    process_avatar(user_id, f.read(), avatars_dir)
+                click.echo(f"{user_id}: {avatar_path} -> рендиции готовы")
+            except (OSError, AvatarError) as e:
+                click.echo(f"{user_id}: {avatar_path} пропущен ({e})", err=True)
+
+    @app.cli.command('gc-avatars')
+    @click.option('--dry-run', is_flag=True, help='Только показать, что будет удалено')
+    @click.option('--grace-minutes', type=click.IntRange(min=0), default=60, show_default=True,
+                  help='Не трогать файлы моложе этого возраста')
+    def gc_avatars(dry_run, grace_minutes):
+        """Удаление файлов аватаров, на которые не ссылается ни один пользователь"""
+        import os
+        from app.avatars import collect_garbage
+
+        conn = get_db()
+        if conn is None:
+            click.echo('Нет соединения с БД', err=True)
+            sys.exit(1)
+        try:
+            removed = collect_garbage(conn, os.path.join(app.root_path, 'static', 'avatars'),
+                                      grace_seconds=grace_minutes * 60, dry_run=dry_run)
+        finally:
+            close_db(conn)
+        for name in removed:
+            click.echo(name)
+        verb = 'Будет удалено' if dry_run else 'Удалено'
+        click.echo(f"{verb} файлов: {len(removed)}")
+
+    @app.cli.command('build-assets')
+    @click.option('--no-minify', is_flag=True, help='Собрать без минификации JS и CSS')
+    def build_assets_command(no_minify):
+        """Манифест статики с хешами и предсжатые варианты (запускать при деплое)"""
+        import os
+        from app.assets import asset_build_dir, brotli, build_assets, rcssmin, rjsmin
+
+        if not no_minify and (rjsmin is None or rcssmin is None):
+            # Без минификаторов сборка молча стала бы копированием исходников
+            click.echo('rjsmin/rcssmin не установлены (pip install -r requirements.txt); '
+                       'для сборки без минификации укажите --no-minify', err=True)
+            sys.exit(1)
+        build_dir = asset_build_dir(app)
+        os.makedirs(build_dir, exist_ok=True)
+        manifest, compressed = build_assets(app.static_folder, build_dir, minify_sources=not no_minify)
+        click.echo(f"Файлов в манифесте: {len(manifest)}, сжатых вариантов: {compressed}"
+                   + ('' if brotli else ' (brotli не установлен, только gzip)'))
+        if no_minify:
+            click.echo('JS и CSS не минифицированы (--no-minify)')
+        click.echo(f"Результат: {build_dir}")
+
+    @app.cli.command('llm-stub')
+    @click.option('--port', type=int, default=8099, show_default=True)
+    @click.option('--delay', type=float, default=0.0, help='Задержка ответа, секунд')
+    @click.option('--fail-rate', type=click.FloatRange(0, 1), default=0.0, help='Доля ответов 503')
+    def llm_stub(port, delay, fail_rate):
+        """Локальная заглушка YandexGPT (YANDEX_GPT_URL=http://127.0.0.1:<port>/)"""
+        from app.llm_stub import make_stub_server
+
+        server = make_stub_server(port=port, delay=delay, fail_rate=fail_rate)
+        click.echo(f"Заглушка YandexGPT: http://127.0.0.1:{port}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    @app.cli.command('purge-llm-jobs')
+    @click.option('--hours', type=click.IntRange(min=1), default=24, show_default=True,
+                  help='Удалить задачи старше этого возраста')
+    def purge_llm_jobs(hours):
+        """Удаление старых задач ответов YandexGPT"""
+        from app.jobs import purge_jobs
+
+        conn = get_db()
+        if conn is None:
+            click.echo('Нет соединения с БД', err=True)
+            sys.exit(1)
+        try:
+            removed = purge_jobs(conn, hours)
+            conn.commit()
+        finally:
+            close_db(conn)
+        click.echo(f"Удалено задач: {removed}")
+
+    @app.cli.command('check-logging')
+    def check_logging():
+        """Запись logger.exception через очередь логов: в JSON должно быть поле exc"""
+        from app.logging_setup import check_exception_logging
+
+        line = check_exception_logging()
+        if 'ZeroDivisionError' not in line.get('exc', '') or 'Traceback' in line.get('msg', ''):
+            click.echo(f"Traceback потерян: {line}", err=True)
+            sys.exit(1)
+        click.echo('OK: traceback в поле exc')
+
+    @app.cli.command('check-intents')
+    def check_intents():
+        """Сверка маршрутизации чата с закреплёнными примерами и последовательным эталоном"""
+        from app.intents import FALLBACK_TOPICS, ROUTING_EXAMPLES
+        from app.routes import FALLBACK_RESPONSES
+
+        failures = 0
+        for table, text, expected in ROUTING_EXAMPLES:
+            got, reference = table.match(text), table.match_sequential(text)
+            if got != expected or reference != expected:
+                failures += 1
+                click.echo(f"{text!r}: ожидалось {expected}, матчер {got}, эталон {reference}", err=True)
+        topics = {intent for intent, _ in FALLBACK_TOPICS.rules}
+        if topics != set(FALLBACK_RESPONSES):
+            failures += 1
+            click.echo(f"Темы без ответов или ответы без тем: {sorted(topics ^ set(FALLBACK_RESPONSES))}", err=True)
+        if failures:
+            sys.exit(1)
+        click.echo(f"OK: {len(ROUTING_EXAMPLES)} примеров")
+
+    @app.cli.command('bench-intents')
+    @click.option('--runs', type=click.IntRange(min=1), default=20000, show_default=True)
+    def bench_intents(runs):
+        """Замер определения намерения: один регулярный проход против последовательных any()"""
+        from app.intents import ROUTING_EXAMPLES
+
+        samples = [(table, text) for table, text, _ in ROUTING_EXAMPLES]
+        for name, method in (('regex', 'match'), ('sequential', 'match_sequential')):
+            started = time.perf_counter()
+            for i in range(runs):
+                table, text = samples[i % len(samples)]
+                getattr(table, method)(text)
+            elapsed = time.perf_counter() - started
+            click.echo(f"{name}: {elapsed / runs * 1e6:.2f} µs на сообщение")
@@ -0,0 +1,88 @@
+import gzip
+import hashlib
+import logging
+import os
+
+from flask import request
+
+from app.cache import LRUTTLCache
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него ответы сжимаются gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = 6
+# Для ответов на лету: качество 11 в десятки раз медленнее при выигрыше в единицы процентов
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson',
+    'image/svg+xml',
+}
+
+# Сжатые страницы по хешу содержимого: одинаковый HTML (страницы без данных
+# пользователя) сжимается один раз
+compressed_pages = LRUTTLCache(
+    maxsize=int(os.getenv('COMPRESS_CACHE_SIZE', 128)),
+    ttl=float(os.getenv('COMPRESS_CACHE_TTL', 3600))
+)
+
+
+def choose_encoding(accept_encodings):
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def _should_compress(response):
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    if response.mimetype not in COMPRESSIBLE_TYPES:
+        return False
+    return response.content_length is None or response.content_length >= COMPRESS_MIN_BYTES
+
+
+def init_compression(app):
+    """Сжатие ответов gzip/brotli по Accept-Encoding"""
+
+    @app.after_request
+    def compress_response(response):
+        # Vary для всех сжимаемых типов, даже если этот ответ ушёл несжатым:
+        # иначе кэш-посредник отдаст несжатую копию и клиентам с gzip/br, и наоборот
+        if response.mimetype in COMPRESSIBLE_TYPES:
+            response.vary.add('Accept-Encoding')
+        if not _should_compress(response):
+            return response
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+        if response.mimetype == 'text/html':
+            key = (encoding, hashlib.sha1(data).digest())
+            payload = compressed_pages.get(key)
+            if payload is None:
+                payload = compress(data, encoding)
+                compressed_pages.set(key, payload)
+        else:
+            payload = compress(data, encoding)
+
+        response.set_data(payload)
+        response.headers['Content-Encoding'] = encoding
+        return response
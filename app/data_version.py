@@ -0,0 +1,89 @@
+from datetime import date
+from functools import wraps
+
+from flask import current_app, has_request_context, make_response, request, session
+from flask_login import current_user
+
+# POST-маршруты, которые ничего не меняют и не должны сбрасывать кэш клиента
+READ_ONLY_ENDPOINTS = {'main.chatbot'}
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+# [user_id, версия] последней записи этого браузера: пользователь в кэше
+# load_user другого воркера может хранить старую версию (до USER_CACHE_TTL)
+SESSION_KEY = 'data_version'
+
+
+def bump_data_version(conn, user_id):
+    """Увеличивает версию после изменения данных пользователя; возвращает новую"""
+    with conn.cursor() as cursor:
+        # LAST_INSERT_ID(expr) возвращает новое значение без отдельного SELECT
+        cursor.execute(
+            "UPDATE users SET data_version = LAST_INSERT_ID(data_version + 1) WHERE id = %s",
+            (user_id,)
+        )
+        version = cursor.lastrowid
+    if not conn.autocommit:
+        conn.commit()
+    return version
+
+
+def remember_data_version(version):
+    """Новая версия — в current_user (он же лежит в кэше load_user) и в сессию"""
+    current_user.data_version = version
+    if has_request_context():
+        session[SESSION_KEY] = [current_user.id, version]
+
+
+def current_data_version():
+    """Версия данных текущего пользователя без обращения к БД"""
+    version = getattr(current_user, 'data_version', 0) or 0
+    remembered = session.get(SESSION_KEY)
+    if remembered and remembered[0] == current_user.id:
+        version = max(version, remembered[1])
+    return version
+
+
+def is_data_write(response):
+    """Успешный изменяющий запрос авторизованного пользователя"""
+    return (request.method in WRITE_METHODS
+            and request.endpoint not in READ_ONLY_ENDPOINTS
+            and response.status_code < 400
+            and current_user.is_authenticated)
+
+
+def _etag(user_id, version, daily):
+    tag = f"u{user_id}-v{version}"
+    if daily:
+        # Ответ зависит от сегодняшней даты (сегодняшнее настроение, прогнозы)
+        tag += f"-{date.today().isoformat()}"
+    return tag
+
+
+def conditional_get(f=None, *, daily=False):
+    """ETag по версии данных для GET: при совпадении If-None-Match — 304.
+
+    Ставится над with_db_connection: версия берётся из current_user, поэтому
+    ответ 304 не занимает соединение из пула. daily=True — для маршрутов,
+    чей ответ меняется со сменой дня. Другие методы проходят без изменений.
+    """
+    if f is None:
+        return lambda func: conditional_get(func, daily=daily)
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method != 'GET':
+            return f(*args, **kwargs)
+
+        # Версия читается до данных: запись посреди запроса даст более старый тег
+        etag = _etag(current_user.id, current_data_version(), daily)
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        # Браузер хранит ответ, но каждый раз сверяет версию; прокси не кэшируют
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    return decorated_function
@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+
+
+class PoolExhausted(Exception):
+    """Не удалось получить соединение до истечения дедлайна"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PooledConnection:
+    """Обёртка над соединением: close() возвращает его в пул, а не закрывает"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw)
+
+
+class ElasticPool:
+    """Пул соединений MySQL с переполнением и ограниченной FIFO-очередью ожидания.
+
+    Держит от min_size до pool_size постоянных соединений и до max_overflow
+    временных сверху. Когда все заняты, запросы ждут в очереди (не длиннее
+    max_waiters) не дольше acquire_timeout секунд, иначе получают PoolExhausted.
+    """
+
+    def __init__(self, pool_name, min_size=1, pool_size=5, max_overflow=5,
+                 max_waiters=20, acquire_timeout=3.0, idle_check_after=30.0,
+                 reset_session=True, **connect_args):
+        self.pool_name = pool_name
+        self.min_size = min(min_size, pool_size)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.max_waiters = max_waiters
+        self.acquire_timeout = acquire_timeout
+        self.idle_check_after = idle_check_after
+        self.reset_session = reset_session
+        self._connect_args = connect_args
+
+        self._lock = threading.Lock()
+        self._idle = deque()      # (соединение, время возврата)
+        self._waiters = deque()   # очередь ожидающих в порядке прихода
+        self._total = 0
+        self._in_use = 0
+
+        self._acquired = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        for _ in range(self.min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._total += 1
+
+    @property
+    def max_size(self):
+        return self.pool_size + self.max_overflow
+
+    def _connect(self):
+        return mysql.connector.connect(**self._connect_args)
+
+    def acquire(self, timeout=None):
+        """Выдаёт соединение или бросает PoolExhausted по дедлайну"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waiter = None
+
+        with self._lock:
+            while True:
+                if not self._waiters or self._waiters[0] is waiter:
+                    if self._idle:
+                        raw, returned_at = self._idle.pop()
+                        self._grant(waiter, started)
+                        break
+                    if self._total < self.max_size:
+                        self._total += 1
+                        self._grant(waiter, started)
+                        raw, returned_at = None, None
+                        break
+
+                if waiter is None:
+                    if len(self._waiters) >= self.max_waiters:
+                        self._rejected += 1
+                        raise PoolExhausted('Очередь ожидания соединений переполнена',
+                                            retry_after=max(1, int(self.acquire_timeout)))
+                    waiter = threading.Condition(self._lock)
+                    self._waiters.append(waiter)
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiters.remove(waiter)
+                    self._timeouts += 1
+                    self._notify_head()
+                    raise PoolExhausted('Истекло время ожидания соединения',
+                                        retry_after=max(1, int(self.acquire_timeout)))
+                waiter.wait(remaining)
+
+        # Подключение и проверка выполняются вне блокировки
+        try:
+            if raw is None:
+                raw = self._connect()
+            elif time.monotonic() - returned_at > self.idle_check_after and not raw.is_connected():
+                raw.reconnect(attempts=1)
+        except Error:
+            self._discard()
+            raise
+        return PooledConnection(self, raw)
+
+    def _grant(self, waiter, started):
+        if waiter is not None:
+            self._waiters.popleft()
+            self._notify_head()
+        self._in_use += 1
+        self._acquired += 1
+        waited = time.monotonic() - started
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def _notify_head(self):
+        if self._waiters:
+            self._waiters[0].notify()
+
+    def _discard(self):
+        with self._lock:
+            self._total -= 1
+            self._in_use -= 1
+            self._notify_head()
+
+    def release(self, raw):
+        """Возвращает соединение в пул; лишние сверх pool_size закрываются"""
+        healthy = True
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+            if self.reset_session:
+                raw.reset_session()
+        except Error:
+            healthy = False
+
+        with self._lock:
+            self._in_use -= 1
+            keep = healthy and (self._waiters or self._total <= self.pool_size)
+            if keep:
+                self._idle.append((raw, time.monotonic()))
+            else:
+                self._total -= 1
+            self._notify_head()
+
+        if not keep:
+            try:
+                raw.close()
+            except Error:
+                pass
+
+    def stats(self):
+        """Текущие счётчики пула"""
+        with self._lock:
+            return {
+                'pool_name': self.pool_name,
+                'min_size': self.min_size,
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'total': self._total,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'overflow': max(0, self._total - self.pool_size),
+                'waiters': len(self._waiters),
+                'max_waiters': self.max_waiters,
+                'acquired': self._acquired,
+                'timeouts': self._timeouts,
+                'rejected': self._rejected,
+                'acquire_wait_avg_ms': round(self._wait_total / self._acquired * 1000, 2) if self._acquired else 0.0,
+                'acquire_wait_max_ms': round(self._wait_max * 1000, 2),
+            }
@@ -0,0 +1,233 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from app.rollups import rebuild_user_rollup
+from app.statistics import note_sentiment
+
+IMPORT_CHUNK_ROWS = 500
+IMPORT_MAX_ROWS = 200000
+MAX_REPORTED_ERRORS = 100
+
+FLOW_VALUES = ('none', 'light', 'medium', 'heavy')
+
+# Заголовки разделов CSV из export_data -> вид записи
+CSV_SECTIONS = {
+    '=== НАСТРОЕНИЕ ===': 'mood',
+    '=== ПОЧАСОВОЕ НАСТРОЕНИЕ ===': 'hourly',
+    '=== ДНЕВНИК ЦИКЛА ===': 'cycle',
+}
+
+UPSERT_SQL = {
+    'mood': """
+        INSERT INTO mood_entries (user_id, date, mood, note, note_sentiment)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE mood = VALUES(mood), note = VALUES(note),
+            note_sentiment = VALUES(note_sentiment)
+    """,
+    'hourly': """
+        INSERT INTO hourly_moods (user_id, date, hour, mood, note)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE mood = VALUES(mood), note = VALUES(note)
+    """,
+    'cycle': """
+        INSERT INTO cycle_entries (user_id, date, cycle_day, symptoms, flow_intensity, mood, notes)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            cycle_day = VALUES(cycle_day),
+            symptoms = VALUES(symptoms),
+            flow_intensity = VALUES(flow_intensity),
+            mood = VALUES(mood),
+            notes = VALUES(notes)
+    """,
+}
+
+
+class ImportRowError(ValueError):
+    """Строка импорта не прошла проверку"""
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(str(value or '').strip()[:10], '%Y-%m-%d').date()
+    except ValueError:
+        raise ImportRowError(f"некорректная дата: {value!r}")
+
+
+def parse_number(value, name, low, high, cast=float, required=True):
+    if value is None or str(value).strip() == '':
+        if required:
+            raise ImportRowError(f"не указано поле {name}")
+        return None
+    try:
+        number = cast(float(str(value).replace(',', '.')))
+    except ValueError:
+        raise ImportRowError(f"поле {name} должно быть числом: {value!r}")
+    if not low <= number <= high:
+        raise ImportRowError(f"поле {name} должно быть от {low} до {high}")
+    return number
+
+
+def parse_text(value, name):
+    """Текстовое поле: пустое -> '', не строка -> ошибка строки"""
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ImportRowError(f"поле {name} должно быть строкой")
+    return value
+
+
+def _symptoms(value):
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = [item.strip() for item in value.split(';') if item.strip()]
+    if not isinstance(value, list):
+        raise ImportRowError("symptoms должен быть списком")
+    return json.dumps(value, ensure_ascii=False) if value else None
+
+
+def validate_row(kind, record, user_id):
+    """Запись импорта (dict) -> кортеж параметров для UPSERT_SQL[kind]"""
+    if kind == 'mood':
+        note = parse_text(record.get('note'), 'note')
+        return (user_id, parse_date(record.get('date')),
+                parse_number(record.get('mood'), 'mood', 1, 10),
+                note, note_sentiment(note))
+    if kind == 'hourly':
+        return (user_id, parse_date(record.get('date')),
+                parse_number(record.get('hour'), 'hour', 0, 23, int),
+                parse_number(record.get('mood'), 'mood', 1, 10, int),
+                parse_text(record.get('note'), 'note'))
+    if kind == 'cycle':
+        flow = (record.get('flow_intensity') or '').strip() or None
+        if flow is not None and flow not in FLOW_VALUES:
+            raise ImportRowError(f"flow_intensity должен быть одним из: {', '.join(FLOW_VALUES)}")
+        return (user_id, parse_date(record.get('date')),
+                parse_number(record.get('cycle_day'), 'cycle_day', 1, 366, int, required=False),
+                _symptoms(record.get('symptoms')), flow,
+                parse_number(record.get('mood'), 'mood', 1, 10, int, required=False),
+                parse_text(record.get('notes'), 'notes'))
+    raise ImportRowError(f"неизвестный тип записи: {kind!r}")
+
+
+def iter_csv_records(stream):
+    """(номер строки, вид, запись) из CSV в формате export_data.
+
+    Разделы без уникального ключа (цели, радости) пропускаются:
+    повторный импорт создавал бы дубликаты.
+    """
+    kind = None
+    skip_header = False
+    for line_no, row in enumerate(csv.reader(stream), start=1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        first = row[0].strip()
+        if first.startswith('===') and first.endswith('==='):
+            kind = CSV_SECTIONS.get(first)
+            skip_header = True
+            continue
+        if skip_header:
+            skip_header = False
+            continue
+        if kind == 'mood':
+            yield line_no, kind, dict(zip(('date', 'mood', 'note'), row))
+        elif kind == 'hourly':
+            yield line_no, kind, dict(zip(('date', 'hour', 'mood', 'note'), row))
+        elif kind == 'cycle':
+            yield line_no, kind, dict(zip(
+                ('date', 'cycle_day', 'flow_intensity', 'symptoms', 'mood', 'notes'), row))
+
+
+def iter_ndjson_records(stream):
+    """(номер строки, вид, запись) из NDJSON: {"type": "mood"|"hourly"|"cycle", ...}
+
+    Для нечитаемой строки вид — None, а вместо записи — текст ошибки.
+    """
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_no, None, 'некорректный JSON'
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, 'строка должна быть JSON-объектом'
+            continue
+        yield line_no, str(record.get('type')), record
+
+
+def run_import(conn, user_id, records):
+    """Проверка и запись строк пачками по IMPORT_CHUNK_ROWS в отдельных транзакциях.
+
+    Генератор: после каждой зафиксированной пачки отдаёт текущий отчёт,
+    последним — итоговый (с признаком done). Сводка настроения
+    пересчитывается один раз в конце.
+    """
+    report = {'done': False, 'rows': 0, 'imported': {'mood': 0, 'hourly': 0, 'cycle': 0},
+              'errors': 0, 'error_details': []}
+    pending = {'mood': [], 'hourly': [], 'cycle': []}
+
+    def add_error(line_no, message):
+        report['errors'] += 1
+        if len(report['error_details']) < MAX_REPORTED_ERRORS:
+            report['error_details'].append({'line': line_no, 'error': message})
+
+    def flush(kind):
+        batch = pending[kind]
+        if not batch:
+            return
+        conn.start_transaction()
+        try:
+            with conn.cursor() as cursor:
+                cursor.executemany(UPSERT_SQL[kind], batch)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        report['imported'][kind] += len(batch)
+        pending[kind] = []
+
+    for line_no, kind, record in records:
+        report['rows'] += 1
+        if report['rows'] > IMPORT_MAX_ROWS:
+            add_error(line_no, f"превышен лимит {IMPORT_MAX_ROWS} строк, остаток файла пропущен")
+            break
+        if kind is None:
+            add_error(line_no, record)
+            continue
+        if kind not in pending:
+            add_error(line_no, f"неизвестный тип записи: {kind!r}")
+            continue
+        try:
+            pending[kind].append(validate_row(kind, record, user_id))
+        except ImportRowError as e:
+            add_error(line_no, str(e))
+            continue
+        if len(pending[kind]) >= IMPORT_CHUNK_ROWS:
+            flush(kind)
+            yield dict(report)
+
+    for kind in pending:
+        flush(kind)
+
+    if report['imported']['mood']:
+        conn.start_transaction()
+        try:
+            with conn.cursor() as cursor:
+                rebuild_user_rollup(cursor, user_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    report['done'] = True
+    yield report
+
+
+def open_text_stream(binary_stream):
+    """Текстовый поток поверх загруженного файла (UTF-8, BOM допускается)"""
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
@@ -0,0 +1,129 @@
+"""Определение намерения по тексту сообщения для чата Аси.
+
+Каждая таблица — список (намерение, фразы) в порядке приоритета. Намерение
+определяется за один проход: все фразы собраны в одно регулярное выражение,
+и побеждает фраза самого приоритетного правила, найденная в любом месте
+текста, — так же, как при последовательных проверках any(фраза in текст).
+"""
+import re
+
+
+class IntentTable:
+    """Скомпилированная таблица намерений"""
+
+    def __init__(self, rules):
+        self.rules = [(intent, tuple(phrases)) for intent, phrases in rules]
+        self._rank = {}
+        for rank, (intent, phrases) in enumerate(self.rules):
+            for phrase in phrases:
+                self._rank.setdefault(phrase.lower(), (rank, intent))
+        # Альтернативы в порядке приоритета: в одной позиции выигрывает более
+        # приоритетная фраза; просмотр вперёд находит совпадения в каждой позиции,
+        # в том числе перекрывающиеся
+        alternation = '|'.join(re.escape(phrase) for phrase in
+                               sorted(self._rank, key=lambda p: (self._rank[p][0], -len(p))))
+        self._pattern = re.compile(f"(?=({alternation}))") if alternation else None
+
+    def match(self, text):
+        """Намерение самого приоритетного правила, чья фраза есть в тексте, или None"""
+        if self._pattern is None:
+            return None
+        best = None
+        for found in self._pattern.finditer(text.lower()):
+            rank = self._rank[found.group(1)]
+            if best is None or rank < best:
+                best = rank
+                if rank[0] == 0:
+                    break
+        return best[1] if best else None
+
+    def match_sequential(self, text):
+        """Эталон: последовательные проверки any(фраза in текст), как было в маршрутах"""
+        lowered = text.lower()
+        for intent, phrases in self.rules:
+            if any(phrase in lowered for phrase in phrases):
+                return intent
+        return None
+
+
+# Команды /api/chat, ведущие к анализу данных
+CHAT_COMMANDS = IntentTable([
+    ('deep_analysis', [
+        'проанализируй', 'анализ данных', 'статистика', 'отчет',
+        'анализируй мои данные', 'покажи статистику', 'дай отчет',
+        'как у меня дела', 'расскажи о моем настроении', 'обзор данных',
+        'проанализировать', 'отчёт', 'статистику', 'анализ', 'аналитику',
+        'что с моим настроением', 'как я себя чувствую по данным',
+    ]),
+    ('patterns', [
+        'паттерны', 'закономерности', 'тренды', 'график',
+        'какие дни', 'в какое время', 'когда у меня',
+        'дни недели', 'по дням', 'по времени', 'закономерность',
+        'какой день', 'во сколько',
+    ]),
+    ('notes', ['заметки', 'мои записи', 'что я писал', 'дневник', 'заметок', 'записи', 'текст']),
+    ('joys', ['радости', 'радость', 'joys', 'что меня радует', 'мои радости', 'копилка радостей']),
+    ('goals', ['цели', 'задачи', 'планы', 'прогресс']),
+    ('cycle', ['цикл', 'менструация', 'месячные', 'овуляция', 'пмс', 'фаза цикла', 'дневник цикла']),
+])
+
+# Ответы без YandexGPT (generate_smart_response)
+SMART_REPLIES = IntentTable([
+    ('greeting', ['привет', 'здравствуй', 'доброе', 'хай']),
+    ('how_are_you', ['как дела', 'как настроение', 'как ты']),
+    ('negative', ['плохо', 'грустно', 'тяжело', 'устал', 'стресс']),
+    ('positive', ['хорошо', 'отлично', 'прекрасно', 'радостно', 'счастлив']),
+    ('capabilities', ['что ты умеешь', 'помощь', 'функции', 'можешь']),
+    ('thanks', ['спасибо', 'благодарю']),
+    ('goodbye', ['пока', 'до свидания', 'увидимся']),
+])
+
+# Темы запасных ответов (get_fallback_response): намерение — сама ключевая фраза
+FALLBACK_TOPICS = IntentTable([(keyword, [keyword]) for keyword in (
+    'привет', 'как дела', 'плохо', 'хорошо',
+    '10/10', '9/10', '8/10', '7/10', '6/10', '5/10', '4/10', '3/10', '2/10', '1/10',
+    'стресс', 'тревож', 'спасибо', 'помощь', 'настроен', 'что делать',
+    'устал', 'одиноко', 'радост', 'lumi',
+)])
+
+# Старый /api/chatbot
+CHATBOT_COMMANDS = IntentTable([
+    ('notes', ['заметки']),
+    ('goals', ['цели', 'задачи', 'планы']),
+])
+
+# Закреплённые решения маршрутизации: flask check-intents сверяет с ними
+# и скомпилированный матчер, и последовательный эталон
+ROUTING_EXAMPLES = [
+    (CHAT_COMMANDS, 'Проанализируй мои данные', 'deep_analysis'),
+    (CHAT_COMMANDS, 'дай отчёт за месяц', 'deep_analysis'),
+    (CHAT_COMMANDS, 'как у меня дела по данным?', 'deep_analysis'),
+    (CHAT_COMMANDS, 'покажи график по дням недели', 'patterns'),
+    (CHAT_COMMANDS, 'во сколько у меня лучшее настроение', 'patterns'),
+    (CHAT_COMMANDS, 'анализ паттернов', 'deep_analysis'),
+    (CHAT_COMMANDS, 'что я писал в заметках', 'notes'),
+    (CHAT_COMMANDS, 'дневник цикла', 'notes'),
+    (CHAT_COMMANDS, 'мои радости', 'joys'),
+    (CHAT_COMMANDS, 'прогресс по целям', 'goals'),
+    (CHAT_COMMANDS, 'когда овуляция', 'cycle'),
+    (CHAT_COMMANDS, 'пмс замучил', 'cycle'),
+    (CHAT_COMMANDS, 'какая фаза цикла', 'cycle'),
+    (CHAT_COMMANDS, 'привет!', None),
+    (SMART_REPLIES, 'Привет, как дела?', 'greeting'),
+    (SMART_REPLIES, 'как ты?', 'how_are_you'),
+    (SMART_REPLIES, 'мне грустно и плохо', 'negative'),
+    (SMART_REPLIES, 'всё хорошо, спасибо', 'positive'),
+    (SMART_REPLIES, 'что ты умеешь?', 'capabilities'),
+    (SMART_REPLIES, 'спасибо большое', 'thanks'),
+    (SMART_REPLIES, 'ну пока', 'goodbye'),
+    (SMART_REPLIES, 'расскажи анекдот', None),
+    (FALLBACK_TOPICS, 'Привет! мне плохо', 'привет'),
+    (FALLBACK_TOPICS, 'настроение 10/10', '10/10'),
+    (FALLBACK_TOPICS, 'сегодня 1/10', '1/10'),
+    (FALLBACK_TOPICS, 'тревожно и одиноко', 'тревож'),
+    (FALLBACK_TOPICS, 'расскажи про Lumi', 'lumi'),
+    (FALLBACK_TOPICS, 'ммм', None),
+    (CHATBOT_COMMANDS, 'покажи заметки', 'notes'),
+    (CHATBOT_COMMANDS, 'мои планы', 'goals'),
+    (CHATBOT_COMMANDS, 'как дела', None),
+]
@@ -0,0 +1,247 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import Error
+
+from app.db_utils import PoolExhausted
+
+logger = logging.getLogger(__name__)
+
+LLM_WORKERS = int(os.getenv('LLM_WORKERS', 4))
+LLM_QUEUE_MAX = int(os.getenv('LLM_QUEUE_MAX', 32))
+LLM_USER_MAX_JOBS = int(os.getenv('LLM_USER_MAX_JOBS', 2))
+# Частичный ответ пишется в БД не чаще, чем раз в столько секунд
+JOB_FLUSH_SECONDS = float(os.getenv('LLM_JOB_FLUSH_SECONDS', 0.4))
+JOB_RETENTION_HOURS = 24
+# Итог задачи пишется с повторами; если БД так и не ответила, задача старше
+# JOB_STALE_SECONDS отдаётся клиенту как failed, а не висит в running
+# (60 s — столько же ждёт виджет)
+JOB_FINISH_ATTEMPTS = 4
+JOB_STALE_SECONDS = int(os.getenv('LLM_JOB_STALE_SECONDS', 60))
+# Сколько последних ожиданий держать для перцентилей
+WAIT_SAMPLES = 500
+
+
+class QueueFull(Exception):
+    """Очередь задач заполнена (вся или для этого пользователя)"""
+
+    def __init__(self, message, retry_after=2):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """Пул потоков с ограниченной очередью и счётчиками ожидания.
+
+    Не больше workers задач выполняются одновременно и не больше max_queue
+    ждут; сверх этого submit бросает QueueFull.
+    """
+
+    def __init__(self, name, workers, max_queue, per_user=None):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.per_user = per_user
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._by_user = {}
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def submit(self, user_id, fn, *args):
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise QueueFull(f"очередь {self.name} заполнена ({self._queued})")
+            if self.per_user is not None and self._by_user.get(user_id, 0) >= self.per_user:
+                self._rejected += 1
+                raise QueueFull(f"не больше {self.per_user} задач на пользователя")
+            self._queued += 1
+            self._submitted += 1
+            self._by_user[user_id] = self._by_user.get(user_id, 0) + 1
+        return self._executor.submit(self._run, user_id, time.monotonic(), fn, args)
+
+    def _run(self, user_id, submitted, fn, args):
+        started = time.monotonic()
+        wait = started - submitted
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._waits.append(wait)
+            self._wait_max = max(self._wait_max, wait)
+        ok = False
+        try:
+            result = fn(*args)
+            ok = True
+            return result
+        except Exception as e:
+            logger.exception("Ошибка задачи %s: %s", self.name, e)
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._running -= 1
+                self._run_total += elapsed
+                if ok:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+                left = self._by_user.get(user_id, 1) - 1
+                if left:
+                    self._by_user[user_id] = left
+                else:
+                    self._by_user.pop(user_id, None)
+            logger.info("Задача %s: ожидание %.0f ms, выполнение %.0f ms",
+                        self.name, wait * 1000, elapsed * 1000)
+
+    def stats(self):
+        """Текущие счётчики очереди"""
+        with self._lock:
+            waits = sorted(self._waits)
+            finished = self._completed + self._failed
+
+            def percentile(p):
+                return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 2) if waits else 0.0
+
+            return {
+                'name': self.name,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'per_user': self.per_user,
+                'queued': self._queued,
+                'running': self._running,
+                'submitted': self._submitted,
+                'rejected': self._rejected,
+                'completed': self._completed,
+                'failed': self._failed,
+                'queue_wait_p50_ms': percentile(0.5),
+                'queue_wait_p95_ms': percentile(0.95),
+                'queue_wait_max_ms': round(self._wait_max * 1000, 2),
+                'run_avg_ms': round(self._run_total / finished * 1000, 2) if finished else 0.0,
+            }
+
+
+llm_executor = BoundedExecutor('llm', LLM_WORKERS, LLM_QUEUE_MAX, per_user=LLM_USER_MAX_JOBS)
+
+
+# ================== ЗАДАЧИ ОТВЕТОВ YANDEXGPT ==================
+# Состояние задачи хранится в llm_jobs: опрос может прийти в любой воркер gunicorn
+
+def create_job(conn, user_id, fields):
+    job_id = uuid.uuid4().hex
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO llm_jobs (id, user_id, status, fields) VALUES (%s, %s, 'queued', %s)",
+            (job_id, user_id, json.dumps(fields, ensure_ascii=False))
+        )
+    return job_id
+
+
+def get_job(conn, job_id, user_id):
+    """Задача пользователя или None"""
+    with conn.cursor(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT id, reply, fields, created_at, started_at, finished_at,
+                IF(stale, 'failed', status) AS status,
+                IF(stale, 'stale', error) AS error
+            FROM (
+                SELECT *, (status IN ('queued', 'running')
+                           AND created_at < NOW() - INTERVAL %s SECOND) AS stale
+                FROM llm_jobs WHERE id = %s AND user_id = %s
+            ) AS job
+        """, (JOB_STALE_SECONDS, job_id, user_id))
+        return cursor.fetchone()
+
+
+def _execute(sql, params):
+    """Запрос из потока задачи: своё соединение на время одного UPDATE"""
+    from app import get_db, close_db
+
+    conn = get_db()
+    if conn is None:
+        raise Error('Нет соединения с БД')
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+        if not conn.autocommit:
+            conn.commit()
+    finally:
+        close_db(conn)
+
+
+def _try_execute(sql, params):
+    """_execute без исключений: False, если БД или пул недоступны"""
+    try:
+        _execute(sql, params)
+        return True
+    except (Error, PoolExhausted) as e:
+        logger.warning("Задача: запись в llm_jobs не удалась: %s", e)
+        return False
+
+
+def _finish(job_id, status, reply, error):
+    """Итог задачи с повторами: задача не должна остаться в running"""
+    for attempt in range(JOB_FINISH_ATTEMPTS):
+        if _try_execute(
+            "UPDATE llm_jobs SET status = %s, reply = %s, error = %s, finished_at = NOW() WHERE id = %s",
+            (status, reply, error, job_id)
+        ):
+            return
+        time.sleep(0.5 * 2 ** attempt)
+    logger.error("Задача %s: итог не записан, через %d s она будет отдана как failed",
+                 job_id, JOB_STALE_SECONDS)
+
+
+def run_reply_job(job_id, parts, fallback):
+    """Выполнение задачи в потоке llm_executor.
+
+    parts — итератор приращений текста (LLMClient.stream/stream_cached),
+    fallback() — запасной ответ, если модель так и не ответила.
+    """
+    from app.llm_client import LLMUnavailable
+
+    # Промежуточные записи необязательны: при сбое БД задача продолжается
+    _try_execute("UPDATE llm_jobs SET status = 'running', started_at = NOW() WHERE id = %s", (job_id,))
+    text = ''
+    error = None
+    flushed = time.monotonic()
+    try:
+        try:
+            for part in parts:
+                text += part
+                if time.monotonic() - flushed >= JOB_FLUSH_SECONDS:
+                    _try_execute("UPDATE llm_jobs SET reply = %s WHERE id = %s", (text, job_id))
+                    flushed = time.monotonic()
+        except LLMUnavailable as e:
+            logger.error("YandexGPT недоступен: %s", e)
+            if text:
+                error = 'truncated'
+            else:
+                text = fallback()
+    except Exception as e:
+        _finish(job_id, 'failed', text, str(e)[:255])
+        raise
+    _finish(job_id, 'done', text.strip(), error)
+
+
+def purge_jobs(conn, hours=JOB_RETENTION_HOURS):
+    """Удаление старых задач; возвращает число удалённых строк"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM llm_jobs WHERE created_at < NOW() - INTERVAL %s HOUR",
+            (hours,)
+        )
+        return cursor.rowcount
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.cache import LRUTTLCache
+
+logger = logging.getLogger(__name__)
+
+YANDEX_GPT_URL = os.getenv('YANDEX_GPT_URL',
+                           'https://llm.api.cloud.yandex.net/foundationModels/v1/completion')
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 3.05))
+LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', 12))
+# Общий бюджет на запрос с повторами: дольше держать sync-воркер нельзя
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', 20))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', 10))
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 2.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Ответы анализов: ключ (пользователь, вид анализа, хеш промпта). Промпт собран
+# из данных пользователя, поэтому при их изменении ключ меняется сам; запись
+# данных дополнительно чистит записи пользователя в этом воркере
+llm_reply_cache = LRUTTLCache(
+    maxsize=int(os.getenv('LLM_CACHE_SIZE', 512)),
+    ttl=float(os.getenv('LLM_CACHE_TTL', 6 * 3600))
+)
+
+
+class LLMUnavailable(Exception):
+    """YandexGPT не ответил: ошибка, таймаут или открыт предохранитель"""
+
+
+class CircuitBreaker:
+    """Предохранитель: после failure_threshold ошибок подряд запросы не отправляются
+    reset_timeout секунд, затем пропускается один пробный запрос.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("YandexGPT: предохранитель разомкнут после %d ошибок", self._failures)
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+
+class LLMClient:
+    """Клиент YandexGPT с keep-alive пулом соединений, повторами и предохранителем"""
+
+    def __init__(self, url=YANDEX_GPT_URL, breaker=None):
+        self.url = url
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', 5)),
+            reset_timeout=float(os.getenv('LLM_BREAKER_RESET', 30))
+        )
+        self.session = requests.Session()
+        # Повторы делаются здесь, с учётом дедлайна; у адаптера их нет
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_POOL_SIZE, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @staticmethod
+    def credentials():
+        return os.environ.get('YANDEX_API_KEY'), os.environ.get('YANDEX_FOLDER_ID')
+
+    def is_configured(self):
+        api_key, folder_id = self.credentials()
+        return bool(api_key and folder_id)
+
+    def _post(self, prompt, temperature, max_tokens, stream=False):
+        """POST с повторами до первого байта ответа -> requests.Response со статусом 200"""
+        api_key, folder_id = self.credentials()
+        if not api_key or not folder_id:
+            raise LLMUnavailable('не заданы YANDEX_API_KEY / YANDEX_FOLDER_ID')
+        if not self.breaker.allow():
+            raise LLMUnavailable('предохранитель разомкнут')
+
+        headers = {'Authorization': f'Api-Key {api_key}', 'Content-Type': 'application/json'}
+        payload = {
+            "modelUri": f"gpt://{folder_id}/yandexgpt/latest",
+            "completionOptions": {"stream": stream, "temperature": temperature, "maxTokens": max_tokens},
+            "messages": [{"role": "user", "text": prompt}]
+        }
+        deadline = time.monotonic() + LLM_DEADLINE
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                response = self.session.post(
+                    self.url, headers=headers, json=payload, stream=stream,
+                    timeout=(LLM_CONNECT_TIMEOUT, max(min(LLM_READ_TIMEOUT, remaining), 0.1))
+                )
+                if response.status_code in RETRY_STATUSES:
+                    response.close()
+                    raise LLMUnavailable(f"HTTP {response.status_code}")
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    LLMUnavailable) as e:
+                error = e
+            except requests.RequestException as e:
+                # Неверный URL, редиректы и т.п.: повтор не поможет, но ошибка
+                # учитывается, иначе пробный запрос оставит предохранитель разомкнутым
+                self.breaker.record_failure()
+                raise LLMUnavailable(f"ошибка запроса: {e}")
+            else:
+                if response.status_code != 200:
+                    # Ошибка запроса (ключ, квота, формат): повтор не поможет
+                    self.breaker.record_failure()
+                    raise LLMUnavailable(f"HTTP {response.status_code}: {response.text[:200]}")
+                return response
+
+            # Полный джиттер: повторы разных воркеров не приходят пачкой
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            attempt += 1
+            if attempt > LLM_MAX_RETRIES or time.monotonic() + delay + LLM_CONNECT_TIMEOUT >= deadline:
+                self.breaker.record_failure()
+                raise LLMUnavailable(f"{error} (попыток: {attempt})")
+            logger.info("YandexGPT: %s, повтор через %.2f s", error, delay)
+            time.sleep(delay)
+
+    def complete(self, prompt, temperature=0.7, max_tokens=300):
+        """Ответ модели на prompt или исключение LLMUnavailable"""
+        started = time.perf_counter()
+        response = self._post(prompt, temperature, max_tokens)
+        try:
+            reply = response.json()['result']['alternatives'][0]['message']['text'].strip()
+        except (ValueError, KeyError, IndexError) as e:
+            self.breaker.record_failure()
+            raise LLMUnavailable(f"некорректный ответ: {e}")
+        self.breaker.record_success()
+        logger.debug("YandexGPT ответил за %.0f ms", (time.perf_counter() - started) * 1000)
+        return reply
+
+    def stream(self, prompt, temperature=0.7, max_tokens=300):
+        """Генератор приращений текста в потоковом режиме YandexGPT.
+
+        Каждая строка ответа API содержит весь текст на данный момент, наружу
+        отдаётся только новая часть. LLMUnavailable до первого фрагмента значит,
+        что ответа не будет; после — что он оборвался.
+        """
+        started = time.perf_counter()
+        response = self._post(prompt, temperature, max_tokens, stream=True)
+        text = ''
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                current = json.loads(line)['result']['alternatives'][0]['message']['text']
+                if not text:
+                    logger.debug("YandexGPT: первый фрагмент через %.0f ms",
+                                 (time.perf_counter() - started) * 1000)
+                if len(current) > len(text):
+                    yield current[len(text):]
+                    text = current
+        except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+            self.breaker.record_failure()
+            raise LLMUnavailable(f"поток прерван: {e}")
+        except GeneratorExit:
+            # Клиент ушёл, не дочитав ответ; сам API отвечал нормально
+            self.breaker.record_success()
+            raise
+        finally:
+            response.close()
+        self.breaker.record_success()
+
+    def complete_or_none(self, prompt, temperature=0.7, max_tokens=300):
+        """Как complete, но при недоступности возвращает None (вызывающий берёт запасной ответ)"""
+        try:
+            return self.complete(prompt, temperature=temperature, max_tokens=max_tokens)
+        except LLMUnavailable as e:
+            logger.error("YandexGPT недоступен: %s", e)
+            return None
+
+    def complete_cached(self, user_id, kind, prompt, temperature=0.7, max_tokens=300):
+        """complete_or_none с кэшем ответов; недоступность модели не кэшируется"""
+        key = (user_id, kind, hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        reply = llm_reply_cache.get(key)
+        if reply is not None:
+            return reply
+        reply = self.complete_or_none(prompt, temperature=temperature, max_tokens=max_tokens)
+        if reply is not None:
+            llm_reply_cache.set(key, reply)
+        return reply
+
+    def stream_cached(self, user_id, kind, prompt, temperature=0.7, max_tokens=300):
+        """stream с тем же кэшем, что complete_cached: готовый ответ отдаётся одним фрагментом"""
+        key = (user_id, kind, hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        reply = llm_reply_cache.get(key)
+        if reply is not None:
+            yield reply
+            return
+        parts = []
+        for part in self.stream(prompt, temperature=temperature, max_tokens=max_tokens):
+            parts.append(part)
+            yield part
+        llm_reply_cache.set(key, ''.join(parts).strip())
+
+
+def invalidate_user_replies(user_id):
+    """Сброс кэшированных ответов после изменения данных пользователя"""
+    llm_reply_cache.invalidate_where(lambda key: key[0] == user_id)
+
+
+llm_client = LLMClient()
@@ -0,0 +1,81 @@
+"""Локальная заглушка YandexGPT completion API для разработки и тестов.
+
+Запуск: flask llm-stub --port 8099, затем YANDEX_GPT_URL=http://127.0.0.1:8099/
+(и любые YANDEX_API_KEY / YANDEX_FOLDER_ID). В тестах сервер можно поднять
+в потоке: server = make_stub_server(port=0); threading.Thread(target=server.serve_forever).
+"""
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _result(prompt, text, status):
+    return {'result': {
+        'alternatives': [{'message': {'role': 'assistant', 'text': text}, 'status': status}],
+        'usage': {'inputTextTokens': str(len(prompt) // 4), 'completionTokens': str(len(text.split()))},
+        'modelVersion': 'stub',
+    }}
+
+
+def make_stub_server(host='127.0.0.1', port=8099, delay=0.0, fail_rate=0.0, reply=None, chunk_delay=0.05):
+    """HTTP-сервер, отвечающий в формате YandexGPT.
+
+    delay — задержка ответа в секундах, fail_rate — доля ответов 503,
+    chunk_delay — пауза между словами в потоковом режиме.
+    Счётчик запросов — server.requests_seen.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, как у настоящего API
+
+        def do_POST(self):
+            server.requests_seen += 1
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if delay:
+                time.sleep(delay)
+            if fail_rate and random.random() < fail_rate:
+                self._send(503, {'error': 'stub failure'})
+                return
+            try:
+                request = json.loads(body)
+                prompt = request['messages'][-1]['text']
+            except (ValueError, KeyError, IndexError):
+                self._send(400, {'error': 'bad request'})
+                return
+            text = reply if reply is not None else f"Заглушка: получено {len(prompt)} символов 🙂"
+            if request.get('completionOptions', {}).get('stream'):
+                self._send_stream(prompt, text)
+            else:
+                self._send(200, _result(prompt, text, 'ALTERNATIVE_STATUS_FINAL'))
+
+        def _send_stream(self, prompt, text):
+            """Как у API: строки JSON с накопленным текстом, chunked-кодирование"""
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            words = text.split(' ')
+            for i in range(1, len(words) + 1):
+                status = 'ALTERNATIVE_STATUS_FINAL' if i == len(words) else 'ALTERNATIVE_STATUS_PARTIAL'
+                line = json.dumps(_result(prompt, ' '.join(words[:i]), status), ensure_ascii=False).encode('utf-8') + b'\n'
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+                if chunk_delay:
+                    time.sleep(chunk_delay)
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _send(self, status, payload):
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.requests_seen = 0
+    return server
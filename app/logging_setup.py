@@ -0,0 +1,142 @@
+import atexit
+import copy
+import io
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Проставляет в запись идентификатор текущего HTTP-запроса"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись лога — одна строка JSON"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Запись пришла через очередь: traceback уже отформатирован в _QueueHandler
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+_traceback_formatter = logging.Formatter()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, сохраняющий traceback отдельно от сообщения.
+
+    Стандартный prepare() вклеивает traceback в msg и обнуляет exc_info,
+    после чего JsonFormatter в потоке вывода не может заполнить exc.
+    Здесь traceback сохраняется строкой в exc_text, а msg остаётся текстом
+    сообщения.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def _parse_levels(spec):
+    """'app.routes=DEBUG,werkzeug=WARNING' -> {'app.routes': 'DEBUG', ...}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(app):
+    """Настройка логирования: запись в поток вывода идёт в фоновом потоке.
+
+    Обработчики в потоке запроса только кладут запись в очередь, поэтому
+    запрос не ждёт stdout. Уровни задаются через LOG_LEVEL и LOG_LEVELS,
+    формат — через LOG_FORMAT (json или text).
+    """
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    for name, level in _parse_levels(os.getenv('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+
+    if _listener is None:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        if os.getenv('LOG_FORMAT', 'json').lower() == 'text':
+            stream_handler.setFormatter(logging.Formatter(
+                '%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s'))
+        else:
+            stream_handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(RequestIdFilter())
+        root.handlers = [queue_handler]
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = (request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16])[:64]
+
+    @app.after_request
+    def expose_request_id(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+
+def check_exception_logging():
+    """Проводит запись logger.exception через очередь и JsonFormatter.
+
+    Возвращает разобранную строку JSON (flask check-logging проверяет поле exc).
+    """
+    stream = io.StringIO()
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    logger = logging.getLogger('app.logging_check')
+    logger.propagate = False
+    logger.handlers = [_QueueHandler(log_queue)]
+    listener.start()
+    try:
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("Проверка записи исключения")
+    finally:
+        listener.stop()
+        logger.handlers = []
+    return json.loads(stream.getvalue().splitlines()[-1])
@@ -0,0 +1,386 @@
+import logging
+
+from mysql.connector import Error
+
+from app.rollups import rebuild_all_rollups
+from app.statistics import AGGREGATES_SQL, RECENT_ROWS_SQL, backfill_note_sentiment
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = 'lumi_schema_migrations'
+
+# ================== ВЕРСИОНИРОВАННЫЕ МИГРАЦИИ ==================
+# Каждая миграция — номер, описание и список шагов (SQL-строка или функция,
+# принимающая курсор). Применённые версии записываются в schema_migrations.
+# DDL в MySQL не откатывается, поэтому все шаги идемпотентны.
+
+
+def ensure_index(table, name, columns, unique=False):
+    """Шаг миграции: создаёт индекс, если на таблице нет индекса с тем же набором колонок"""
+
+    def step(cursor):
+        cursor.execute("""
+            SELECT index_name, non_unique, column_name
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s
+            ORDER BY index_name, seq_in_index
+        """, (table,))
+        existing = {}
+        for index_name, non_unique, column_name in cursor.fetchall():
+            existing.setdefault(index_name, {'unique': not non_unique, 'columns': []})
+            existing[index_name]['columns'].append(column_name)
+
+        for index in existing.values():
+            if unique:
+                if index['unique'] and index['columns'] == list(columns):
+                    return
+            elif index['columns'][:len(columns)] == list(columns):
+                return
+
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        cursor.execute(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})")
+        logger.info("Создан индекс %s на %s(%s)", name, table, ', '.join(columns))
+
+    return step
+
+
+def ensure_column(table, column, definition):
+    """Шаг миграции: добавляет колонку, если её ещё нет"""
+
+    def step(cursor):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """, (table, column))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            logger.info("Добавлена колонка %s.%s", table, column)
+
+    return step
+
+
+MIGRATIONS = [
+    (1, 'Базовые таблицы', [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50) NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            first_name VARCHAR(100),
+            last_name VARCHAR(100),
+            email VARCHAR(255),
+            avatar_path VARCHAR(255),
+            gender VARCHAR(10),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS mood_entries (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            date DATE NOT NULL,
+            mood DECIMAL(3,1) NOT NULL,
+            note TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS hourly_moods (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            date DATE NOT NULL,
+            hour TINYINT NOT NULL,
+            mood TINYINT NOT NULL,
+            note TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS goals (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            text VARCHAR(500) NOT NULL,
+            completed TINYINT(1) NOT NULL DEFAULT 0,
+            date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS joys (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            text VARCHAR(500) NOT NULL,
+            date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cycle_entries (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            date DATE NOT NULL,
+            cycle_day INT,
+            symptoms TEXT,
+            flow_intensity VARCHAR(20),
+            mood TINYINT,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cycle_settings (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            cycle_length INT DEFAULT 28,
+            period_length INT DEFAULT 5,
+            last_period_start DATE,
+            notify_before_period TINYINT(1) DEFAULT 1,
+            notify_ovulation TINYINT(1) DEFAULT 1,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (2, 'Уникальные ключи для upsert и составные индексы горячих запросов', [
+        ensure_index('users', 'uq_users_username', ['username'], unique=True),
+        # ON DUPLICATE KEY UPDATE в mood_entries / hourly_moods / cycle_entries
+        ensure_index('mood_entries', 'uq_mood_entries_user_date', ['user_id', 'date'], unique=True),
+        ensure_index('hourly_moods', 'uq_hourly_moods_user_date_hour', ['user_id', 'date', 'hour'], unique=True),
+        ensure_index('cycle_entries', 'uq_cycle_entries_user_date', ['user_id', 'date'], unique=True),
+        ensure_index('cycle_settings', 'uq_cycle_settings_user', ['user_id'], unique=True),
+        # Группировки по часу суток
+        ensure_index('hourly_moods', 'ix_hourly_moods_user_hour', ['user_id', 'hour']),
+        # Списки целей и радостей: по дню и по времени создания
+        ensure_index('goals', 'ix_goals_user_date', ['user_id', 'date']),
+        ensure_index('goals', 'ix_goals_user_created', ['user_id', 'created_at']),
+        ensure_index('joys', 'ix_joys_user_date', ['user_id', 'date']),
+        ensure_index('joys', 'ix_joys_user_created', ['user_id', 'created_at']),
+    ]),
+    (3, 'Сводки настроения по пользователям', [
+        """
+        CREATE TABLE IF NOT EXISTS mood_rollups (
+            user_id INT PRIMARY KEY,
+            entries INT NOT NULL DEFAULT 0,
+            mood_sum DECIMAL(12,1) NOT NULL DEFAULT 0,
+            mood_min DECIMAL(3,1),
+            mood_max DECIMAL(3,1),
+            good_days INT NOT NULL DEFAULT 0,
+            bad_days INT NOT NULL DEFAULT 0,
+            first_date DATE,
+            last_date DATE,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS mood_rollup_weekdays (
+            user_id INT NOT NULL,
+            weekday TINYINT NOT NULL,
+            entries INT NOT NULL DEFAULT 0,
+            mood_sum DECIMAL(12,1) NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, weekday),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        rebuild_all_rollups,
+    ]),
+    (4, 'Рендиции аватаров', [
+        ensure_column('users', 'avatar_renditions', 'TEXT NULL'),
+    ]),
+    (5, 'Версия данных пользователя для ETag', [
+        ensure_column('users', 'data_version', 'BIGINT UNSIGNED NOT NULL DEFAULT 0'),
+    ]),
+    (6, 'Задачи ответов YandexGPT', [
+        """
+        CREATE TABLE IF NOT EXISTS llm_jobs (
+            id CHAR(32) PRIMARY KEY,
+            user_id INT NOT NULL,
+            status VARCHAR(16) NOT NULL,
+            reply MEDIUMTEXT,
+            fields TEXT,
+            error VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP NULL,
+            finished_at TIMESTAMP NULL,
+            INDEX ix_llm_jobs_created (created_at),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (7, 'Тональность заметок настроения', [
+        ensure_column('mood_entries', 'note_sentiment', 'TINYINT UNSIGNED NULL'),
+        backfill_note_sentiment,
+    ]),
+]
+
+
+def _ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def applied_versions(conn):
+    """Множество уже применённых версий"""
+    cursor = conn.cursor()
+    try:
+        _ensure_migrations_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def apply_migrations(conn, target=None):
+    """Применяет все неприменённые миграции до target включительно.
+
+    Возвращает список применённых версий. Параллельные воркеры
+    сериализуются через GET_LOCK.
+    """
+    cursor = conn.cursor()
+    applied = []
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (LOCK_NAME,))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError('Не удалось получить блокировку миграций')
+        try:
+            done = applied_versions(conn)
+            for version, description, steps in MIGRATIONS:
+                if version in done or (target is not None and version > target):
+                    continue
+                logger.info("Применяется миграция %s: %s", version, description)
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                conn.commit()
+                applied.append(version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchone()
+    except Error as e:
+        logger.error("Ошибка применения миграций: %s", e)
+        raise
+    finally:
+        cursor.close()
+    return applied
+
+
+# Горячие запросы из routes.py: (название, SQL, параметры) для проверки через EXPLAIN
+HOT_QUERIES = [
+    ('load_user', "SELECT * FROM users WHERE id = %s", (1,)),
+    ('login', "SELECT * FROM users WHERE username = %s", ('user',)),
+    ('mood_entries by date',
+     "SELECT id, user_id, date, mood, note, created_at FROM mood_entries WHERE user_id = %s AND date = %s ORDER BY date DESC",
+     (1, '2024-01-01')),
+    ('mood_entries list',
+     "SELECT id, user_id, date, mood, note, created_at FROM mood_entries WHERE user_id = %s ORDER BY date DESC",
+     (1,)),
+    ('mood 30 days',
+     "SELECT AVG(mood), COUNT(*) FROM mood_entries WHERE user_id = %s AND date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)",
+     (1,)),
+    ('mood by weekday',
+     "SELECT DAYOFWEEK(date), COUNT(*), AVG(mood) FROM mood_entries WHERE user_id = %s GROUP BY DAYOFWEEK(date)",
+     (1,)),
+    ('hourly_moods by date',
+     "SELECT id, user_id, date, hour, mood, note FROM hourly_moods WHERE user_id = %s AND date = %s ORDER BY hour",
+     (1, '2024-01-01')),
+    ('hourly_moods by hour',
+     "SELECT hour, AVG(mood), COUNT(*) FROM hourly_moods WHERE user_id = %s GROUP BY hour ORDER BY hour",
+     (1,)),
+    ('goals by date',
+     "SELECT id, user_id, text, completed, created_at FROM goals WHERE user_id = %s AND date = %s ORDER BY created_at DESC",
+     (1, '2024-01-01')),
+    ('goals list',
+     "SELECT id, user_id, text, completed, created_at FROM goals WHERE user_id = %s ORDER BY created_at DESC",
+     (1,)),
+    ('joys by date',
+     "SELECT id, user_id, text, created_at FROM joys WHERE user_id = %s AND date = %s ORDER BY created_at DESC",
+     (1, '2024-01-01')),
+    ('joys recent',
+     "SELECT text, created_at FROM joys WHERE user_id = %s ORDER BY created_at DESC LIMIT 5",
+     (1,)),
+    ('cycle_entries list',
+     "SELECT id, user_id, date, cycle_day, symptoms, flow_intensity, mood, notes FROM cycle_entries WHERE user_id = %s ORDER BY date DESC",
+     (1,)),
+    ('cycle_settings', "SELECT * FROM cycle_settings WHERE user_id = %s", (1,)),
+    # Страницы списков (keyset_page): первая и следующая по курсору
+    ('mood_entries page',
+     "SELECT id, user_id, date, mood, note, created_at FROM mood_entries WHERE user_id = %s "
+     "AND (date < %s OR (date = %s AND id < %s)) ORDER BY date DESC, id DESC LIMIT %s",
+     (1, '2024-01-01', '2024-01-01', 100, 101)),
+    ('goals page',
+     "SELECT id, user_id, text, completed, date, created_at FROM goals WHERE user_id = %s "
+     "AND (created_at < %s OR (created_at = %s AND id < %s)) ORDER BY created_at DESC, id DESC LIMIT %s",
+     (1, '2024-01-01 00:00:00', '2024-01-01 00:00:00', 100, 101)),
+    ('joys page',
+     "SELECT id, user_id, text, date, created_at FROM joys WHERE user_id = %s "
+     "AND (created_at < %s OR (created_at = %s AND id < %s)) ORDER BY created_at DESC, id DESC LIMIT %s",
+     (1, '2024-01-01 00:00:00', '2024-01-01 00:00:00', 100, 101)),
+    ('cycle_entries page',
+     "SELECT id, user_id, date, cycle_day, symptoms, flow_intensity, mood, notes FROM cycle_entries "
+     "WHERE user_id = %s AND (date < %s OR (date = %s AND id < %s)) ORDER BY date DESC, id DESC LIMIT %s",
+     (1, '2024-01-01', '2024-01-01', 100, 101)),
+    # /api/calendar: месяц настроений, заметок, целей и радостей
+    ('calendar mood month',
+     "SELECT date, mood, (note IS NOT NULL AND note != '') AS has_note FROM mood_entries "
+     "WHERE user_id = %s AND date >= %s AND date < %s",
+     (1, '2024-01-01', '2024-02-01')),
+    ('calendar goals by day',
+     "SELECT DATE(created_at), COUNT(*), SUM(completed) FROM goals "
+     "WHERE user_id = %s AND created_at >= %s AND created_at < %s GROUP BY DATE(created_at)",
+     (1, '2024-01-01', '2024-02-01')),
+    ('calendar joys by day',
+     "SELECT DATE(created_at), COUNT(*) FROM joys "
+     "WHERE user_id = %s AND created_at >= %s AND created_at < %s GROUP BY DATE(created_at)",
+     (1, '2024-01-01', '2024-02-01')),
+    ('calendar goals month',
+     "SELECT id, text, completed, date, created_at FROM goals WHERE user_id = %s "
+     "AND created_at >= %s AND created_at < %s ORDER BY created_at DESC, id DESC LIMIT %s",
+     (1, '2024-01-01', '2024-02-01', 50)),
+    ('calendar joys month',
+     "SELECT id, text, date, created_at FROM joys WHERE user_id = %s "
+     "AND created_at >= %s AND created_at < %s ORDER BY created_at DESC, id DESC LIMIT %s",
+     (1, '2024-01-01', '2024-02-01', 50)),
+    ('hourly_moods range',
+     "SELECT date, FLOOR(hour / %s) * %s AS slot, AVG(mood) FROM hourly_moods "
+     "WHERE user_id = %s AND date >= %s AND date <= %s GROUP BY date, slot ORDER BY date, slot",
+     (3, 3, 1, '2024-01-01', '2024-01-31')),
+    ('statistics aggregates', AGGREGATES_SQL, {'user_id': 1}),
+    ('statistics recent rows', RECENT_ROWS_SQL, {'user_id': 1}),
+]
+
+
+def explain_hot_queries(conn, queries=None):
+    """Прогоняет EXPLAIN по горячим запросам.
+
+    Возвращает список (название, таблица) для запросов, где хотя бы одна
+    таблица читается полным сканированием без индекса.
+    """
+    problems = []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for name, sql, params in queries or HOT_QUERIES:
+            cursor.execute("EXPLAIN " + sql, params)
+            for row in cursor.fetchall():
+                # <derivedN>, <unionN,M> — служебные таблицы самого запроса
+                if (row.get('table') or '').startswith('<'):
+                    continue
+                if row.get('type') == 'ALL' and not row.get('key'):
+                    problems.append((name, row.get('table')))
+    finally:
+        cursor.close()
+    return problems
@@ -1,9 +1,14 @@
+import json
 from flask_login import UserMixin
 from app import get_db, close_db, bcrypt
 from mysql.connector import Error
+import logging
+
+logger = logging.getLogger(__name__)
 
 class User(UserMixin):
-    def __init__(self, id, username, email, password, first_name=None, last_name=None, avatar_path=None, gender=None):
+    def __init__(self, id, username, email, password, first_name=None, last_name=None, avatar_path=None, gender=None,
+                 avatar_renditions=None, data_version=0):
         self.id = id
         self.username = username
         self.email = email
@@ -12,6 +17,19 @@ class User(UserMixin):
         self.last_name = last_name
         self.avatar_path = avatar_path
         self.gender = gender
+        self.avatar_renditions = json.loads(avatar_renditions) if avatar_renditions else {}
+        # Версия данных для ETag (app.data_version); обновляется при записи
+        self.data_version = data_version
+
+    def avatar_for(self, size, fmt='jpg'):
+        """Путь к наименьшей рендиции аватара не меньше size (для url_for('static'))"""
+        sizes = sorted(int(key) for key in self.avatar_renditions)
+        for candidate in sizes:
+            if candidate >= size:
+                return self.avatar_renditions[str(candidate)].get(fmt) or self.avatar_path
+        if sizes:
+            return self.avatar_renditions[str(sizes[-1])].get(fmt) or self.avatar_path
+        return self.avatar_path
 
     @staticmethod
     def get_by_id(user_id):
@@ -34,11 +52,13 @@ class User(UserMixin):
                     first_name=user_data.get('first_name'),
                     last_name=user_data.get('last_name'),
                     avatar_path=user_data.get('avatar_path'),
-                    gender=user_data.get('gender')
+                    gender=user_data.get('gender'),
+                    avatar_renditions=user_data.get('avatar_renditions'),
+                    data_version=user_data.get('data_version') or 0
                 )
             return None
         except Error as e:
-            print(f"Database error in get_by_id: {e}")
+            logger.error("Database error in get_by_id: %s", e)
             return None
         finally:
             close_db(conn)
@@ -64,11 +84,13 @@ class User(UserMixin):
                     first_name=user_data.get('first_name'),
                     last_name=user_data.get('last_name'),
                     avatar_path=user_data.get('avatar_path'),
-                    gender=user_data.get('gender')
+                    gender=user_data.get('gender'),
+                    avatar_renditions=user_data.get('avatar_renditions'),
+                    data_version=user_data.get('data_version') or 0
                 )
             return None
         except Error as e:
-            print(f"Database error in get_by_username: {e}")
+            logger.error("Database error in get_by_username: %s", e)
             return None
         finally:
             close_db(conn)
@@ -103,7 +125,7 @@ class User(UserMixin):
                 gender=gender
             )
         except Error as e:
-            print(f"Database error in create: {e}")
+            logger.error("Database error in create: %s", e)
             return None
         finally:
             close_db(conn)
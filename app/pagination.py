@@ -0,0 +1,92 @@
+from datetime import datetime
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+class PaginationError(ValueError):
+    """Некорректные параметры постраничной выдачи"""
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise PaginationError(f"Параметр {name} должен быть датой YYYY-MM-DD")
+
+
+def wants_full_list(args):
+    """Старое поведение — весь список без страниц (all=1), пока шаблоны не перейдут на курсоры"""
+    return args.get('all', '').lower() in ('1', 'true', 'yes')
+
+
+def make_token(key, row_id):
+    """Курсор следующей страницы: '<ключ>,<id>'"""
+    return f"{key.isoformat()},{row_id}"
+
+
+def parse_page_args(args, key_kind='date'):
+    """Разбор from, to, after и limit из query string.
+
+    key_kind — тип ключа сортировки: 'date' для дат, 'datetime' для created_at.
+    """
+    date_from = _parse_date(args['from'], 'from') if args.get('from') else None
+    date_to = _parse_date(args['to'], 'to') if args.get('to') else None
+    if date_from and date_to and date_from > date_to:
+        raise PaginationError("Параметр from должен быть не позже to")
+
+    after = None
+    if args.get('after'):
+        raw_key, sep, raw_id = args['after'].rpartition(',')
+        if not sep or not raw_id.isdigit():
+            raise PaginationError("Параметр after должен иметь вид <ключ>,<id>")
+        if key_kind == 'date':
+            key = _parse_date(raw_key, 'after')
+        else:
+            try:
+                key = datetime.fromisoformat(raw_key)
+            except ValueError:
+                raise PaginationError("Параметр after содержит некорректную дату")
+        after = (key, int(raw_id))
+
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise PaginationError("Параметр limit должен быть числом")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise PaginationError(f"Параметр limit должен быть от 1 до {MAX_LIMIT}")
+
+    return {'from': date_from, 'to': date_to, 'after': after, 'limit': limit}
+
+
+def keyset_page(cursor, select_sql, params, key_column, page, date_column='date'):
+    """Одна страница в порядке (key_column DESC, id DESC).
+
+    select_sql — запрос вида "SELECT ... FROM t WHERE user_id = %s" без ORDER BY,
+    курсор должен быть dictionary=True, а в выборке — key_column и id.
+    Возвращает (строки, курсор следующей страницы или None).
+    """
+    sql = select_sql
+    params = list(params)
+    if page['from']:
+        sql += f" AND {date_column} >= %s"
+        params.append(page['from'])
+    if page['to']:
+        sql += f" AND {date_column} <= %s"
+        params.append(page['to'])
+    if page['after']:
+        key, row_id = page['after']
+        sql += f" AND ({key_column} < %s OR ({key_column} = %s AND id < %s))"
+        params.extend([key, key, row_id])
+    # Лишняя строка показывает, есть ли следующая страница
+    sql += f" ORDER BY {key_column} DESC, id DESC LIMIT %s"
+    params.append(page['limit'] + 1)
+
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    next_token = None
+    if len(rows) > page['limit']:
+        rows = rows[:page['limit']]
+        last = rows[-1]
+        next_token = make_token(last[key_column], last['id'])
+    return rows, next_token
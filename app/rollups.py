@@ -0,0 +1,208 @@
+from datetime import datetime, date
+
+# Имена дней недели как у DAYNAME(), индекс — DAYOFWEEK() (1 = воскресенье)
+DAY_NAMES = {
+    1: 'Sunday', 2: 'Monday', 3: 'Tuesday', 4: 'Wednesday',
+    5: 'Thursday', 6: 'Friday', 7: 'Saturday'
+}
+WEEK_ORDER = [2, 3, 4, 5, 6, 7, 1]
+
+_ROLLUP_SELECT = """
+    SELECT user_id,
+        COUNT(*),
+        COALESCE(SUM(mood), 0),
+        MIN(mood),
+        MAX(mood),
+        COUNT(CASE WHEN mood >= 7 THEN 1 END),
+        COUNT(CASE WHEN mood <= 4 THEN 1 END),
+        MIN(date),
+        MAX(date)
+    FROM mood_entries
+"""
+
+_ROLLUP_UPSERT = """
+    INSERT INTO mood_rollups
+        (user_id, entries, mood_sum, mood_min, mood_max, good_days, bad_days, first_date, last_date)
+    {select}
+    ON DUPLICATE KEY UPDATE
+        entries = VALUES(entries),
+        mood_sum = VALUES(mood_sum),
+        mood_min = VALUES(mood_min),
+        mood_max = VALUES(mood_max),
+        good_days = VALUES(good_days),
+        bad_days = VALUES(bad_days),
+        first_date = VALUES(first_date),
+        last_date = VALUES(last_date)
+"""
+
+_WEEKDAYS_INSERT = """
+    INSERT INTO mood_rollup_weekdays (user_id, weekday, entries, mood_sum)
+    SELECT user_id, DAYOFWEEK(date), COUNT(*), SUM(mood)
+    FROM mood_entries
+    {where}
+    GROUP BY user_id, DAYOFWEEK(date)
+"""
+
+
+def _weekday(entry_date):
+    """DAYOFWEEK() для даты или строки YYYY-MM-DD"""
+    if isinstance(entry_date, datetime):
+        entry_date = entry_date.date()
+    elif not isinstance(entry_date, date):
+        entry_date = datetime.strptime(str(entry_date)[:10], '%Y-%m-%d').date()
+    return entry_date.isoweekday() % 7 + 1, entry_date
+
+
+def rebuild_user_rollup(cursor, user_id):
+    """Пересчёт сводки пользователя по mood_entries"""
+    # Пустоту определяем по данным: rowcount upsert'а равен 0 и тогда,
+    # когда сводка уже верна и строка не изменилась
+    cursor.execute("SELECT COUNT(*) FROM mood_entries WHERE user_id = %s", (user_id,))
+    row = cursor.fetchall()[0]
+    entries = next(iter(row.values())) if isinstance(row, dict) else row[0]
+    if entries:
+        cursor.execute(
+            _ROLLUP_UPSERT.format(select=_ROLLUP_SELECT + " WHERE user_id = %s GROUP BY user_id"),
+            (user_id,)
+        )
+    else:
+        # Записей нет — сводка обнуляется
+        cursor.execute("""
+            UPDATE mood_rollups
+            SET entries = 0, mood_sum = 0, mood_min = NULL, mood_max = NULL,
+                good_days = 0, bad_days = 0, first_date = NULL, last_date = NULL
+            WHERE user_id = %s
+        """, (user_id,))
+    cursor.execute("DELETE FROM mood_rollup_weekdays WHERE user_id = %s", (user_id,))
+    cursor.execute(_WEEKDAYS_INSERT.format(where="WHERE user_id = %s"), (user_id,))
+
+
+def rebuild_all_rollups(cursor):
+    """Пересчёт сводок всех пользователей (исправление расхождений)"""
+    cursor.execute("DELETE FROM mood_rollups")
+    cursor.execute(_ROLLUP_UPSERT.format(select=_ROLLUP_SELECT + " GROUP BY user_id"))
+    cursor.execute("DELETE FROM mood_rollup_weekdays")
+    cursor.execute(_WEEKDAYS_INSERT.format(where=""))
+
+
+def apply_mood_change(cursor, user_id, entry_date, old_mood, new_mood):
+    """Обновляет сводку после изменения одной записи mood_entries.
+
+    old_mood=None — запись добавлена, new_mood=None — запись удалена.
+    Вызывается в той же транзакции, что и изменение записи. Если удаляется
+    текущий минимум/максимум или крайняя дата, сводка пересчитывается целиком.
+    """
+    old_mood = float(old_mood) if old_mood is not None else None
+    new_mood = float(new_mood) if new_mood is not None else None
+    weekday, entry_date = _weekday(entry_date)
+
+    cursor.execute(
+        "SELECT mood_min, mood_max, first_date, last_date FROM mood_rollups WHERE user_id = %s FOR UPDATE",
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        rebuild_user_rollup(cursor, user_id)
+        return
+    if isinstance(row, dict):
+        row = tuple(row.values())
+
+    mood_min, mood_max, first_date, last_date = row
+    if old_mood is not None:
+        if old_mood in (float(mood_min or 0), float(mood_max or 0)):
+            rebuild_user_rollup(cursor, user_id)
+            return
+        if new_mood is None and entry_date in (first_date, last_date):
+            rebuild_user_rollup(cursor, user_id)
+            return
+
+    def weight(mood):
+        return 0 if mood is None else 1
+
+    def good(mood):
+        return 1 if mood is not None and mood >= 7 else 0
+
+    def bad(mood):
+        return 1 if mood is not None and mood <= 4 else 0
+
+    entries_delta = weight(new_mood) - weight(old_mood)
+    sum_delta = (new_mood or 0) - (old_mood or 0)
+
+    cursor.execute("""
+        UPDATE mood_rollups SET
+            entries = entries + %s,
+            mood_sum = mood_sum + %s,
+            good_days = good_days + %s,
+            bad_days = bad_days + %s,
+            mood_min = IF(%s IS NULL, mood_min, LEAST(COALESCE(mood_min, %s), %s)),
+            mood_max = IF(%s IS NULL, mood_max, GREATEST(COALESCE(mood_max, %s), %s)),
+            first_date = IF(%s = 0, first_date, LEAST(COALESCE(first_date, %s), %s)),
+            last_date = IF(%s = 0, last_date, GREATEST(COALESCE(last_date, %s), %s))
+        WHERE user_id = %s
+    """, (
+        entries_delta, sum_delta,
+        good(new_mood) - good(old_mood), bad(new_mood) - bad(old_mood),
+        new_mood, new_mood, new_mood,
+        new_mood, new_mood, new_mood,
+        entries_delta, entry_date, entry_date,
+        entries_delta, entry_date, entry_date,
+        user_id
+    ))
+
+    if entries_delta or sum_delta:
+        cursor.execute("""
+            INSERT INTO mood_rollup_weekdays (user_id, weekday, entries, mood_sum)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                entries = entries + VALUES(entries),
+                mood_sum = mood_sum + VALUES(mood_sum)
+        """, (user_id, weekday, entries_delta, sum_delta))
+
+
+def get_mood_rollup(cursor, user_id):
+    """Сводка настроения пользователя за всю историю — чтение одной строки"""
+    cursor.execute("""
+        SELECT entries, mood_sum, mood_min, mood_max, good_days, bad_days, first_date, last_date
+        FROM mood_rollups
+        WHERE user_id = %s
+    """, (user_id,))
+    row = cursor.fetchone()
+    if isinstance(row, dict):
+        row = tuple(row.values())
+    if not row or not row[0]:
+        return {
+            'total': 0, 'avg_mood': None, 'min_mood': None, 'max_mood': None,
+            'good_days': 0, 'bad_days': 0, 'tracking_days': 0
+        }
+    entries, mood_sum, mood_min, mood_max, good_days, bad_days, first_date, last_date = row
+    return {
+        'total': entries,
+        'avg_mood': float(mood_sum) / entries,
+        'min_mood': mood_min,
+        'max_mood': mood_max,
+        'good_days': good_days,
+        'bad_days': bad_days,
+        'tracking_days': (last_date - first_date).days if first_date and last_date else 0
+    }
+
+
+def get_weekday_rollup(cursor, user_id):
+    """Настроение по дням недели в порядке понедельник..воскресенье"""
+    cursor.execute("""
+        SELECT weekday, entries, mood_sum
+        FROM mood_rollup_weekdays
+        WHERE user_id = %s AND entries > 0
+    """, (user_id,))
+    rows = cursor.fetchall()
+    by_weekday = {}
+    for row in rows:
+        if isinstance(row, dict):
+            row = (row['weekday'], row['entries'], row['mood_sum'])
+        weekday, entries, mood_sum = row
+        by_weekday[int(weekday)] = {
+            'weekday': int(weekday),
+            'day_name': DAY_NAMES[int(weekday)],
+            'avg_mood': float(mood_sum) / entries,
+            'count': entries
+        }
+    return [by_weekday[day] for day in WEEK_ORDER if day in by_weekday]
@@ -2,17 +2,35 @@ import os
 import csv
 import io
 import json
-import requests
 import random
 from datetime import datetime, date, timedelta
-from flask import Blueprint, render_template, request, jsonify, send_file, current_app, flash, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, send_file, current_app, flash, redirect, url_for, stream_with_context, make_response
 from flask_login import login_required, current_user
-from app import get_db, close_db
+from app import get_db, close_db, user_cache
+from app.db_utils import PoolExhausted
+from app.statistics import generate_user_statistics, note_sentiment
+from app.rollups import apply_mood_change, get_mood_rollup, get_weekday_rollup
+from app.pagination import PaginationError, keyset_page, parse_page_args, wants_full_list
+from app.importer import iter_csv_records, iter_ndjson_records, open_text_stream, run_import
+from app.batch import MAX_OPERATIONS as MAX_BATCH_OPERATIONS, run_batch, validate_batch
+from app.compression import compressed_pages
+from app.llm_client import LLMUnavailable, invalidate_user_replies, llm_client, llm_reply_cache
+from app.intents import CHAT_COMMANDS, CHATBOT_COMMANDS, FALLBACK_TOPICS, SMART_REPLIES
+from app.jobs import QueueFull, create_job, get_job, llm_executor, run_reply_job
+from app.data_version import WRITE_METHODS, bump_data_version, conditional_get, is_data_write, remember_data_version
+from app.avatars import AVATAR_MAX_BYTES, AvatarError, check_avatar, submit_avatar, submit_garbage_collection
 from mysql.connector import Error
 from functools import wraps
+import logging
 
 # Сначала определяем blueprint...........
 main = Blueprint('main', __name__)
+logger = logging.getLogger(__name__)
+
+def data_changed(conn, user_id):
+    """Данные пользователя изменились: новая версия для ETag и сброс кэша анализов"""
+    remember_data_version(bump_data_version(conn, user_id))
+    invalidate_user_replies(user_id)
 
 def with_db_connection(f):
     @wraps(f)
@@ -24,337 +42,29 @@ def with_db_connection(f):
                 return jsonify({'error': 'Database connection failed'}), 500
             
             result = f(conn, *args, **kwargs)
+            if request.method in WRITE_METHODS:
+                result = make_response(result)
+                if is_data_write(result):
+                    data_changed(conn, current_user.id)
             return result
+        except PoolExhausted:
+            raise
         except Error as e:
-            print(f"❌ Database error in {f.__name__}: {e}")
+            logger.error("Database error in %s: %s", f.__name__, e)
             return jsonify({'error': str(e)}), 500
         except Exception as e:
-            print(f"❌ Unexpected error in {f.__name__}: {e}")
+            logger.exception("Unexpected error in %s: %s", f.__name__, e)
             return jsonify({'error': str(e)}), 500
         finally:
             if conn:
                 try:
                     close_db(conn)
-                    print(f"✅ Connection closed in {f.__name__}")
                 except Exception as e:
-                    print(f"⚠️ Error closing connection in {f.__name__}: {e}")
+                    logger.warning("Error closing connection in %s: %s", f.__name__, e)
     return decorated_function
 
 # ================== ФУНКЦИИ АНАЛИЗА ==================
 
-def generate_user_statistics(conn, user_id):
-    """Генерация статистики пользователя для AI-анализа"""
-    cursor = conn.cursor(dictionary=True)
-
-    # 1. Среднее настроение за 30 дней
-    cursor.execute("""
-        SELECT 
-            AVG(mood) as avg_mood,
-            MIN(mood) as min_mood,
-            MAX(mood) as max_mood,
-            COUNT(*) as total_entries,
-            COUNT(CASE WHEN mood >= 7 THEN 1 END) as good_days,
-            COUNT(CASE WHEN mood <= 4 THEN 1 END) as bad_days
-        FROM mood_entries
-        WHERE user_id = %s
-        AND date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-    """, (user_id,))
-    
-    mood_stats = cursor.fetchone()
-
-    # 2. Тренд настроения (последние 7 дней vs предыдущие 7 дней)
-    cursor.execute("""
-        SELECT 
-            AVG(CASE 
-                WHEN date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY) 
-                THEN mood 
-            END) as avg_recent,
-            AVG(CASE 
-                WHEN date >= DATE_SUB(CURDATE(), INTERVAL 14 DAY) 
-                AND date < DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-                THEN mood 
-            END) as avg_previous,
-            COUNT(CASE 
-                WHEN date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY) 
-                THEN 1 
-            END) as recent_count
-        FROM mood_entries
-        WHERE user_id = %s
-    """, (user_id,))
-    
-    trend_stats = cursor.fetchone()
-    
-    # Вычисляем тренд
-    trend = "stable"
-    trend_value = 0
-    
-    if trend_stats['avg_recent'] and trend_stats['avg_previous'] and trend_stats['recent_count'] >= 3:
-        diff = float(trend_stats['avg_recent']) - float(trend_stats['avg_previous'])
-        trend_value = diff
-        if diff > 0.5:
-            trend = "improving"
-        elif diff < -0.5:
-            trend = "declining"
-
-    # 3. Лучшее и худшее время дня
-    cursor.execute("""
-        SELECT hour, AVG(mood) as avg_mood, COUNT(*) as entries
-        FROM hourly_moods
-        WHERE user_id = %s
-        GROUP BY hour
-        HAVING COUNT(*) >= 2
-        ORDER BY hour
-    """, (user_id,))
-    
-    hours_data = cursor.fetchall()
-
-    worst_hour = None
-    best_hour = None
-    hourly_analysis = ""
-
-    if hours_data:
-        valid_hours = [h for h in hours_data if h['entries'] >= 2]
-        if valid_hours:
-            worst_hour = min(valid_hours, key=lambda x: x['avg_mood'])
-            best_hour = max(valid_hours, key=lambda x: x['avg_mood'])
-            
-            # Формируем анализ часов
-            low_hours = [h for h in valid_hours if h['avg_mood'] < 5]
-            high_hours = [h for h in valid_hours if h['avg_mood'] > 7]
-            
-            if low_hours:
-                hourly_analysis += f"Низкое настроение часто в {', '.join(str(h['hour']) for h in low_hours)}:00. "
-            if high_hours:
-                hourly_analysis += f"Высокое настроение обычно в {', '.join(str(h['hour']) for h in high_hours)}:00."
-
-    # 4. Анализ заметок
-    cursor.execute("""
-        SELECT note, mood, date
-        FROM mood_entries
-        WHERE user_id = %s
-        AND note IS NOT NULL
-        AND note != ''
-        AND LENGTH(note) > 5
-        ORDER BY date DESC
-        LIMIT 100
-    """, (user_id,))
-    
-    notes_data = cursor.fetchall()
-    
-    # Ключевые слова для анализа
-    positive_keywords = ['рад', 'счастлив', 'хорошо', 'отлично', 'прекрасно', 'ура', 'успех', 'люблю', 'доволен', 'восторг']
-    negative_keywords = ['стресс', 'устал', 'плохо', 'грустно', 'тревог', 'злой', 'раздраж', 'беспокоит', 'уныло', 'тоска']
-    neutral_keywords = ['норм', 'обычно', 'стабильно', 'так себе', 'ничего', 'окей']
-    
-    keyword_counts = {
-        'positive': 0,
-        'negative': 0,
-        'neutral': 0
-    }
-    
-    recent_positive = 0
-    recent_negative = 0
-    all_notes_text = []
-    
-    for note in notes_data:
-        note_text = note.get('note', '')  # безопасно, если note нет или None
-        if isinstance(note_text, str) and note_text.strip():  # проверяем, что это непустая строка
-            note_text = note_text.lower()
-        all_notes_text.append(note_text)
-        
-        # Считаем ключевые слова
-        if any(keyword in note_text for keyword in positive_keywords):
-            keyword_counts['positive'] += 1
-        if any(keyword in note_text for keyword in negative_keywords):
-            keyword_counts['negative'] += 1
-        if any(keyword in note_text for keyword in neutral_keywords):
-            keyword_counts['neutral'] += 1
-        
-        # Разделяем по времени (последние 7 дней)
-        note_date = note.get('date')
-        if isinstance(note_date, str):
-            try:
-                note_date = datetime.strptime(note_date, '%Y-%m-%d').date()
-            except ValueError:
-                continue  # если дата в неверном формате, пропускаем
-        elif isinstance(note_date, datetime):
-            note_date = note_date.date()
-        else:
-            continue  # если дата вообще не строка и не datetime, пропускаем
-
-        if note_date >= datetime.now().date() - timedelta(days=7):
-            if any(keyword in note_text for keyword in positive_keywords):
-                recent_positive += 1
-            if any(keyword in note_text for keyword in negative_keywords):
-                recent_negative += 1
-
-    # 5. Дни недели анализ
-    cursor.execute("""
-        SELECT 
-            DAYOFWEEK(date) as day_of_week,
-            COUNT(*) as count,
-            AVG(mood) as avg_mood
-        FROM mood_entries
-        WHERE user_id = %s
-        GROUP BY DAYOFWEEK(date)
-        HAVING COUNT(*) >= 3
-        ORDER BY avg_mood
-    """, (user_id,))
-    
-    days_data = cursor.fetchall()
-    
-    worst_day = None
-    best_day = None
-    day_names_russian = {
-        1: 'воскресенье', 2: 'понедельник', 3: 'вторник', 
-        4: 'среда', 5: 'четверг', 6: 'пятница', 7: 'суббота'
-    }
-    
-    if days_data:
-        worst_day_data = min(days_data, key=lambda x: x['avg_mood'])
-        best_day_data = max(days_data, key=lambda x: x['avg_mood'])
-        
-        if worst_day_data['count'] >= 3:
-            worst_day = {
-                'name': day_names_russian.get(worst_day_data['day_of_week'], ''),
-                'avg_mood': float(worst_day_data['avg_mood']),
-                'count': worst_day_data['count']
-            }
-        
-        if best_day_data['count'] >= 3:
-            best_day = {
-                'name': day_names_russian.get(best_day_data['day_of_week'], ''),
-                'avg_mood': float(best_day_data['avg_mood']),
-                'count': best_day_data['count']
-            }
-
-    # 6. Анализ циклов (если пользователь женского пола)
-    cycle_analysis = ""
-    cursor.execute("SELECT gender FROM users WHERE id = %s", (user_id,))
-    user_gender = cursor.fetchone()
-    
-    if user_gender and user_gender['gender'] == 'female':
-        cursor.execute("""
-            SELECT 
-                AVG(mood) as avg_mood_cycle,
-                COUNT(*) as cycle_entries
-            FROM cycle_entries
-            WHERE user_id = %s
-        """, (user_id,))
-        
-        cycle_stats = cursor.fetchone()
-        
-        if cycle_stats and cycle_stats['cycle_entries'] >= 5:
-            cycle_analysis = f"У вас {cycle_stats['cycle_entries']} записей в дневнике цикла. "
-            if cycle_stats['avg_mood_cycle']:
-                cycle_analysis += f"Среднее настроение в дни цикла: {float(cycle_stats['avg_mood_cycle']):.1f}/10."
-    # 7. Анализ радостей (joys)
-    cursor.execute("""
-        SELECT COUNT(*) as joys_count
-        FROM joys
-        WHERE user_id = %s
-    """, (user_id,))
-    joys_stats = cursor.fetchone()
-
-    # 8. Последние 5 радостей
-    cursor.execute("""
-        SELECT text, created_at
-        FROM joys
-        WHERE user_id = %s
-        ORDER BY created_at DESC
-        LIMIT 5
-    """, (user_id,))
-    recent_joys = cursor.fetchall()
-            # 9. Статистика цикла (общая)
-    cursor.execute("""
-        SELECT 
-            COUNT(*) as cycle_entries,
-            COUNT(CASE WHEN flow_intensity IN ('light', 'medium', 'heavy') THEN 1 END) as period_days,
-            AVG(mood) as avg_mood_cycle
-        FROM cycle_entries 
-        WHERE user_id = %s
-    """, (user_id,))
-    cycle_stats_summary = cursor.fetchone()
-    
-    cursor.close()
-
-    # Формируем финальный объект статистики
-    stats = {
-        # Основные показатели
-        "avg_mood": round(float(mood_stats['avg_mood'] or 0), 1) if mood_stats['avg_mood'] else 0.0,
-        "min_mood": float(mood_stats['min_mood'] or 0),
-        "max_mood": float(mood_stats['max_mood'] or 0),
-        "total_entries": mood_stats['total_entries'] or 0,
-        "good_days": mood_stats['good_days'] or 0,
-        "bad_days": mood_stats['bad_days'] or 0,
-        
-        # Тренды
-        "trend": trend,
-        "trend_value": trend_value,
-        "avg_recent": float(trend_stats['avg_recent'] or 0),
-        "avg_previous": float(trend_stats['avg_previous'] or 0),
-        
-        # Временной анализ
-        "worst_hour": worst_hour,
-        "best_hour": best_hour,
-        "hourly_analysis": hourly_analysis,
-        
-        # Анализ заметок
-        "keyword_counts": keyword_counts,
-        "recent_positive": recent_positive,
-        "recent_negative": recent_negative,
-        "notes_sample": all_notes_text[:5],
-        
-        # Дни недели
-        "worst_day": worst_day,
-        "best_day": best_day,
-        
-        # Циклы
-        "cycle_analysis": cycle_analysis,
-        
-                # ⭐⭐⭐ ДОБАВЛЯЕМ РАДОСТИ ⭐⭐⭐
-        "joys_count": joys_stats['joys_count'] if joys_stats else 0,
-        "recent_joys": [joy['text'] for joy in recent_joys] if recent_joys else [],
-        
-        # ⭐⭐⭐ ДОБАВЛЯЕМ СТАТИСТИКУ ЦИКЛА ⭐⭐⭐
-        "cycle_entries": cycle_stats_summary['cycle_entries'] if cycle_stats_summary else 0,
-        "period_days": cycle_stats_summary['period_days'] if cycle_stats_summary else 0,
-        "avg_mood_cycle": float(cycle_stats_summary['avg_mood_cycle'] or 0) if cycle_stats_summary and cycle_stats_summary['avg_mood_cycle'] else 0,
-        
-        # Общая оценка
-        "mood_score": 0
-    }
-    
-    # Вычисляем общий балл настроения (0-100)
-    mood_score = 0
-    
-    # Балл за среднее настроение (50%)
-    if stats['avg_mood'] > 0:
-        mood_score += min(50, stats['avg_mood'] * 5)
-    
-    # Балл за тренд (20%)
-    if trend == "improving":
-        mood_score += 20
-    elif trend == "declining":
-        mood_score += 5
-    else:
-        mood_score += 10
-    
-    # Балл за соотношение хороших/плохих дней (20%)
-    if stats['total_entries'] > 0:
-        good_ratio = stats['good_days'] / stats['total_entries']
-        mood_score += min(20, good_ratio * 20)
-    
-    # Балл за заметки (10%)
-    if stats['keyword_counts']['positive'] > stats['keyword_counts']['negative']:
-        mood_score += 10
-    elif stats['keyword_counts']['positive'] == stats['keyword_counts']['negative']:
-        mood_score += 5
-    
-    stats['mood_score'] = min(100, max(0, int(mood_score)))
-    
-    return stats
-
 def generate_ai_insights(stats):
     """Генерация умных выводов на основе статистики"""
     
@@ -513,121 +223,118 @@ def get_random_advice(stats):
         return random.choice(advice_pool)
     return None
 
+# Запасные ответы по темам intents.FALLBACK_TOPICS
+FALLBACK_RESPONSES = {
+    'привет': ['Привет! Как твое настроение сегодня? 😊', 'Здравствуй! Рада тебя видеть! 🌈'],
+    'как дела': ['У меня все отлично! А у тебя как дела?', 'Спасибо, хорошо! Как твое настроение?'],
+    'плохо': [
+        'Мне жаль это слышать 😔 Хочешь рассказать, что случилось?',
+        'Понимаю, что может быть тяжело. Ты не одинок в своих чувствах 🤗',
+        'Иногда просто выговориться уже помогает. Я здесь, чтобы выслушать 👂'
+    ],
+    'хорошо': [
+        'Это прекрасно! Рада за тебя 😄 Что особенно порадовало сегодня?',
+        'Здорово слышать! Позитивное настроение - это суперсила! 💪',
+        'Отлично! Попробуй зафиксировать это чувство в дневнике настроения 📔'
+    ],
+    '10/10': [
+        'Отлично! 10/10 - это прекрасно! Что особенно порадовало сегодня? 🎉',
+        'Супер! Настроение 10/10 - ты на вершине мира! 🌟',
+        '10 баллов из 10? Вот это да! Поделись секретом своего настроения! ✨'
+    ],
+    '9/10': [
+        'Почти идеально! 9/10 - отличный результат! 🌈',
+        'Прекрасно! С небольшим улучшением будет 10/10! 💪'
+    ],
+    '8/10': [
+        'Хорошо! 8/10 - это здорово! 🌟',
+        'Отличное настроение! Продолжай в том же духе! 😊'
+    ],
+    '7/10': [
+        'Неплохо! 7/10 - стабильно хорошо! 👍',
+        'Хороший день! Может быть, завтра будет ещё лучше! 🌈'
+    ],
+    '6/10': [
+        'Нормально! 6/10 - неплохо, но есть куда расти! 🌱',
+        'Середнячок! Может, добавить немного позитива в день? 🌞'
+    ],
+    '5/10': [
+        'Так себе день... 5/10 - нейтрально. Может, стоит отдохнуть? ☕',
+        'Серединка на половинку. Может, вечер порадует? 🌙'
+    ],
+    '4/10': [
+        'Не очень... 4/10 - может, стоит поделиться, что случилось? 💭',
+        'Сложный день? Иногда помогает просто выговориться. 👂'
+    ],
+    '3/10': [
+        'Тяжело... 3/10 - мне жаль это слышать. Хочешь рассказать? 😔',
+        'Сложный период? Помни, что это временно. 🌧️'
+    ],
+    '2/10': [
+        'Очень тяжело... 2/10 - я здесь, чтобы выслушать. 🤗',
+        'Такие дни бывают. Ты не одинок. 💪'
+    ],
+    '1/10': [
+        'Критично... 1/10 - может, стоит обратиться к кому-то близкому или специалисту? 🆘',
+        'Очень сложный день. Не бойся просить о помощи. ❤️'
+    ],
+    'стресс': [
+        'Попробуй технику глубокого дыхания: вдох на 4, задержка на 4, выдох на 6 🧘‍♀️',
+        'Стресс - временное состояние. Попробуй отвлечься на что-то приятное 🌿',
+        'Иногда помогает прогулка на свежем воздухе. Хоть 10 минут! 🚶‍♀️'
+    ],
+    'тревож': [
+        'Тревога - это нормально. Попробуй технику "5-4-3-2-1": назови 5 вещей, которые видишь, 4 - которые чувствуешь, 3 - которые слышишь, 2 - которые нюхаешь, 1 - пробуешь на вкус.',
+        'Попробуй заземлиться: почувствуй стул под собой, ноги на полу. Ты здесь и сейчас. 🌍',
+        'Иногда помогает записать тревожные мысли на бумагу 📝'
+    ],
+    'спасибо': [
+        'Всегда пожалуйста! Я рада, что могу быть полезной 😊',
+        'Благодарю тебя за доверие! 💖',
+        'Обращайся в любое время! ✨'
+    ],
+    'помощь': [
+        'Я могу: 1) Поболтать с тобой 2) Поддержать в сложный момент 3) Дать совет по управлению настроением 4) Помочь разобраться в эмоциях',
+        'Чем я могу помочь? Расскажи о своем настроении или спроси совета!',
+        'В нашем приложении ты можешь отслеживать настроение, ставить цели и отмечать радости дня!'
+    ],
+    'настроен': [
+        'Как твое настроение сегодня по шкале от 1 до 10? Попробуй оценить в календаре! 📊',
+        'Заметка о настроении сегодня может помочь лучше понять свои эмоции.',
+        'Просмотр статистики настроения в разделе "Анализ" помогает увидеть закономерности.'
+    ],
+    'что делать': [
+        'Попробуй: 1) Прогуляться 2) Послушать любимую музыку 3) Выпить чашку чая 4) Позвонить другу',
+        'Иногда помогает смена деятельности. Что ты обычно делаешь, чтобы поднять настроение?',
+        'Маленькие радости каждый день создают большие изменения! 🌟'
+    ],
+    'устал': [
+        'Отдохни немного. Ты заслуживаешь перерыва! ☕',
+        'Усталость - сигнал тела. Давай себе время на восстановление 🛋️',
+        'Попробуй короткий отдых: 15-20 минут могут творить чудеса!'
+    ],
+    'одиноко': [
+        'Ты не одинок в этом чувстве. Многие проходят через это 🌙',
+        'Попробуй связаться с кем-то близким, даже просто написать сообщение 💌',
+        'Иногда помогает заняться чем-то творческим: рисование, письмо, музыка 🎨'
+    ],
+    'радост': [
+        'Ого! Ты записываешь радости? Это так круто! 🌟 Что сегодня порадовало?',
+        'Копилка радостей — лучшее, что можно вести! Поделишься? ✨',
+        'Радости делают день ярче. Записывай их в дневник радостей! 💖'
+    ],
+    'lumi': [
+        'Lumi - это трекер настроения, который помогает понимать свои эмоции и улучшать ментальное здоровье! 🌈',
+        'В Lumi ты можешь: отслеживать настроение каждый день, смотреть статистику, ставить цели, отмечать радости!',
+        'Попробуй все функции Lumi: календарь настроения, анализ статистики, дневник радостей!'
+    ]
+}
+
 def get_fallback_response(user_message):
     """Локальные ответы если API недоступно"""
-    user_message_lower = user_message.lower()
-    
-    # Простые ответы на русском
-    responses = {
-        'привет': ['Привет! Как твое настроение сегодня? 😊', 'Здравствуй! Рада тебя видеть! 🌈'],
-        'как дела': ['У меня все отлично! А у тебя как дела?', 'Спасибо, хорошо! Как твое настроение?'],
-        'плохо': [
-            'Мне жаль это слышать 😔 Хочешь рассказать, что случилось?',
-            'Понимаю, что может быть тяжело. Ты не одинок в своих чувствах 🤗',
-            'Иногда просто выговориться уже помогает. Я здесь, чтобы выслушать 👂'
-        ],
-        'хорошо': [
-            'Это прекрасно! Рада за тебя 😄 Что особенно порадовало сегодня?',
-            'Здорово слышать! Позитивное настроение - это суперсила! 💪',
-            'Отлично! Попробуй зафиксировать это чувство в дневнике настроения 📔'
-        ],
-        '10/10': [
-            'Отлично! 10/10 - это прекрасно! Что особенно порадовало сегодня? 🎉',
-            'Супер! Настроение 10/10 - ты на вершине мира! 🌟',
-            '10 баллов из 10? Вот это да! Поделись секретом своего настроения! ✨'
-        ],
-        '9/10': [
-            'Почти идеально! 9/10 - отличный результат! 🌈',
-            'Прекрасно! С небольшим улучшением будет 10/10! 💪'
-        ],
-        '8/10': [
-            'Хорошо! 8/10 - это здорово! 🌟',
-            'Отличное настроение! Продолжай в том же духе! 😊'
-        ],
-        '7/10': [
-            'Неплохо! 7/10 - стабильно хорошо! 👍',
-            'Хороший день! Может быть, завтра будет ещё лучше! 🌈'
-        ],
-        '6/10': [
-            'Нормально! 6/10 - неплохо, но есть куда расти! 🌱',
-            'Середнячок! Может, добавить немного позитива в день? 🌞'
-        ],
-        '5/10': [
-            'Так себе день... 5/10 - нейтрально. Может, стоит отдохнуть? ☕',
-            'Серединка на половинку. Может, вечер порадует? 🌙'
-        ],
-        '4/10': [
-            'Не очень... 4/10 - может, стоит поделиться, что случилось? 💭',
-            'Сложный день? Иногда помогает просто выговориться. 👂'
-        ],
-        '3/10': [
-            'Тяжело... 3/10 - мне жаль это слышать. Хочешь рассказать? 😔',
-            'Сложный период? Помни, что это временно. 🌧️'
-        ],
-        '2/10': [
-            'Очень тяжело... 2/10 - я здесь, чтобы выслушать. 🤗',
-            'Такие дни бывают. Ты не одинок. 💪'
-        ],
-        '1/10': [
-            'Критично... 1/10 - может, стоит обратиться к кому-то близкому или специалисту? 🆘',
-            'Очень сложный день. Не бойся просить о помощи. ❤️'
-        ],
-        'стресс': [
-            'Попробуй технику глубокого дыхания: вдох на 4, задержка на 4, выдох на 6 🧘‍♀️',
-            'Стресс - временное состояние. Попробуй отвлечься на что-то приятное 🌿',
-            'Иногда помогает прогулка на свежем воздухе. Хоть 10 минут! 🚶‍♀️'
-        ],
-        'тревож': [
-            'Тревога - это нормально. Попробуй технику "5-4-3-2-1": назови 5 вещей, которые видишь, 4 - которые чувствуешь, 3 - которые слышишь, 2 - которые нюхаешь, 1 - пробуешь на вкус.',
-            'Попробуй заземлиться: почувствуй стул под собой, ноги на полу. Ты здесь и сейчас. 🌍',
-            'Иногда помогает записать тревожные мысли на бумагу 📝'
-        ],
-        'спасибо': [
-            'Всегда пожалуйста! Я рада, что могу быть полезной 😊',
-            'Благодарю тебя за доверие! 💖',
-            'Обращайся в любое время! ✨'
-        ],
-        'помощь': [
-            'Я могу: 1) Поболтать с тобой 2) Поддержать в сложный момент 3) Дать совет по управлению настроением 4) Помочь разобраться в эмоциях',
-            'Чем я могу помочь? Расскажи о своем настроении или спроси совета!',
-            'В нашем приложении ты можешь отслеживать настроение, ставить цели и отмечать радости дня!'
-        ],
-        'настроен': [
-            'Как твое настроение сегодня по шкале от 1 до 10? Попробуй оценить в календаре! 📊',
-            'Заметка о настроении сегодня может помочь лучше понять свои эмоции.',
-            'Просмотр статистики настроения в разделе "Анализ" помогает увидеть закономерности.'
-        ],
-        'что делать': [
-            'Попробуй: 1) Прогуляться 2) Послушать любимую музыку 3) Выпить чашку чая 4) Позвонить другу',
-            'Иногда помогает смена деятельности. Что ты обычно делаешь, чтобы поднять настроение?',
-            'Маленькие радости каждый день создают большие изменения! 🌟'
-        ],
-        'устал': [
-            'Отдохни немного. Ты заслуживаешь перерыва! ☕',
-            'Усталость - сигнал тела. Давай себе время на восстановление 🛋️',
-            'Попробуй короткий отдых: 15-20 минут могут творить чудеса!'
-        ],
-        'одиноко': [
-            'Ты не одинок в этом чувстве. Многие проходят через это 🌙',
-            'Попробуй связаться с кем-то близким, даже просто написать сообщение 💌',
-            'Иногда помогает заняться чем-то творческим: рисование, письмо, музыка 🎨'
-        ],
-        'радост': [
-            'Ого! Ты записываешь радости? Это так круто! 🌟 Что сегодня порадовало?',
-            'Копилка радостей — лучшее, что можно вести! Поделишься? ✨',
-            'Радости делают день ярче. Записывай их в дневник радостей! 💖'
-        ],
-        'lumi': [
-            'Lumi - это трекер настроения, который помогает понимать свои эмоции и улучшать ментальное здоровье! 🌈',
-            'В Lumi ты можешь: отслеживать настроение каждый день, смотреть статистику, ставить цели, отмечать радости!',
-            'Попробуй все функции Lumi: календарь настроения, анализ статистики, дневник радостей!'
-        ]
-    }
-    
-    # Ищем ключевые слова
-    for keyword, reply_list in responses.items():
-        if keyword in user_message_lower:
-            return random.choice(reply_list)
+    topic = FALLBACK_TOPICS.match(user_message)
+    if topic in FALLBACK_RESPONSES:
+        return random.choice(FALLBACK_RESPONSES[topic])
     
     # Общие ответы если не нашли ключевых слов
     general_responses = [
@@ -645,29 +352,28 @@ def get_fallback_response(user_message):
 
 def generate_smart_response(user_message, context, history):
     """Генерация умного ответа с учётом контекста и истории (без YandexGPT)"""
-    import random
-    user_message_lower = user_message.lower()
+    intent = SMART_REPLIES.match(user_message)
     
     # Приветствия
-    if any(w in user_message_lower for w in ['привет', 'здравствуй', 'доброе', 'хай']):
+    if intent == 'greeting':
         return f"Привет! Рада тебя видеть! 🌸 Как твоё настроение сегодня? {context}"
     
     # Вопросы о самочувствии
-    if any(w in user_message_lower for w in ['как дела', 'как настроение', 'как ты']):
+    if intent == 'how_are_you':
         if context:
             return f"У меня всё отлично, спасибо! А у тебя? {context}"
         return "У меня всё замечательно! А как твой день проходит? Расскажи! 💫"
     
     # Сложные эмоции
-    if any(w in user_message_lower for w in ['плохо', 'грустно', 'тяжело', 'устал', 'стресс']):
+    if intent == 'negative':
         return "Мне жаль это слышать 😔 Хочешь рассказать, что случилось? Я здесь, чтобы выслушать и поддержать. 🤗"
     
     # Позитивные эмоции
-    if any(w in user_message_lower for w in ['хорошо', 'отлично', 'прекрасно', 'радостно', 'счастлив']):
+    if intent == 'positive':
         return "Это замечательно! 😊 Расскажи, что тебя порадовало? Давай запишем это в копилку радостей! ✨"
     
     # Вопросы о возможностях
-    if any(w in user_message_lower for w in ['что ты умеешь', 'помощь', 'функции', 'можешь']):
+    if intent == 'capabilities':
         return """Я умею многое! 💫
 
 📊 **Анализировать настроение** — скажи «проанализируй мои данные»
@@ -679,11 +385,11 @@ def generate_smart_response(user_message, context, history):
 А ещё я просто могу с тобой поговорить и поддержать! Что хочешь? 🌸"""
     
     # Благодарности
-    if any(w in user_message_lower for w in ['спасибо', 'благодарю']):
+    if intent == 'thanks':
         return "Пожалуйста! Я всегда рада помочь. Обращайся в любое время! 💖"
     
     # Прощания
-    if any(w in user_message_lower for w in ['пока', 'до свидания', 'увидимся']):
+    if intent == 'goodbye':
         return "Пока! Хорошего дня! Заглядывай ещё — я всегда здесь, чтобы поддержать тебя. 🌈"
     
     # Обычный ответ (дружеский, поддерживающий)
@@ -728,14 +434,14 @@ def chatbot(conn):
     data = request.get_json()
     user_id = data.get('user_id')
     user_message = data.get('message', '').strip().lower()
-    print(f"DEBUG user_message: '{user_message}'")
 
     if not user_id or not user_message:
         return jsonify({'error': 'user_id или message отсутствуют'}), 400
 
     try:
         # Заметки
-        if "заметки" in user_message:
+        intent = CHATBOT_COMMANDS.match(user_message)
+        if intent == 'notes':
             notes = get_user_notes(conn, user_id)
             if notes:
                 notes_text = "\n".join([f"{n['date']}: {n['note']}" for n in notes])
@@ -744,10 +450,9 @@ def chatbot(conn):
                 return jsonify({'response': "У тебя пока нет заметок 😔"})
 
         # Цели
-        if any(word in user_message for word in ["цели", "задачи", "планы"]):
-            print("DEBUG: команда цели распознана")
+        if intent == 'goals':
             goals = get_user_goals(conn, user_id)
-            print(f"DEBUG: goals from DB: {goals}")
+            logger.debug("chatbot: цели пользователя %s, найдено %d", user_id, len(goals))
             if goals:
                 goals_text = "\n".join([
                     f"{g['created_at'].strftime('%d.%m.%Y') if isinstance(g['created_at'], datetime) else g['created_at']}: {g['text']} ({'выполнено' if g['completed'] else 'не выполнено'})"
@@ -765,7 +470,7 @@ def chatbot(conn):
         return jsonify({'response': final_response})
 
     except Exception as e:
-        print(f"Ошибка в chatbot: {e}")
+        logger.error("Ошибка в chatbot: %s", e)
         return jsonify({'response': get_fallback_response(user_message)})
 
 # ================== ОСНОВНЫЕ МАРШРУТЫ СТРАНИЦ ==================
@@ -815,26 +520,36 @@ def pool_status():
     try:
         from app import mysql_pool
         if mysql_pool:
-            return jsonify({
-                'status': 'active',
-                'pool_name': mysql_pool.pool_name,
-                'pool_size': mysql_pool.pool_size
-            })
+            return jsonify({'status': 'active', **mysql_pool.stats()})
         else:
             return jsonify({'status': 'not_initialized'})
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)})
 
+@main.route('/api/cache-status')
+@login_required
+def cache_status():
+    """Счётчики кэшей текущего воркера"""
+    return jsonify({'user_cache': user_cache.stats(), 'compressed_pages': compressed_pages.stats(),
+                    'llm_replies': llm_reply_cache.stats()})
+
 # ================== API МАРШРУТЫ ДЛЯ НАСТРОЕНИЯ ==================
 
 # ================== MOOD ENTRIES ==================
 @main.route('/api/mood_entries', methods=['GET', 'POST'])
 @login_required
+@conditional_get
 @with_db_connection
 def mood_entries(conn):
     if request.method == 'GET':
         try:
             date_filter = request.args.get('date')
+            paginated = not date_filter and not wants_full_list(request.args)
+            try:
+                page = parse_page_args(request.args) if paginated else None
+            except PaginationError as e:
+                return jsonify({'error': str(e)}), 400
+            next_token = None
             with conn.cursor(buffered=True, dictionary=True) as cursor:
                 if date_filter:
                     cursor.execute(
@@ -842,13 +557,21 @@ def mood_entries(conn):
                         "FROM mood_entries WHERE user_id = %s AND date = %s ORDER BY date DESC",
                         (current_user.id, date_filter)
                     )
+                    entries = cursor.fetchall()
+                elif paginated:
+                    entries, next_token = keyset_page(
+                        cursor,
+                        "SELECT id, user_id, date, mood, note, created_at "
+                        "FROM mood_entries WHERE user_id = %s",
+                        (current_user.id,), 'date', page
+                    )
                 else:
                     cursor.execute(
                         "SELECT id, user_id, date, mood, note, created_at "
                         "FROM mood_entries WHERE user_id = %s ORDER BY date DESC",
                         (current_user.id,)
                     )
-                entries = cursor.fetchall()
+                    entries = cursor.fetchall()
             for entry in entries:
                 if entry.get('mood') is not None:
                     entry['mood'] = float(entry['mood'])
@@ -856,9 +579,11 @@ def mood_entries(conn):
                     entry['date'] = entry['date'].isoformat()
                 if entry.get('created_at'):
                     entry['created_at'] = entry['created_at'].isoformat()
+            if paginated:
+                return jsonify({'items': entries, 'next': next_token})
             return jsonify(entries)
         except Error as e:
-            print(f"Database error in mood_entries GET: {e}")
+            logger.error("Database error in mood_entries GET: %s", e)
             return jsonify({'error': str(e)}), 500
     elif request.method == 'POST':
         try:
@@ -870,20 +595,34 @@ def mood_entries(conn):
             note = data.get('note', '')
             if not date or mood is None:
                 return jsonify({'error': 'Date and mood are required'}), 400
-            with conn.cursor(buffered=True) as cursor:
-                cursor.execute(
-                    """INSERT INTO mood_entries (user_id, date, mood, note)
-                    VALUES (%s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE mood = VALUES(mood), note = VALUES(note)""",
-                    (current_user.id, date, float(mood), note)
-                )
+            if note is not None and not isinstance(note, str):
+                return jsonify({'error': 'Note must be a string'}), 400
+            conn.start_transaction()
+            try:
+                with conn.cursor(buffered=True) as cursor:
+                    cursor.execute(
+                        "SELECT id, mood FROM mood_entries WHERE user_id = %s AND date = %s FOR UPDATE",
+                        (current_user.id, date)
+                    )
+                    existing = cursor.fetchone()
+                    cursor.execute(
+                        """INSERT INTO mood_entries (user_id, date, mood, note, note_sentiment)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE mood = VALUES(mood), note = VALUES(note),
+                            note_sentiment = VALUES(note_sentiment)""",
+                        (current_user.id, date, float(mood), note, note_sentiment(note))
+                    )
+                    new_id = existing[0] if existing else cursor.lastrowid
+                    # Сводка обновляется в той же транзакции, что и запись
+                    apply_mood_change(cursor, current_user.id, date,
+                                      existing[1] if existing else None, float(mood))
                 conn.commit()
-                cursor.execute("SELECT LAST_INSERT_ID() as id")
-                result = cursor.fetchone()
-                new_id = result[0] if result else None
+            except Exception:
+                conn.rollback()
+                raise
             return jsonify({'message': 'Настроение сохранено успешно', 'id': new_id})
         except Error as e:
-            print(f"Database error in mood_entries POST: {e}")
+            logger.error("Database error in mood_entries POST: %s", e)
             return jsonify({'error': str(e)}), 500
 
 @main.route('/api/mood_entries/<int:mood_id>', methods=['DELETE'])
@@ -891,16 +630,27 @@ def mood_entries(conn):
 @with_db_connection
 def delete_mood_entry(conn, mood_id):
     try:
-        cursor = conn.cursor(buffered=True)
-        cursor.execute(
-            "DELETE FROM mood_entries WHERE id = %s AND user_id = %s",
-            (mood_id, current_user.id)
-        )
-        conn.commit()
-        cursor.close()
+        conn.start_transaction()
+        try:
+            with conn.cursor(buffered=True) as cursor:
+                cursor.execute(
+                    "SELECT date, mood FROM mood_entries WHERE id = %s AND user_id = %s FOR UPDATE",
+                    (mood_id, current_user.id)
+                )
+                existing = cursor.fetchone()
+                if existing:
+                    cursor.execute(
+                        "DELETE FROM mood_entries WHERE id = %s AND user_id = %s",
+                        (mood_id, current_user.id)
+                    )
+                    apply_mood_change(cursor, current_user.id, existing[0], existing[1], None)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         return jsonify({'success': True})
     except Error as e:
-        print(f"Database error in delete_mood_entry: {e}")
+        logger.error("Database error in delete_mood_entry: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @main.route('/api/check-auth')
@@ -915,11 +665,14 @@ def check_auth():
 # ================== HOURLY MOODS ==================
 @main.route('/api/hourly_moods', methods=['GET', 'POST'])
 @login_required
+@conditional_get
 @with_db_connection
 def hourly_moods(conn):
     if request.method == 'GET':
         try:
             date_filter = request.args.get('date')
+            if not date_filter and (request.args.get('from') or request.args.get('to')):
+                return hourly_moods_range(conn)
             if not date_filter:
                 return jsonify({'error': 'Date parameter is required'}), 400
             cursor = conn.cursor(buffered=True, dictionary=True)
@@ -934,7 +687,7 @@ def hourly_moods(conn):
             cursor.close()
             return jsonify(entries)
         except Error as e:
-            print(f"Database error in hourly_moods GET: {e}")
+            logger.error("Database error in hourly_moods GET: %s", e)
             return jsonify({'error': str(e)}), 500
     elif request.method == 'POST':
         try:
@@ -958,9 +711,51 @@ def hourly_moods(conn):
             cursor.close()
             return jsonify({'message': 'Почасовое настроение сохранено успешно'})
         except Error as e:
-            print(f"Database error in hourly_moods POST: {e}")
+            logger.error("Database error in hourly_moods POST: %s", e)
             return jsonify({'error': str(e)}), 500
 
+HOURLY_RANGE_MAX_DAYS = 366
+HOURLY_BUCKETS = (1, 2, 3, 4, 6, 8, 12)
+
+def hourly_moods_range(conn):
+    """Почасовое настроение за период: {дата: {час: настроение}} одним запросом.
+
+    from/to — границы включительно, bucket — ширина интервала в часах,
+    значение интервала — среднее настроение, ключ — его первый час.
+    """
+    try:
+        date_from = datetime.strptime(request.args.get('from', ''), '%Y-%m-%d').date()
+        date_to = datetime.strptime(request.args.get('to', ''), '%Y-%m-%d').date()
+        bucket = int(request.args.get('bucket', 1))
+    except ValueError:
+        return jsonify({'error': 'Параметры from и to должны быть датами YYYY-MM-DD, bucket — числом'}), 400
+    if date_from > date_to:
+        return jsonify({'error': 'Параметр from должен быть не позже to'}), 400
+    if (date_to - date_from).days >= HOURLY_RANGE_MAX_DAYS:
+        return jsonify({'error': f'Период не может быть длиннее {HOURLY_RANGE_MAX_DAYS} дней'}), 400
+    if bucket not in HOURLY_BUCKETS:
+        return jsonify({'error': f"bucket должен быть одним из: {', '.join(map(str, HOURLY_BUCKETS))}"}), 400
+
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT date, FLOOR(hour / %s) * %s AS slot, AVG(mood) AS mood
+            FROM hourly_moods
+            WHERE user_id = %s AND date >= %s AND date <= %s
+            GROUP BY date, slot
+            ORDER BY date, slot
+        """, (bucket, bucket, current_user.id, date_from, date_to))
+        rows = cursor.fetchall()
+
+    days = {}
+    for entry_date, slot, mood in rows:
+        days.setdefault(entry_date.isoformat(), {})[int(slot)] = round(float(mood), 1)
+    return jsonify({
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'bucket': bucket,
+        'days': days
+    })
+
 @main.route('/api/hourly_moods/<int:mood_id>', methods=['DELETE'])
 @login_required
 @with_db_connection
@@ -975,27 +770,19 @@ def delete_hourly_mood(conn, mood_id):
         cursor.close()
         return jsonify({'success': True})
     except Error as e:
-        print(f"Database error in delete_hourly_mood: {e}")
+        logger.error("Database error in delete_hourly_mood: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @main.route('/api/stats')
 @login_required
+@conditional_get
 @with_db_connection
 def stats(conn):
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_entries,
-                AVG(mood) as avg_mood,
-                COUNT(CASE WHEN mood >= 7 THEN 1 END) as good_days
-            FROM mood_entries 
-            WHERE user_id = %s
-        """, (current_user.id,))
-        stats = cursor.fetchone()
-        cursor.close()
-        total_entries = stats['total_entries'] or 0
-        avg_mood = round(float(stats['avg_mood'] or 0), 1) if stats['avg_mood'] is not None else 0.0
+        with conn.cursor() as cursor:
+            stats = get_mood_rollup(cursor, current_user.id)
+        total_entries = stats['total'] or 0
+        avg_mood = round(stats['avg_mood'], 1) if stats['avg_mood'] is not None else 0.0
         good_days = stats['good_days'] or 0
         return jsonify({
             'total_entries': total_entries,
@@ -1004,11 +791,110 @@ def stats(conn):
             'current_streak': 0
         })
     except Error as e:
-        print(f"Database error in stats: {e}")
+        logger.error("Database error in stats: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+# Сколько целей и радостей месяца отдаёт /api/calendar для списков на странице
+# (счётчики по дням считаются по всем записям месяца)
+CALENDAR_LIST_LIMIT = 50
+
+@main.route('/api/calendar')
+@login_required
+@conditional_get(daily=True)
+@with_db_connection
+def calendar_month(conn):
+    """Данные календаря за месяц одним ответом: настроение, цели и радости
+    по дням, заметки, цели и радости месяца"""
+    month = request.args.get('month') or datetime.now().strftime('%Y-%m')
+    try:
+        first_day = datetime.strptime(month, '%Y-%m').date()
+    except ValueError:
+        return jsonify({'error': 'Параметр month должен быть в формате YYYY-MM'}), 400
+    next_month = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    period = (current_user.id, first_day, next_month)
+
+    days = {}
+
+    def day(value):
+        return days.setdefault(value.isoformat(), {'mood': None, 'has_note': False,
+                                                   'goals': 0, 'goals_done': 0, 'joys': 0})
+
+    try:
+        with conn.cursor(dictionary=True) as cursor:
+            cursor.execute("""
+                SELECT date, mood, (note IS NOT NULL AND note != '') AS has_note
+                FROM mood_entries
+                WHERE user_id = %s AND date >= %s AND date < %s
+            """, period)
+            for row in cursor.fetchall():
+                entry = day(row['date'])
+                entry['mood'] = float(row['mood'])
+                entry['has_note'] = bool(row['has_note'])
+
+            cursor.execute("""
+                SELECT DATE(created_at) AS day, COUNT(*) AS total, SUM(completed) AS done
+                FROM goals
+                WHERE user_id = %s AND created_at >= %s AND created_at < %s
+                GROUP BY DATE(created_at)
+            """, period)
+            for row in cursor.fetchall():
+                entry = day(row['day'])
+                entry['goals'] = int(row['total'])
+                entry['goals_done'] = int(row['done'] or 0)
+
+            cursor.execute("""
+                SELECT DATE(created_at) AS day, COUNT(*) AS total
+                FROM joys
+                WHERE user_id = %s AND created_at >= %s AND created_at < %s
+                GROUP BY DATE(created_at)
+            """, period)
+            for row in cursor.fetchall():
+                day(row['day'])['joys'] = int(row['total'])
+
+            cursor.execute("""
+                SELECT date, mood, note
+                FROM mood_entries
+                WHERE user_id = %s AND date >= %s AND date < %s
+                AND note IS NOT NULL AND note != ''
+                ORDER BY date DESC
+                LIMIT 10
+            """, period)
+            month_notes = [
+                {'date': row['date'].isoformat(), 'mood': float(row['mood']), 'note': row['note']}
+                for row in cursor.fetchall()
+            ]
+
+            cursor.execute("""
+                SELECT id, text, completed, date, created_at
+                FROM goals
+                WHERE user_id = %s AND created_at >= %s AND created_at < %s
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+            """, period + (CALENDAR_LIST_LIMIT,))
+            goals_data = cursor.fetchall()
+
+            cursor.execute("""
+                SELECT id, text, date, created_at
+                FROM joys
+                WHERE user_id = %s AND created_at >= %s AND created_at < %s
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+            """, period + (CALENDAR_LIST_LIMIT,))
+            joys_data = cursor.fetchall()
+        for item in goals_data + joys_data:
+            if item.get('date'):
+                item['date'] = item['date'].isoformat()
+            if item.get('created_at'):
+                item['created_at'] = item['created_at'].isoformat()
+        return jsonify({'month': first_day.strftime('%Y-%m'), 'days': days, 'notes': month_notes,
+                        'goals': goals_data, 'joys': joys_data})
+    except Error as e:
+        logger.error("Database error in calendar_month: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @main.route('/api/today_mood')
 @login_required
+@conditional_get(daily=True)
 @with_db_connection
 def today_mood(conn):
     try:
@@ -1028,10 +914,10 @@ def today_mood(conn):
         else:
             return jsonify({'mood': None, 'note': ''})
     except Error as e:
-        print(f"Database error in today_mood: {e}")
+        logger.error("Database error in today_mood: %s", e)
         return jsonify({'error': str(e)}), 500
     except Exception as e:
-        print(f"Unexpected error in today_mood: {e}")
+        logger.error("Unexpected error in today_mood: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # ================== API МАРШРУТЫ ДЛЯ ПРОФИЛЯ ==================
@@ -1062,9 +948,10 @@ def update_profile(conn):
         )
         conn.commit()
         cursor.close()
+        user_cache.invalidate(current_user.id)
         return jsonify({'message': 'Профиль успешно обновлен'})
     except Error as e:
-        print(f"Database error in update_profile: {e}")
+        logger.error("Database error in update_profile: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @main.route('/api/change_password', methods=['POST'])
@@ -1099,39 +986,58 @@ def change_password(conn):
         )
         conn.commit()
         cursor.close()
+        user_cache.invalidate(current_user.id)
         return jsonify({'message': 'Пароль успешно изменен'})
     except Error as e:
-        print(f"Database error in change_password: {e}")
+        logger.error("Database error in change_password: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # ================== API МАРШРУТЫ ДЛЯ ЦЕЛЕЙ ==================
 
 @main.route('/api/goals', methods=['GET', 'POST'])
 @login_required
+@conditional_get
 @with_db_connection
 def goals(conn):
     if request.method == 'GET':
         cursor = None
         try:
-            cursor = conn.cursor(dictionary=True, buffered=True)
             date = request.args.get('date')
+            paginated = not date and not wants_full_list(request.args)
+            try:
+                page = parse_page_args(request.args, 'datetime') if paginated else None
+            except PaginationError as e:
+                return jsonify({'error': str(e)}), 400
+            next_token = None
+            cursor = conn.cursor(dictionary=True, buffered=True)
             if date:
                 cursor.execute(
-                    "SELECT id, user_id, text, completed, created_at FROM goals WHERE user_id = %s AND date = %s ORDER BY created_at DESC",
+                    "SELECT id, user_id, text, completed, date, created_at FROM goals WHERE user_id = %s AND date = %s ORDER BY created_at DESC",
                     (current_user.id, date)
                 )
+                goals_data = cursor.fetchall()
+            elif paginated:
+                goals_data, next_token = keyset_page(
+                    cursor,
+                    "SELECT id, user_id, text, completed, date, created_at FROM goals WHERE user_id = %s",
+                    (current_user.id,), 'created_at', page
+                )
             else:
                 cursor.execute(
-                    "SELECT id, user_id, text, completed, created_at FROM goals WHERE user_id = %s ORDER BY created_at DESC",
+                    "SELECT id, user_id, text, completed, date, created_at FROM goals WHERE user_id = %s ORDER BY created_at DESC",
                     (current_user.id,)
                 )
-            goals_data = cursor.fetchall()
+                goals_data = cursor.fetchall()
             for goal in goals_data:
+                if goal.get('date'):
+                    goal['date'] = goal['date'].isoformat()
                 if 'created_at' in goal and goal['created_at']:
                     goal['created_at'] = goal['created_at'].isoformat()
+            if paginated:
+                return jsonify({'items': goals_data, 'next': next_token})
             return jsonify(goals_data)
         except Error as e:
-            print(f"Database error in goals GET: {e}")
+            logger.error("Database error in goals GET: %s", e)
             return jsonify({'error': str(e)}), 500
         finally:
             if cursor:
@@ -1160,7 +1066,7 @@ def goals(conn):
                 'user_id': current_user.id
             })
         except Error as e:
-            print(f"Database error in goals POST: {e}")
+            logger.error("Database error in goals POST: %s", e)
             return jsonify({'error': str(e)}), 500
         finally:
             if cursor:
@@ -1182,7 +1088,7 @@ def update_goal_status(conn, goal_id):
         conn.commit()
         return jsonify({"success": True})
     except Error as e:
-        print(f"Database error in update_goal_status: {e}")
+        logger.error("Database error in update_goal_status: %s", e)
         return jsonify({'error': str(e)}), 500
     finally:
         if cursor:
@@ -1206,7 +1112,7 @@ def patch_goal(conn, goal_id):
         conn.commit()
         return jsonify({'success': True})
     except Error as e:
-        print(f"Database error in patch_goal: {e}")
+        logger.error("Database error in patch_goal: %s", e)
         return jsonify({'error': str(e)}), 500
     finally:
         cursor.close()
@@ -1225,7 +1131,7 @@ def toggle_goal(conn, goal_id):
         conn.commit()
         return jsonify({'success': True})
     except Error as e:
-        print(f"Database error in toggle_goal: {e}")
+        logger.error("Database error in toggle_goal: %s", e)
         return jsonify({'error': str(e)}), 500
     finally:
         if cursor:
@@ -1245,7 +1151,7 @@ def delete_goal(conn, goal_id):
         conn.commit()
         return jsonify({'success': True})
     except Error as e:
-        print(f"Database error in delete_goal: {e}")
+        logger.error("Database error in delete_goal: %s", e)
         return jsonify({'error': str(e)}), 500
     finally:
         if cursor:
@@ -1254,30 +1160,48 @@ def delete_goal(conn, goal_id):
 # ================== API МАРШРУТЫ ДЛЯ РАДОСТЕЙ ==================
 @main.route('/api/joys', methods=['GET', 'POST'])
 @login_required
+@conditional_get
 @with_db_connection
 def joys(conn):
     if request.method == 'GET':
         cursor = None
         try:
-            cursor = conn.cursor(dictionary=True, buffered=True)
             date = request.args.get('date')
+            paginated = not date and not wants_full_list(request.args)
+            try:
+                page = parse_page_args(request.args, 'datetime') if paginated else None
+            except PaginationError as e:
+                return jsonify({'error': str(e)}), 400
+            next_token = None
+            cursor = conn.cursor(dictionary=True, buffered=True)
             if date:
                 cursor.execute(
-                    "SELECT id, user_id, text, created_at FROM joys WHERE user_id = %s AND date = %s ORDER BY created_at DESC",
+                    "SELECT id, user_id, text, date, created_at FROM joys WHERE user_id = %s AND date = %s ORDER BY created_at DESC",
                     (current_user.id, date)
                 )
+                joys_data = cursor.fetchall()
+            elif paginated:
+                joys_data, next_token = keyset_page(
+                    cursor,
+                    "SELECT id, user_id, text, date, created_at FROM joys WHERE user_id = %s",
+                    (current_user.id,), 'created_at', page
+                )
             else:
                 cursor.execute(
-                    "SELECT id, user_id, text, created_at FROM joys WHERE user_id = %s ORDER BY created_at DESC",
+                    "SELECT id, user_id, text, date, created_at FROM joys WHERE user_id = %s ORDER BY created_at DESC",
                     (current_user.id,)
                 )
-            joys_data = cursor.fetchall()
+                joys_data = cursor.fetchall()
             for joy in joys_data:
+                if joy.get('date'):
+                    joy['date'] = joy['date'].isoformat()
                 if joy.get('created_at'):
                     joy['created_at'] = joy['created_at'].isoformat()
+            if paginated:
+                return jsonify({'items': joys_data, 'next': next_token})
             return jsonify(joys_data)
         except Error as e:
-            print(f"Database error in joys GET: {e}")
+            logger.error("Database error in joys GET: %s", e)
             return jsonify({'error': str(e)}), 500
         finally:
             if cursor:
@@ -1305,7 +1229,7 @@ def joys(conn):
                 'user_id': current_user.id
             })
         except Error as e:
-            print(f"Database error in joys POST: {e}")
+            logger.error("Database error in joys POST: %s", e)
             return jsonify({'error': str(e)}), 500
         finally:
             if cursor:
@@ -1325,7 +1249,7 @@ def delete_joy(conn, joy_id):
         conn.commit()
         return jsonify({'success': True})
     except Error as e:
-        print(f"Database error in delete_joy: {e}")
+        logger.error("Database error in delete_joy: %s", e)
         return jsonify({'error': str(e)}), 500
     finally:
         if cursor:
@@ -1334,107 +1258,203 @@ def delete_joy(conn, joy_id):
 # ================== API ДЛЯ ЗАГРУЗКИ АВАТАРА ==================
 @main.route('/api/upload_avatar', methods=['POST'])
 @login_required
-@with_db_connection
-def upload_avatar(conn):
+def upload_avatar():
+    """Приём аватара: проверка размера и формата в запросе, рендиции — в фоновом потоке"""
+    if 'avatar' not in request.files:
+        return jsonify({'error': 'Файл не выбран'}), 400
+    file = request.files['avatar']
+    if file.filename == '':
+        return jsonify({'error': 'Файл не выбран'}), 400
+    if not file.content_type.startswith('image/'):
+        return jsonify({'error': 'Файл должен быть изображением'}), 400
+    data = file.read(AVATAR_MAX_BYTES + 1)
+    if len(data) > AVATAR_MAX_BYTES:
+        return jsonify({'error': f'Файл слишком большой (макс. {AVATAR_MAX_BYTES // (1024 * 1024)}MB)'}), 413
     try:
-        if 'avatar' not in request.files:
-            return jsonify({'error': 'Файл не выбран'}), 400
-        file = request.files['avatar']
-        if file.filename == '':
-            return jsonify({'error': 'Файл не выбран'}), 400
-        if not file.content_type.startswith('image/'):
-            return jsonify({'error': 'Файл должен быть изображением'}), 400
-        avatars_dir = os.path.join(current_app.root_path, 'static', 'avatars')
-        os.makedirs(avatars_dir, exist_ok=True)
-        import time
-        filename = f"avatar_{current_user.id}_{int(time.time())}.jpg"
-        filepath = os.path.join(avatars_dir, filename)
-        file.save(filepath)
-        cursor = None
-        try:
-            cursor = conn.cursor(buffered=True)
-            avatar_path = f"avatars/{filename}"
-            cursor.execute(
-                "UPDATE users SET avatar_path = %s WHERE id = %s",
-                (avatar_path, current_user.id)
-            )
-            conn.commit()
-            return jsonify({'message': 'Аватар успешно загружен', 'path': avatar_path})
-        except Error as e:
-            print(f"Database error in upload_avatar: {e}")
-            return jsonify({'error': str(e)}), 500
-        finally:
-            if cursor:
-                cursor.close()
-    except Exception as e:
-        print(f"Error in upload_avatar: {e}")
-        return jsonify({'error': 'Ошибка загрузки файла'}), 500
+        check_avatar(data)
+    except AvatarError as e:
+        return jsonify({'error': str(e)}), 400
+    avatars_dir = os.path.join(current_app.root_path, 'static', 'avatars')
+    os.makedirs(avatars_dir, exist_ok=True)
+    submit_avatar(current_user.id, data, avatars_dir)
+    return jsonify({'message': 'Аватар загружен и обрабатывается', 'status': 'processing'}), 202
 
 # ================== ЭКСПОРТ В CSV ==================
+EXPORT_CHUNK_ROWS = 500
+
+def _format_timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else ''
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%d') if value else ''
+
+def _format_symptoms(value):
+    if not value:
+        return ''
+    try:
+        return '; '.join(json.loads(value))
+    except (ValueError, TypeError):
+        return value
+
+# Разделы экспорта: заголовок, шапка таблицы, запрос и преобразование строки
+EXPORT_SECTIONS = [
+    (
+        '=== НАСТРОЕНИЕ ===',
+        ['Дата', 'Настроение (1-10)', 'Заметка', 'Дата создания'],
+        "SELECT date, mood, note, created_at FROM mood_entries WHERE user_id = %s ORDER BY date",
+        lambda row: [_format_date(row[0]), float(row[1]) if row[1] else '', row[2] or '', _format_timestamp(row[3])]
+    ),
+    (
+        '=== ПОЧАСОВОЕ НАСТРОЕНИЕ ===',
+        ['Дата', 'Час', 'Настроение (1-10)', 'Заметка'],
+        "SELECT date, hour, mood, note FROM hourly_moods WHERE user_id = %s ORDER BY date, hour",
+        lambda row: [_format_date(row[0]), row[1], row[2], row[3] or '']
+    ),
+    (
+        '=== ЦЕЛИ ===',
+        ['Текст цели', 'Статус', 'Дата создания'],
+        "SELECT text, completed, created_at FROM goals WHERE user_id = %s ORDER BY created_at",
+        lambda row: [row[0], 'Выполнено' if row[1] else 'Не выполнено', _format_timestamp(row[2])]
+    ),
+    (
+        '=== РАДОСТИ ===',
+        ['Текст', 'Дата создания'],
+        "SELECT text, created_at FROM joys WHERE user_id = %s ORDER BY created_at",
+        lambda row: [row[0], _format_timestamp(row[1])]
+    ),
+    (
+        '=== ДНЕВНИК ЦИКЛА ===',
+        ['Дата', 'День цикла', 'Выделения', 'Симптомы', 'Настроение', 'Заметки'],
+        "SELECT date, cycle_day, flow_intensity, symptoms, mood, notes FROM cycle_entries WHERE user_id = %s ORDER BY date",
+        lambda row: [_format_date(row[0]), row[1] if row[1] is not None else '', row[2] or '',
+                     _format_symptoms(row[3]), row[4] if row[4] is not None else '', row[5] or '']
+    ),
+]
+
+def _csv_chunk(rows):
+    """Строки CSV одним куском текста"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+def generate_export(conn, user_id, header_rows):
+    """CSV-экспорт по частям: каждый раздел читается небуферизованным курсором
+    порциями по EXPORT_CHUNK_ROWS строк, в памяти одновременно одна порция."""
+    yield _csv_chunk(header_rows)
+    try:
+        for title, columns, query, convert in EXPORT_SECTIONS:
+            yield _csv_chunk([[], [title], columns])
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, (user_id,))
+                while True:
+                    rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+                    if not rows:
+                        break
+                    yield _csv_chunk(convert(row) for row in rows)
+            finally:
+                cursor.close()
+    except Error as e:
+        # Заголовки уже отправлены — отметить обрыв в самом файле
+        logger.error("Database error in export_data stream: %s", e)
+        yield _csv_chunk([[], ['=== ЭКСПОРТ ПРЕРВАН ИЗ-ЗА ОШИБКИ ===']])
+
 @main.route('/api/export/data')
 @login_required
 @with_db_connection
 def export_data(conn):
+    header_rows = [
+        ['Lumi - Экспорт данных'],
+        ['Пользователь:', f"{current_user.first_name or ''} {current_user.last_name or ''}".strip()],
+        ['Логин:', current_user.username],
+        ['Дата экспорта:', datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
+    ]
+    # Соединение запроса (g.db_conn) возвращается в пул в teardown,
+    # а stream_with_context держит контекст до конца генератора
+    return current_app.response_class(
+        stream_with_context(generate_export(conn, current_user.id, header_rows)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename=lumi_export_{datetime.now().strftime("%Y%m%d_%H%M")}.csv'}
+    )
+
+@main.route('/api/import', methods=['POST'])
+@login_required
+@with_db_connection
+def import_data(conn):
+    """Импорт истории: CSV в формате экспорта или NDJSON.
+
+    Файл передаётся полем file (multipart) или телом запроса. Формат берётся
+    из ?format=csv|ndjson, иначе из расширения файла или Content-Type.
+    С ?progress=1 ответ — поток NDJSON с отчётом после каждой пачки.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        binary_stream = upload.stream
+        hint = (upload.filename or '').lower()
+    else:
+        binary_stream = request.stream
+        hint = request.mimetype or ''
+
+    fmt = request.args.get('format')
+    if not fmt:
+        fmt = 'ndjson' if ('ndjson' in hint or 'jsonl' in hint) else 'csv'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Поддерживаются форматы csv и ndjson'}), 400
+
+    text_stream = open_text_stream(binary_stream)
+    records = iter_csv_records(text_stream) if fmt == 'csv' else iter_ndjson_records(text_stream)
+    progress = run_import(conn, current_user.id, records)
+
+    if request.args.get('progress') == '1':
+        def stream_progress():
+            try:
+                for report in progress:
+                    yield json.dumps(report, ensure_ascii=False) + '\n'
+                # Версия поднята ещё при отдаче заголовков, до записи строк
+                data_changed(conn, current_user.id)
+            except (Error, UnicodeDecodeError, csv.Error) as e:
+                logger.error("Import failed for user %s: %s", current_user.id, e)
+                yield json.dumps({'done': True, 'failed': True, 'error': str(e)}, ensure_ascii=False) + '\n'
+        return current_app.response_class(stream_with_context(stream_progress()), mimetype='application/x-ndjson')
+
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT date, mood, note, created_at 
-            FROM mood_entries 
-            WHERE user_id = %s 
-            ORDER BY date
-        """, (current_user.id,))
-        mood_data = cursor.fetchall()
-        cursor.execute("""
-            SELECT text, completed, created_at 
-            FROM goals 
-            WHERE user_id = %s 
-            ORDER BY created_at
-        """, (current_user.id,))
-        goals_data = cursor.fetchall()
-        cursor.execute("""
-            SELECT text, created_at 
-            FROM joys 
-            WHERE user_id = %s 
-            ORDER BY created_at
-        """, (current_user.id,))
-        joys_data = cursor.fetchall()
-        cursor.close()
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Lumi - Экспорт данных'])
-        writer.writerow(['Пользователь:', f"{current_user.first_name or ''} {current_user.last_name or ''}".strip()])
-        writer.writerow(['Логин:', current_user.username])
-        writer.writerow(['Дата экспорта:', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
-        writer.writerow([])
-        writer.writerow(['=== НАСТРОЕНИЕ ==='])
-        writer.writerow(['Дата', 'Настроение (1-10)', 'Заметка', 'Дата создания'])
-        for entry in mood_data:
-            date = entry['date'].strftime('%Y-%m-%d') if entry['date'] else ''
-            created_at = entry['created_at'].strftime('%Y-%m-%d %H:%M') if entry['created_at'] else ''
-            writer.writerow([date, float(entry['mood']) if entry['mood'] else '', entry.get('note', ''), created_at])
-        writer.writerow([])
-        writer.writerow(['=== ЦЕЛИ ==='])
-        writer.writerow(['Текст цели', 'Статус', 'Дата создания'])
-        for goal in goals_data:
-            status = 'Выполнено' if goal['completed'] else 'Не выполнено'
-            created_at = goal['created_at'].strftime('%Y-%m-%d %H:%M') if goal['created_at'] else ''
-            writer.writerow([goal['text'], status, created_at])
-        writer.writerow([])
-        writer.writerow(['=== РАДОСТИ ==='])
-        writer.writerow(['Текст', 'Дата создания'])
-        for joy in joys_data:
-            created_at = joy['created_at'].strftime('%Y-%m-%d %H:%M') if joy['created_at'] else ''
-            writer.writerow([joy['text'], created_at])
-        output.seek(0)
-        response = current_app.response_class(
-            output,
-            mimetype='text/csv',
-            headers={'Content-Disposition': f'attachment; filename=lumi_export_{datetime.now().strftime("%Y%m%d_%H%M")}.csv'}
-        )
-        return response
+        report = None
+        for report in progress:
+            pass
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': f'Не удалось прочитать файл: {e}'}), 400
     except Error as e:
-        print(f"Database error in export_data: {e}")
+        logger.error("Database error in import_data: %s", e)
         return jsonify({'error': str(e)}), 500
+    logger.info("Import for user %s: %d rows, %d errors", current_user.id, report['rows'], report['errors'])
+    return jsonify(report)
+
+@main.route('/api/batch', methods=['POST'])
+@login_required
+@with_db_connection
+def batch(conn):
+    """Пакет операций над записями дня в одной транзакции.
+
+    Тело: {"operations": [{"resource": "goals", "op": "create", "data": {...}}, ...]}.
+    Ответ: {"results": [...]} в порядке операций. Если хотя бы одна операция
+    не прошла проверку, ничего не выполняется и возвращается 400.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Нужен непустой список operations'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'Не больше {MAX_BATCH_OPERATIONS} операций за запрос'}), 400
+
+    validated, errors = validate_batch(operations, current_user.id)
+    if errors:
+        return jsonify({'error': 'Некорректные операции', 'errors': errors}), 400
+    try:
+        results = run_batch(conn, current_user.id, validated)
+    except Error as e:
+        logger.error("Database error in batch: %s", e)
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'results': results})
 
 @main.route('/api/delete_avatar', methods=['DELETE'])
 @login_required
@@ -1444,13 +1464,15 @@ def delete_avatar(conn):
     try:
         cursor = conn.cursor(buffered=True)
         cursor.execute(
-            "UPDATE users SET avatar_path = NULL WHERE id = %s",
+            "UPDATE users SET avatar_path = NULL, avatar_renditions = NULL WHERE id = %s",
             (current_user.id,)
         )
         conn.commit()
+        user_cache.invalidate(current_user.id)
+        submit_garbage_collection(os.path.join(current_app.root_path, 'static', 'avatars'))
         return jsonify({'message': 'Аватар успешно удален'})
     except Error as e:
-        print(f"Database error in delete_avatar: {e}")
+        logger.error("Database error in delete_avatar: %s", e)
         return jsonify({'error': str(e)}), 500
     finally:
         if cursor:
@@ -1459,32 +1481,44 @@ def delete_avatar(conn):
 # ================== API МАРШРУТЫ ДЛЯ МЕНСТРУАЛЬНОГО ЦИКЛА ==================
 @main.route('/api/cycle_entries', methods=['GET', 'POST'])
 @login_required
+@conditional_get
 @with_db_connection
 def cycle_entries(conn):
     if request.method == 'GET':
         try:
             date_filter = request.args.get('date')
+            paginated = not date_filter and not wants_full_list(request.args)
+            try:
+                page = parse_page_args(request.args) if paginated else None
+            except PaginationError as e:
+                return jsonify({'error': str(e)}), 400
+            next_token = None
             query = """
                 SELECT id, user_id, date, cycle_day, symptoms, flow_intensity, mood, notes
                 FROM cycle_entries
                 WHERE user_id = %s
             """
             params = [current_user.id]
-            if date_filter:
-                query += " AND date = %s"
-                params.append(date_filter)
-            else:
-                query += " ORDER BY date DESC"
             with conn.cursor(dictionary=True) as cursor:
-                cursor.execute(query, params)
-                entries = cursor.fetchall()
+                if paginated:
+                    entries, next_token = keyset_page(cursor, query, params, 'date', page)
+                else:
+                    if date_filter:
+                        query += " AND date = %s"
+                        params.append(date_filter)
+                    else:
+                        query += " ORDER BY date DESC"
+                    cursor.execute(query, params)
+                    entries = cursor.fetchall()
             for entry in entries:
                 entry['symptoms'] = json.loads(entry['symptoms']) if entry.get('symptoms') else []
                 if entry.get('date'):
                     entry['date'] = entry['date'].isoformat()
+            if paginated:
+                return jsonify({'items': entries, 'next': next_token})
             return jsonify(entries)
         except Error as e:
-            print(f"Database error in cycle_entries GET: {e}")
+            logger.error("Database error in cycle_entries GET: %s", e)
             return jsonify({'error': str(e)}), 500
     elif request.method == 'POST':
         try:
@@ -1514,7 +1548,7 @@ def cycle_entries(conn):
                 conn.commit()
             return jsonify({'message': 'Данные цикла сохранены успешно'})
         except Error as e:
-            print(f"Database error in cycle_entries POST: {e}")
+            logger.error("Database error in cycle_entries POST: %s", e)
             return jsonify({'error': str(e)}), 500
 
 @main.route('/api/cycle_entries/<date>', methods=['DELETE'])
@@ -1531,11 +1565,12 @@ def delete_cycle_entry(conn, date):
             conn.commit()
         return jsonify({'success': True, 'deleted': deleted})
     except Error as e:
-        print(f"Database error in delete_cycle_entry: {e}")
+        logger.error("Database error in delete_cycle_entry: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @main.route('/api/cycle_settings', methods=['GET', 'PUT'])
 @login_required
+@conditional_get
 @with_db_connection
 def cycle_settings(conn):
     if request.method == 'GET':
@@ -1547,7 +1582,7 @@ def cycle_settings(conn):
                 settings['last_period_start'] = settings['last_period_start'].isoformat()
             return jsonify(settings or {})
         except Error as e:
-            print(f"Database error in cycle_settings GET: {e}")
+            logger.error("Database error in cycle_settings GET: %s", e)
             return jsonify({'error': str(e)}), 500
     elif request.method == 'PUT':
         try:
@@ -1590,12 +1625,13 @@ def cycle_settings(conn):
                 conn.commit()
             return jsonify({'message': 'Настройки цикла обновлены'})
         except Error as e:
-            print(f"Database error in cycle_settings PUT: {e}")
+            logger.error("Database error in cycle_settings PUT: %s", e)
             return jsonify({'error': str(e)}), 500
 
 # ================== CYCLE STATS ==================
 @main.route('/api/cycle_stats')
 @login_required
+@conditional_get
 @with_db_connection
 def cycle_stats(conn):
     try:
@@ -1615,12 +1651,13 @@ def cycle_stats(conn):
             'period_days': stats.get('period_days', 0)
         })
     except Error as e:
-        print(f"Database error in cycle_stats: {e}")
+        logger.error("Database error in cycle_stats: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # ================== CYCLE PREDICTIONS ==================
 @main.route('/api/cycle_predictions')
 @login_required
+@conditional_get(daily=True)
 @with_db_connection
 def cycle_predictions(conn):
     try:
@@ -1630,7 +1667,7 @@ def cycle_predictions(conn):
             cursor.execute("SELECT * FROM cycle_settings WHERE user_id = %s", (current_user.id,))
             settings = cursor.fetchone()
         except Error as e:
-            print(f"Database error in cycle_predictions: {e}")
+            logger.error("Database error in cycle_predictions: %s", e)
             return jsonify({'error': str(e)}), 500
         finally:
             if cursor:
@@ -1659,12 +1696,123 @@ def cycle_predictions(conn):
             'current_cycle_day': current_cycle_day
         })
     except Error as e:
-        print(f"Database error in cycle_predictions: {e}")
+        logger.error("Database error in cycle_predictions: %s", e)
         return jsonify({'error': str(e)}), 500
     except Exception as e:
-        print(f"Unexpected error in cycle_predictions: {e}")
+        logger.error("Unexpected error in cycle_predictions: %s", e)
         return jsonify({'error': str(e)}), 500
 
+# ================== ОТВЕТЫ YANDEXGPT: JSON, ЗАДАЧА ИЛИ SSE ==================
+
+# Поток SSE занимает воркер на всё время генерации. С sync-воркерами gunicorn
+# из Procfile это недопустимо, поэтому по умолчанию виджет получает фоновую
+# задачу (202) и опрашивает её. LLM_SSE=1 включать только вместе с асинхронным
+# классом воркеров (gunicorn -k gevent или eventlet).
+LLM_SSE_ENABLED = os.getenv('LLM_SSE') == '1'
+
+def wants_async_job():
+    """Prefer: respond-async — ответ готовится в фоновой задаче, клиент опрашивает её"""
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+def wants_event_stream():
+    """Клиент просит text/event-stream и поток включён (LLM_SSE=1); иначе SSE не отдаётся"""
+    return LLM_SSE_ENABLED and any(mimetype == 'text/event-stream' for mimetype, _ in request.accept_mimetypes)
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def llm_reply(prompt, fallback, fields, temperature=0.7, max_tokens=300, user_id=None, kind=None):
+    """Ответ модели на prompt: JSON, фоновая задача (202) или поток SSE.
+
+    fallback() даёт запасной текст, если модель недоступна. С kind ответ
+    берётся из кэша анализов (user_id, kind, промпт). Поток SSE: события
+    token с {"text": приращение}, в конце done с fields и полным reply.
+    """
+    if not wants_event_stream() and not wants_async_job():
+        if kind:
+            reply = llm_client.complete_cached(user_id, kind, prompt, temperature=temperature, max_tokens=max_tokens)
+        else:
+            reply = llm_client.complete_or_none(prompt, temperature=temperature, max_tokens=max_tokens)
+        return jsonify({'reply': reply if reply is not None else fallback(), **fields})
+
+    if kind:
+        parts_source = llm_client.stream_cached(user_id, kind, prompt, temperature=temperature, max_tokens=max_tokens)
+    else:
+        parts_source = llm_client.stream(prompt, temperature=temperature, max_tokens=max_tokens)
+
+    if not wants_event_stream():
+        return submit_reply_job(parts_source, fallback, fields)
+
+    def generate():
+        parts = []
+        done = dict(fields)
+        try:
+            for part in parts_source:
+                parts.append(part)
+                yield _sse('token', {'text': part})
+        except LLMUnavailable as e:
+            logger.error("YandexGPT недоступен: %s", e)
+            if parts:
+                done['truncated'] = True
+            else:
+                parts.append(fallback())
+                yield _sse('token', {'text': parts[0]})
+        done['reply'] = ''.join(parts).strip()
+        yield _sse('done', done)
+
+    # Без stream_with_context: контекст запроса (и соединение с БД) освобождается
+    # до начала потока, пока идёт генерация ответа
+    return current_app.response_class(generate(), mimetype='text/event-stream',
+                                      headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def submit_reply_job(parts, fallback, fields):
+    """Генерация в llm_executor: sync-воркер сразу освобождается, клиент опрашивает задачу"""
+    conn = get_db()
+    if conn is None:
+        return jsonify({'error': 'Ошибка подключения к БД'}), 500
+    job_id = create_job(conn, current_user.id, fields)
+    try:
+        llm_executor.submit(current_user.id, run_reply_job, job_id, parts, fallback)
+    except QueueFull as e:
+        logger.warning("Задача ответа отклонена: %s", e)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "UPDATE llm_jobs SET status = 'failed', error = %s, finished_at = NOW() WHERE id = %s",
+                (str(e)[:255], job_id)
+            )
+        response = jsonify({'error': 'Ася сейчас занята, попробуй через пару секунд', 'success': False})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    poll_url = url_for('main.chat_job', job_id=job_id)
+    response = jsonify({'job_id': job_id, 'status': 'queued', 'poll_url': poll_url})
+    response.status_code = 202
+    response.headers['Location'] = poll_url
+    return response
+
+@main.route('/api/chat/jobs/<job_id>')
+@login_required
+@with_db_connection
+def chat_job(conn, job_id):
+    """Состояние задачи ответа: reply растёт по мере генерации, в конце — status done"""
+    job = get_job(conn, job_id, current_user.id)
+    if job is None:
+        return jsonify({'error': 'Задача не найдена'}), 404
+    result = {'job_id': job['id'], 'status': job['status'], 'reply': job['reply'] or ''}
+    if job['status'] == 'done':
+        result.update(json.loads(job['fields'] or '{}'))
+        if job['error'] == 'truncated':
+            result['truncated'] = True
+    elif job['status'] == 'failed':
+        result.update({'success': False, 'error': job['error']})
+    return jsonify(result)
+
+@main.route('/api/jobs-status')
+@login_required
+def jobs_status():
+    """Счётчики очереди задач YandexGPT текущего воркера"""
+    return jsonify({'llm': llm_executor.stats()})
+
 # ================== УМНЫЙ ЧАТ-БОТ С ИНТЕГРИРОВАННЫМ АНАЛИЗОМ ==================
 
 @main.route('/api/chat', methods=['POST'])
@@ -1676,23 +1824,11 @@ def chat_with_asya():
         user_message = data.get('message', '').strip()
         history = data.get('history', [])
 
-        # ===== ВРЕМЕННАЯ ОТЛАДКА - ПОСМОТРИМ ЧТО ПРИХОДИТ =====
         api_key = os.environ.get('YANDEX_API_KEY')
-        folder_id = os.environ.get('YANDEX_FOLDER_ID')
-
-        # ВЫВОДИМ В ЛОГИ (ЭТО ВАЖНО!)
-        print("=" * 50)
-        print("🔍 ОТЛАДКА YANDEXGPT:")
-        print(f"API_KEY exists: {bool(api_key)}")
-        print(f"API_KEY length: {len(api_key) if api_key else 0}")
-        print(f"API_KEY first 10 chars: {api_key[:10] if api_key else 'None'}...")
-        print(f"FOLDER_ID: {folder_id}")
-        print(f"FOLDER_ID type: {type(folder_id)}")
-        print("=" * 50)
         
-        # Проверяем, есть ли ключ и папка
+        # Проверяем, есть ли ключ
         if not api_key:
-            print("❌ ОШИБКА: YANDEX_API_KEY не найдена в переменных окружения!")
+            logger.error("YANDEX_API_KEY не найдена в переменных окружения")
             return jsonify({'reply': 'Ошибка: API ключ не настроен', 'success': False})
 
         
@@ -1703,52 +1839,20 @@ def chat_with_asya():
             })
         
         # ===== ПРОВЕРКА КОМАНД ДЛЯ РАСШИРЕННОГО АНАЛИЗА =====
-        user_message_lower = user_message.lower()
-        
-        # Анализ данных
-        analysis_commands = [
-            'проанализируй', 'анализ данных', 'статистика', 'отчет', 
-            'анализируй мои данные', 'покажи статистику', 'дай отчет',
-            'как у меня дела', 'расскажи о моем настроении', 'обзор данных',
-            'проанализировать', 'отчёт', 'статистику', 'анализ', 'аналитику',
-            'что с моим настроением', 'как я себя чувствую по данным'
-        ]
-        if any(cmd in user_message_lower for cmd in analysis_commands):
-            print(f"🔍 Пользователь запросил анализ: {user_message}")
+        intent = CHAT_COMMANDS.match(user_message)
+        if intent is not None:
+            logger.debug("Чат: намерение %s", intent)
+        if intent == 'deep_analysis':
             return generate_deep_analysis(current_user.id)
-        
-        # Паттерны
-        pattern_commands = [
-            'паттерны', 'закономерности', 'тренды', 'график', 
-            'какие дни', 'в какое время', 'когда у меня',
-            'дни недели', 'по дням', 'по времени', 'закономерность',
-            'какой день', 'во сколько'
-        ]
-        if any(cmd in user_message_lower for cmd in pattern_commands):
-            print(f"📊 Пользователь запросил паттерны: {user_message}")
+        if intent == 'patterns':
             return analyze_patterns(current_user.id, user_message)
-        
-        # Заметки
-        notes_commands = ['заметки', 'мои записи', 'что я писал', 'дневник', 'заметок', 'записи', 'текст']
-        if any(cmd in user_message_lower for cmd in notes_commands):
-            print(f"📝 Пользователь запросил заметки: {user_message}")
+        if intent == 'notes':
             return analyze_notes(current_user.id, user_message)
-        
-        # Радости
-        joys_commands = ['радости', 'радость', 'joys', 'что меня радует', 'мои радости', 'копилка радостей']
-        if any(cmd in user_message_lower for cmd in joys_commands):
-            print(f"✨ Пользователь запросил радости: {user_message}")
+        if intent == 'joys':
             return analyze_joys(current_user.id)
-        
-        # Цели
-        if any(w in user_message_lower for w in ['цели', 'задачи', 'планы', 'прогресс']):
-            print(f"🎯 Пользователь запросил цели: {user_message}")
+        if intent == 'goals':
             return analyze_goals(current_user.id)
-        
-        # Цикл
-        cycle_commands = ['цикл', 'менструация', 'месячные', 'овуляция', 'пмс', 'фаза цикла', 'дневник цикла']
-        if any(cmd in user_message_lower for cmd in cycle_commands):
-            print(f"🔄 Пользователь запросил анализ цикла: {user_message}")
+        if intent == 'cycle':
             return analyze_cycle(current_user.id)
         
         # ===== ОБЫЧНЫЙ ДИАЛОГ С ПАМЯТЬЮ =====
@@ -1779,7 +1883,7 @@ def chat_with_asya():
             if joys_count > 0:
                 context += f" (и кстати, у тебя уже {joys_count} радостей в копилке! 🎉)"
         except Exception as e:
-            print(f"⚠️ Ошибка получения контекста: {e}")
+            logger.warning("Ошибка получения контекста: %s", e)
         finally:
             close_db(conn)
         
@@ -1814,31 +1918,11 @@ def chat_with_asya():
 Твой ответ (максимум 2 предложения, дружеский тон):"""
         
         # Отправляем запрос в YandexGPT API
-        headers = {'Authorization': f'Api-Key {api_key}', 'Content-Type': 'application/json'}
-        payload = {
-            "modelUri": f"gpt://{folder_id}/yandexgpt/latest",
-            "completionOptions": {"stream": False, "temperature": 0.7, "maxTokens": 200},
-            "messages": [{"role": "user", "text": prompt}]
-        }
-        
-        response = requests.post(
-            'https://llm.api.cloud.yandex.net/foundationModels/v1/completion',
-            headers=headers,
-            json=payload,
-            timeout=15
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            reply = data['result']['alternatives'][0]['message']['text'].strip()
-            return jsonify({'reply': reply, 'success': True, 'has_analysis': False})
-        else:
-            current_app.logger.error(f"YandexGPT API error: {response.status_code}")
-            fallback_response = get_fallback_response(user_message)
-            return jsonify({'reply': fallback_response, 'success': True, 'has_analysis': False})
+        return llm_reply(prompt, lambda: get_fallback_response(user_message),
+                         {'success': True, 'has_analysis': False}, temperature=0.7, max_tokens=200)
             
     except Exception as e:
-        current_app.logger.error(f"Chat error: {str(e)}")
+        logger.error("Chat error: %s", e)
         fallback_response = get_fallback_response(user_message)
         return jsonify({'reply': fallback_response, 'success': False, 'has_analysis': False})
 
@@ -1854,20 +1938,8 @@ def generate_deep_analysis(user_id):
         try:
             cursor = conn.cursor(dictionary=True)
             
-            # 1. Полная статистика настроения
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    AVG(mood) as avg_mood,
-                    MIN(mood) as min_mood,
-                    MAX(mood) as max_mood,
-                    COUNT(CASE WHEN mood >= 7 THEN 1 END) as good_days,
-                    COUNT(CASE WHEN mood <= 4 THEN 1 END) as bad_days,
-                    DATEDIFF(MAX(date), MIN(date)) as tracking_days
-                FROM mood_entries 
-                WHERE user_id = %s
-            """, (user_id,))
-            mood_stats = cursor.fetchone()
+            # 1. Полная статистика настроения (из сводки)
+            mood_stats = get_mood_rollup(cursor, user_id)
             
             # 2. Последние записи с заметками
             cursor.execute("""
@@ -1907,18 +1979,8 @@ def generate_deep_analysis(user_id):
             """, (user_id,))
             challenging_notes = cursor.fetchall()
             
-            # 5. По дням недели
-            cursor.execute("""
-                SELECT 
-                    DAYNAME(date) as day_name,
-                    AVG(mood) as avg_mood,
-                    COUNT(*) as count
-                FROM mood_entries 
-                WHERE user_id = %s
-                GROUP BY DAYNAME(date)
-                ORDER BY FIELD(day_name, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
-            """, (user_id,))
-            days_stats = cursor.fetchall()
+            # 5. По дням недели (из сводки)
+            days_stats = get_weekday_rollup(cursor, user_id)
             
             # Статистика радостей
             cursor.execute("""
@@ -2040,24 +2102,7 @@ def generate_deep_analysis(user_id):
 Используй эмодзи. Ориентируйся на содержание заметок.
 """
         
-        headers = {'Authorization': f'Api-Key {api_key}', 'Content-Type': 'application/json'}
-        payload = {
-            "modelUri": f"gpt://{folder_id}/yandexgpt/latest",
-            "completionOptions": {"stream": False, "temperature": 0.8, "maxTokens": 400},
-            "messages": [{"role": "user", "text": prompt}]
-        }
-        
-        response = requests.post(
-            'https://llm.api.cloud.yandex.net/foundationModels/v1/completion',
-            headers=headers,
-            json=payload,
-            timeout=20
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            reply = data['result']['alternatives'][0]['message']['text'].strip()
-        else:
+        def fallback():
             joys_block = ""
             if joys_stats and joys_stats['joys_count'] > 0:
                 joys_block = f"\n😊 Твои радости: {joys_stats['joys_count']} записей! 🎉"
@@ -2067,36 +2112,25 @@ def generate_deep_analysis(user_id):
 Всего записей: {mood_stats['total'] or 0}
 Заметок с текстом: {len(notes_with_text)}{joys_block}
 Продолжай записывать заметки для более подробного анализа! 📝"""
-        
-        return jsonify({'reply': reply, 'success': True, 'analysis_type': 'deep_analysis'})
+            return reply
+        return llm_reply(prompt, fallback, {'success': True, 'analysis_type': 'deep_analysis'},
+                         temperature=0.8, max_tokens=400, user_id=user_id, kind='deep_analysis')
         
     except Exception as e:
-        current_app.logger.error(f"Deep analysis error: {str(e)}")
+        logger.error("Deep analysis error: %s", e)
         return jsonify({'reply': 'Извини, не могу проанализировать данные сейчас. Попробуй позже! 🔄', 'success': False})
 
 def analyze_patterns(user_id, user_message):
     """Анализ паттернов настроения"""
     try:
-        print(f"📊 АНАЛИЗ ПАТТЕРНОВ: user_id={user_id}")
         conn = get_db()
         if conn is None:
             return jsonify({'error': 'Ошибка подключения к БД'}), 500
         
         try:
             cursor = conn.cursor(dictionary=True)
-            # Анализ по дням недели
-            cursor.execute("""
-                SELECT 
-                    DAYNAME(date) as day_name,
-                    AVG(mood) as avg_mood,
-                    COUNT(*) as count
-                FROM mood_entries 
-                WHERE user_id = %s
-                GROUP BY DAYNAME(date)
-                ORDER BY avg_mood
-            """, (user_id,))
-            days_stats = cursor.fetchall()
-            print(f"📅 Статистика по дням: {len(days_stats)} дней")
+            # Анализ по дням недели (из сводки)
+            days_stats = sorted(get_weekday_rollup(cursor, user_id), key=lambda day: day['avg_mood'])
             
             # Анализ по времени суток (если есть таблица hourly_moods)
             hours_stats = []
@@ -2112,9 +2146,8 @@ def analyze_patterns(user_id, user_message):
                     ORDER BY hour
                 """, (user_id,))
                 hours_stats = cursor.fetchall()
-                print(f"⏰ Статистика по часам: {len(hours_stats)} часов")
             except Exception as hour_error:
-                print(f"ℹ️ Таблица hourly_moods не найдена или пуста: {hour_error}")
+                logger.info("Таблица hourly_moods не найдена или пуста: %s", hour_error)
             
             # Статистика радостей
             cursor.execute("SELECT COUNT(*) as count FROM joys WHERE user_id = %s", (user_id,))
@@ -2148,7 +2181,6 @@ def analyze_patterns(user_id, user_message):
 💡 Используй эту информацию для планирования дня!"""
             return jsonify({'reply': reply, 'success': True, 'analysis_type': 'patterns'})
         
-        print(f"🔗 Отправляем запрос в YandexGPT для анализа паттернов")
         prompt = f"""
 ПРОАНАЛИЗИРУЙ ПАТТЕРНЫ НАСТРОЕНИЯ ПОЛЬЗОВАТЕЛЯ:
 
@@ -2174,24 +2206,7 @@ def analyze_patterns(user_id, user_message):
 
 Ответ: 3-4 предложения, дружеский тон, с эмодзи.
 """
-        headers = {'Authorization': f'Api-Key {api_key}', 'Content-Type': 'application/json'}
-        payload = {
-            "modelUri": f"gpt://{folder_id}/yandexgpt/latest",
-            "completionOptions": {"stream": False, "temperature": 0.7, "maxTokens": 300},
-            "messages": [{"role": "user", "text": prompt}]
-        }
-        response = requests.post(
-            'https://llm.api.cloud.yandex.net/foundationModels/v1/completion',
-            headers=headers,
-            json=payload,
-            timeout=15
-        )
-        if response.status_code == 200:
-            data = response.json()
-            reply = data['result']['alternatives'][0]['message']['text'].strip()
-            print("✅ Получен ответ от YandexGPT для паттернов")
-        else:
-            print(f"❌ Ошибка YandexGPT: {response.status_code}")
+        def fallback():
             best_day = max(days_stats, key=lambda x: x['avg_mood']) if days_stats else None
             worst_day = min(days_stats, key=lambda x: x['avg_mood']) if days_stats else None
             joys_text = f" И ещё у тебя {joys_count} радостей в копилке! 🎉" if joys_count > 0 else ""
@@ -2204,15 +2219,16 @@ def analyze_patterns(user_id, user_message):
 Планируйте важные дела на {best_day['day_name']}, а на {worst_day['day_name']} оставьте время для отдыха! 💪"""
             else:
                 reply = "Пока недостаточно данных для анализа паттернов."
-        return jsonify({'reply': reply, 'success': True, 'analysis_type': 'patterns'})
+            return reply
+        return llm_reply(prompt, fallback, {'success': True, 'analysis_type': 'patterns'},
+                         temperature=0.7, max_tokens=300, user_id=user_id, kind='patterns')
     except Exception as e:
-        current_app.logger.error(f"Patterns analysis error: {str(e)}")
+        logger.error("Patterns analysis error: %s", e)
         return jsonify({'reply': 'Не могу проанализировать паттерны сейчас. Попробуй позже! 📊', 'success': False})
 
 def analyze_notes(user_id, user_message):
     """Анализ заметок пользователя из mood_entries"""
     try:
-        print(f"📝 АНАЛИЗ ЗАМЕТОК: user_id={user_id}")
         conn = get_db()
         if conn is None:
             return jsonify({'error': 'Ошибка подключения к БД'}), 500
@@ -2230,7 +2246,6 @@ def analyze_notes(user_id, user_message):
                 LIMIT 50
             """, (user_id,))
             all_notes = cursor.fetchall()
-            print(f"📋 Найдено заметок: {len(all_notes)}")
             cursor.execute("""
                 SELECT 
                     COUNT(*) as total_notes,
@@ -2278,7 +2293,6 @@ def analyze_notes(user_id, user_message):
 💡 Записывать мысли и чувства - полезная практика для самоанализа!"""
             return jsonify({'reply': reply, 'success': True, 'analysis_type': 'notes'})
         
-        print(f"🔗 Отправляем запрос в YandexGPT с {len(all_notes)} заметками")
         notes_for_prompt = []
         for i, note in enumerate(all_notes[:15], 1):
             note_date = note.get('date')
@@ -2310,24 +2324,7 @@ def analyze_notes(user_id, user_message):
 
 Ответ: 3-4 предложения, дружеский тон, с эмодзи. Обращай внимание на содержание заметок.
 """
-        headers = {'Authorization': f'Api-Key {api_key}', 'Content-Type': 'application/json'}
-        payload = {
-            "modelUri": f"gpt://{folder_id}/yandexgpt/latest",
-            "completionOptions": {"stream": False, "temperature": 0.7, "maxTokens": 350},
-            "messages": [{"role": "user", "text": prompt}]
-        }
-        response = requests.post(
-            'https://llm.api.cloud.yandex.net/foundationModels/v1/completion',
-            headers=headers,
-            json=payload,
-            timeout=15
-        )
-        if response.status_code == 200:
-            data = response.json()
-            reply = data['result']['alternatives'][0]['message']['text'].strip()
-            print("✅ Получен ответ от YandexGPT для заметок")
-        else:
-            print(f"❌ Ошибка YandexGPT: {response.status_code}")
+        def fallback():
             if len(all_notes) >= 5:
                 latest_notes = chr(10).join([f"• {note['date'].strftime('%d.%m')}: {note['mood']}/10" for note in all_notes[:5]])
                 reply = f"""📝 Твои заметки:
@@ -2342,15 +2339,16 @@ def analyze_notes(user_id, user_message):
 Продолжай вести заметки для более глубокого анализа!"""
             else:
                 reply = f"У тебя {len(all_notes)} заметок. Продолжай записывать свои мысли для анализа! 📝"
-        return jsonify({'reply': reply, 'success': True, 'analysis_type': 'notes'})
+            return reply
+        return llm_reply(prompt, fallback, {'success': True, 'analysis_type': 'notes'},
+                         temperature=0.7, max_tokens=350, user_id=user_id, kind='notes')
     except Exception as e:
-        current_app.logger.error(f"Notes analysis error: {str(e)}")
+        logger.error("Notes analysis error: %s", e)
         return jsonify({'reply': 'Не могу проанализировать заметки сейчас. Попробуй позже! 📝', 'success': False})
 
 def analyze_joys(user_id):
     """Анализ радостей пользователя"""
     try:
-        print(f"✨ АНАЛИЗ РАДОСТЕЙ: user_id={user_id}")
         conn = get_db()
         if conn is None:
             return jsonify({'reply': 'Не могу подключиться к базе данных. Попробуй позже! 🔄', 'success': False})
@@ -2368,7 +2366,7 @@ def analyze_joys(user_id):
             """, (user_id,))
             recent_joys = cursor.fetchall()
         except Exception as e:
-            print(f"❌ Ошибка при получении данных: {e}")
+            logger.error("Ошибка при получении данных о радостях: %s", e)
             return jsonify({'reply': 'Не могу получить данные о радостях. Попробуй позже! 🔄', 'success': False})
         finally:
             if cursor:
@@ -2393,7 +2391,7 @@ def analyze_joys(user_id):
                 reply = f"😊 У тебя {joys_count} радостей. Продолжай копить позитивные моменты!\n\n{joys_text}"
         return jsonify({'reply': reply, 'success': True, 'analysis_type': 'joys'})
     except Exception as e:
-        current_app.logger.error(f"Joys analysis error: {str(e)}")
+        logger.error("Joys analysis error: %s", e)
         return jsonify({'reply': 'Не могу проанализировать радости сейчас. Попробуй позже! 🔄', 'success': False})
 
 def analyze_goals(user_id):
@@ -2429,7 +2427,6 @@ def analyze_goals(user_id):
 def analyze_cycle(user_id):
     """Анализ данных менструального цикла"""
     try:
-        print(f"🔄 АНАЛИЗ ЦИКЛА: user_id={user_id}")
         conn = get_db()
         if conn is None:
             return jsonify({'reply': 'Не могу подключиться к базе данных. Попробуй позже! 🔄', 'success': False})
@@ -2506,7 +2503,7 @@ def analyze_cycle(user_id):
         reply_parts.append("• Лютеиновая и ПМС: будь добрее к себе, больше отдыха")
         return jsonify({'reply': "\n".join(reply_parts), 'success': True, 'analysis_type': 'cycle'})
     except Exception as e:
-        current_app.logger.error(f"Cycle analysis error: {str(e)}")
+        logger.error("Cycle analysis error: %s", e)
         return jsonify({'reply': 'Не могу проанализировать цикл сейчас. Попробуй позже! 🔄', 'success': False})
 
 # ================== ДОПОЛНИТЕЛЬНЫЙ API ДЛЯ ПОЛУЧЕНИЯ АНАЛИЗА ==================
@@ -2537,7 +2534,7 @@ def get_ai_insights():
         finally:
             close_db(conn)
     except Exception as e:
-        current_app.logger.error(f"AI Insights error: {str(e)}")
+        logger.error("AI Insights error: %s", e)
         return jsonify({
             'success': False,
             'error': 'Не удалось сгенерировать анализ',
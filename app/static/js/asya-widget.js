@@ -0,0 +1,186 @@
+(function() {
+  const icon = document.getElementById('asya-icon');
+  const chat = document.getElementById('asya-chat');
+  const closeBtn = document.getElementById('asya-close');
+  const input = document.getElementById('asya-input');
+  const sendBtn = document.getElementById('asya-send');
+  const messages = document.getElementById('asya-messages');
+  const analyticsBtn = document.getElementById('asya-analytics');
+
+  if (!icon || !chat) return;
+
+  let chatHistory = JSON.parse(localStorage.getItem('asya_chat_history') || '[]');
+
+  function saveHistory() {
+    const history = Array.from(messages.querySelectorAll('.message')).map(el => ({
+      text: el.textContent,
+      sender: el.classList.contains('user-message') ? 'user' : 'asya',
+      timestamp: new Date().toISOString()
+    }));
+    localStorage.setItem('asya_chat_history', JSON.stringify(history));
+    chatHistory = history;
+  }
+
+  function addMessage(text, sender) {
+    const div = document.createElement('div');
+    div.className = `message ${sender}-message`;
+    div.textContent = text;
+    messages.appendChild(div);
+    messages.scrollTop = messages.scrollHeight;
+    saveHistory();
+  }
+
+  // Восстановление истории
+  if (chatHistory.length > 0 && messages.children.length === 1) {
+    messages.innerHTML = '';
+    chatHistory.forEach(msg => {
+      const div = document.createElement('div');
+      div.className = `message ${msg.sender === 'user' ? 'user-message' : 'asya-message'}`;
+      div.textContent = msg.text;
+      messages.appendChild(div);
+    });
+  }
+
+  async function sendMessage() {
+    const text = input.value.trim();
+    if (!text) return;
+
+    addMessage(text, 'user');
+    input.value = '';
+
+    // Индикатор печати
+    const typingDiv = document.createElement('div');
+    typingDiv.className = 'message asya-message';
+    typingDiv.textContent = 'Ася печатает...';
+    messages.appendChild(typingDiv);
+    messages.scrollTop = messages.scrollHeight;
+
+    try {
+      // По умолчанию сервер ставит фоновую задачу (202), и ответ приходит опросом.
+      // Поток SSE сервер отдаёт, только если он включён (LLM_SSE=1 с асинхронными воркерами)
+      const response = await fetch('/api/chat', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': STREAMING_SUPPORTED ? 'text/event-stream' : 'application/json',
+          'Prefer': 'respond-async'
+        },
+        body: JSON.stringify({
+          message: text,
+          history: chatHistory.slice(-10)
+        })
+      });
+
+      const contentType = response.headers.get('Content-Type') || '';
+      if (contentType.startsWith('text/event-stream') && response.body) {
+        await readReplyStream(response, typingDiv);
+        return;
+      }
+
+      let data = await response.json();
+      if (response.status === 202 && data.poll_url) {
+        data = await pollReply(data.poll_url, typingDiv);
+      }
+      typingDiv.remove();
+
+      if (data && data.reply) {
+        addMessage(data.reply, 'asya');
+      } else {
+        addMessage((data && data.error) || 'Ошибка ответа сервера 😕', 'asya');
+      }
+    } catch (error) {
+      typingDiv.remove();
+      const fallbacks = ['Нет соединения 🌐 Попробуй позже', 'Сервер недоступен 😕', 'Ошибка сети 🔄'];
+      addMessage(fallbacks[Math.floor(Math.random() * fallbacks.length)], 'asya');
+    }
+  }
+
+  // Потоковый ответ (SSE): текст появляется по мере генерации
+  const STREAMING_SUPPORTED = typeof ReadableStream !== 'undefined' && typeof TextDecoder !== 'undefined';
+
+  async function readReplyStream(response, typingDiv) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let finalReply = null;
+
+    function handleEvent(raw) {
+      let event = 'message';
+      let data = '';
+      raw.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (!data) return;
+      const payload = JSON.parse(data);
+      if (event === 'token') {
+        text += payload.text;
+        typingDiv.textContent = text;
+        messages.scrollTop = messages.scrollHeight;
+      } else if (event === 'done') {
+        finalReply = payload.reply;
+      }
+    }
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        handleEvent(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+      }
+    }
+
+    typingDiv.remove();
+    const reply = finalReply || text.trim();
+    addMessage(reply || 'Ошибка ответа сервера 😕', 'asya');
+  }
+
+  // Опрос задачи (браузеры без потоков): частичный текст показывается по мере генерации
+  const POLL_INTERVAL_MS = 400;
+  const POLL_TIMEOUT_MS = 60000;
+
+  async function pollReply(url, typingDiv) {
+    const deadline = Date.now() + POLL_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+      const response = await fetch(url, { cache: 'no-store' });
+      const job = await response.json();
+      if (job.status === 'failed') {
+        return { error: 'Не получилось ответить 😕 Попробуй ещё раз' };
+      }
+      if (!response.ok || job.status === 'done') {
+        return job;
+      }
+      if (job.reply) {
+        typingDiv.textContent = job.reply;
+        messages.scrollTop = messages.scrollHeight;
+      }
+    }
+    return { error: 'Ася задумалась слишком надолго 😕 Попробуй ещё раз' };
+  }
+
+  async function getAnalytics() {
+    try {
+      const response = await fetch('/api/ai_insights');
+      const data = await response.json();
+      if (data.success) {
+        addMessage("📊 Анализ:\n" + data.insights, 'asya');
+      } else {
+        addMessage('Недостаточно данных для анализа. Заполни календарь настроения! 📅', 'asya');
+      }
+    } catch {
+      addMessage('Ошибка получения аналитики 🔄', 'asya');
+    }
+  }
+
+  // Обработчики событий
+  icon.onclick = () => chat.classList.toggle('open');
+  closeBtn.onclick = () => chat.classList.remove('open');
+  sendBtn.onclick = sendMessage;
+  analyticsBtn.onclick = getAnalytics;
+  input.addEventListener('keypress', (e) => { if (e.key === 'Enter') sendMessage(); });
+})();
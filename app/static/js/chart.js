@@ -0,0 +1,590 @@
+let mainChart, distributionChart, timeChart;
+let currentDate = new Date();
+let currentView = "week";
+let moodData = [];
+let hourlyDataCache = {};
+
+// ФУНКЦИЯ НОРМАЛИЗАЦИИ ДАТЫ - ГЛАВНОЕ ИСПРАВЛЕНИЕ
+function normalizeDate(dateString) {
+    if (!dateString) return "";
+    return dateString.split("T")[0];
+}
+
+// Цвета для диаграмм
+const chartColors = {
+    good: '#60F4E3',
+    neutral: '#FF70EC', 
+    bad: '#F44336',
+    background: 'rgba(96, 244, 227, 0.1)',
+    grid: 'rgba(0, 0, 0, 0.05)'
+};
+
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('🚀 Инициализация страницы анализа...');
+    document.getElementById(`${currentView}Btn`).classList.add('btn-active');
+    loadMoodData();
+});
+
+async function loadMoodData() {
+    showLoading(true);
+    try {
+        console.log('📊 Загрузка данных настроения...');
+        const response = await fetch(`${API_BASE}?all=1`);
+        if (response.ok) {
+            moodData = await response.json();
+            console.log('✅ Данные загружены:', moodData.length, 'записей');
+            
+            // НОРМАЛИЗАЦИЯ ДАТ В moodData - КЛЮЧЕВОЕ ИСПРАВЛЕНИЕ
+            moodData = moodData.map(entry => ({
+                ...entry,
+                date: normalizeDate(entry.date),
+                created_at: entry.created_at ? entry.created_at.replace('T', ' ').slice(0, 16) : null
+            }));
+            
+            console.log('📅 Данные после нормализации:', moodData);
+            updateCharts();
+        } else {
+            throw new Error('Ошибка загрузки данных');
+        }
+    } catch (error) {
+        console.error('❌ Ошибка загрузки данных:', error);
+        showToast('Ошибка загрузки данных', 'error');
+    } finally {
+        showLoading(false);
+    }
+}
+
+function showLoading(show) {
+    const loadingElements = document.querySelectorAll('.loading');
+    loadingElements.forEach(el => {
+        el.style.display = show ? 'flex' : 'none';
+    });
+}
+
+function formatDate(date) {
+    const year = date.getFullYear();
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${year}-${month}-${day}`;
+}
+
+function formatDateDisplay(date) {
+    return date.toLocaleDateString('ru-RU', {
+        day: 'numeric',
+        month: 'long',
+        year: 'numeric'
+    });
+}
+
+function getWeekDates(date) {
+    let monday = new Date(date);
+    monday.setDate(date.getDate() - ((date.getDay() + 6) % 7)); 
+    return Array.from({length: 7}, (_, i) => {
+        let d = new Date(monday);
+        d.setDate(monday.getDate() + i);
+        return d;
+    });
+}
+
+function getMonthDates(date) {
+    let year = date.getFullYear();
+    let month = date.getMonth();
+    let days = new Date(year, month + 1, 0).getDate();
+    return Array.from({length: days}, (_, i) => new Date(year, month, i + 1));
+}
+
+function getYearMonths(date) {
+    let year = date.getFullYear();
+    return Array.from({length: 12}, (_, i) => new Date(year, i, 1));
+}
+
+function getMoodCategory(moodValue) {
+    if (moodValue >= 7) return 'good';
+    if (moodValue >= 4) return 'neutral';
+    return 'bad';
+}
+
+function getMoodColor(category) {
+    return chartColors[category];
+}
+
+function getMoodEmoji(moodValue) {
+    if (moodValue >= 8) return '😊';
+    if (moodValue >= 5) return '😐';
+    if (moodValue >= 3) return '😕';
+    return '😞';
+}
+
+async function loadHourlyData(date) {
+    // Используем кэш для избежания повторных запросов
+    if (hourlyDataCache[date]) {
+        return hourlyDataCache[date];
+    }
+    
+    // Загружаем сразу весь месяц одним запросом: {дата: {час: настроение}}
+    const [year, month] = date.split('-').map(Number);
+    const from = formatDate(new Date(year, month - 1, 1));
+    const to = formatDate(new Date(year, month, 0));
+    try {
+        const response = await fetch(`${HOURLY_MOODS_API}?from=${from}&to=${to}`);
+        if (response.ok) {
+            const data = await response.json();
+            getMonthDates(new Date(year, month - 1, 1)).forEach(d => {
+                const key = formatDate(d);
+                const hours = data.days[key] || {};
+                hourlyDataCache[key] = Object.entries(hours).map(([hour, mood]) => ({
+                    date: key,
+                    hour: Number(hour),
+                    mood: mood
+                }));
+            });
+            return hourlyDataCache[date] || [];
+        }
+    } catch (error) {
+        console.error('Ошибка загрузки почасовых данных:', error);
+    }
+    return [];
+}
+
+async function generateMainChartData() {
+    let labels = [];
+    let data = [];
+    let labelText = "";
+
+    if (currentView === "day") {
+        const dateStr = formatDate(currentDate);
+        // Для дня используем почасовые данные из HOURLY_MOODS_API
+        const dayData = await loadHourlyData(dateStr);
+        
+        console.log('📅 Данные за день:', dateStr, dayData);
+        
+        // Для дня показываем почасовые данные
+        labels = Array.from({length: 24}, (_, i) => `${i}:00`);
+        data = Array.from({length: 24}, (_, hour) => {
+            const hourData = dayData.find(entry => entry.hour === hour);
+            return hourData ? hourData.mood : null;
+        });
+        labelText = `Настроение за ${formatDateDisplay(currentDate)}`;
+        
+    } else if (currentView === "week") {
+        const dates = getWeekDates(currentDate);
+        labels = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"];
+        data = dates.map(d => {
+            const key = formatDate(d);
+            const dayEntries = moodData.filter(entry => entry.date === key);
+            if (dayEntries.length === 0) return null;
+            // Берем среднее значение за день
+            return dayEntries.reduce((sum, entry) => sum + entry.mood, 0) / dayEntries.length;
+        });
+        const startDate = dates[0];
+        const endDate = dates[6];
+        labelText = `Неделя ${startDate.getDate()}-${endDate.getDate()} ${startDate.toLocaleString('ru', {month: 'long'})}`;
+        
+    } else if (currentView === "month") {
+        const dates = getMonthDates(currentDate);
+        labels = dates.map(d => d.getDate());
+        data = dates.map(d => {
+            const key = formatDate(d);
+            const dayEntries = moodData.filter(entry => entry.date === key);
+            if (dayEntries.length === 0) return null;
+            return dayEntries.reduce((sum, entry) => sum + entry.mood, 0) / dayEntries.length;
+        });
+        labelText = `${currentDate.toLocaleString('ru', {month: 'long'})} ${currentDate.getFullYear()}`;
+        
+    } else {
+        const dates = getYearMonths(currentDate);
+        const months = ["Янв", "Фев", "Мар", "Апр", "Май", "Июн", "Июл", "Авг", "Сен", "Окт", "Ноя", "Дек"];
+        labels = months;
+        data = dates.map(d => {
+            const monthStr = d.toISOString().slice(0, 7);
+            const monthData = moodData.filter(entry => entry.date.startsWith(monthStr));
+            if (monthData.length === 0) return null;
+            return monthData.reduce((sum, entry) => sum + entry.mood, 0) / monthData.length;
+        });
+        labelText = `${currentDate.getFullYear()} год`;
+    }
+
+    document.getElementById('periodLabel').textContent = labelText;
+    document.getElementById('mainChartTitle').textContent = labelText;
+
+    return { labels, data };
+}
+
+async function updateMainChart() {
+    const { labels, data } = await generateMainChartData();
+    
+    if (mainChart) mainChart.destroy();
+
+    const ctx = document.getElementById('mainChart').getContext('2d');
+    const noDataElement = document.getElementById('mainChartNoData');
+    
+    const validData = data.filter(val => val !== null);
+    const hasData = validData.length > 0;
+
+    if (!hasData) {
+        noDataElement.style.display = 'flex';
+        return;
+    } else {
+        noDataElement.style.display = 'none';
+    }
+
+    mainChart = new Chart(ctx, {
+        type: currentView === 'day' ? 'bar' : 'line',
+        data: {
+            labels: labels,
+            datasets: [{
+                label: 'Настроение',
+                data: data,
+                borderColor: chartColors.good,
+                backgroundColor: currentView === 'day' ? 
+                    data.map(val => val ? getMoodColor(getMoodCategory(val)) : chartColors.grid) : 
+                    chartColors.background,
+                tension: 0.4,
+                fill: currentView !== 'day',
+                pointBackgroundColor: data.map(val => val ? getMoodColor(getMoodCategory(val)) : chartColors.grid),
+                pointBorderColor: '#fff',
+                pointRadius: currentView === 'day' ? 0 : 6,
+                pointHoverRadius: currentView === 'day' ? 0 : 8,
+                borderWidth: currentView === 'day' ? 0 : 2
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                y: {
+                    min: 1,
+                    max: 10,
+                    ticks: {
+                        callback: function(value) {
+                            const emojis = ['', '😞', '', '', '😐', '', '', '😊', '', '🤩'];
+                            return emojis[value] || '';
+                        },
+                        stepSize: 1
+                    },
+                    grid: {
+                        color: chartColors.grid
+                    }
+                },
+                x: {
+                    grid: {
+                        display: false
+                    }
+                }
+            },
+            plugins: {
+                legend: {
+                    display: false
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            const value = context.raw;
+                            if (value === null) return 'Нет данных';
+                            const categories = {
+                                'good': 'Хорошее',
+                                'neutral': 'Нейтральное', 
+                                'bad': 'Плохое'
+                            };
+                            const emoji = getMoodEmoji(value);
+                            return `${emoji} Настроение: ${value.toFixed(1)} (${categories[getMoodCategory(value)]})`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+function updateDistributionChart() {
+    const currentData = getCurrentPeriodData();
+    const distribution = { good: 0, neutral: 0, bad: 0 };
+
+    currentData.forEach(entry => {
+        distribution[getMoodCategory(entry.mood)]++;
+    });
+
+    const total = currentData.length;
+    const noDataElement = document.getElementById('distributionChartNoData');
+
+    if (total === 0) {
+        noDataElement.style.display = 'flex';
+        if (distributionChart) distributionChart.destroy();
+        return;
+    } else {
+        noDataElement.style.display = 'none';
+    }
+
+    const percentages = {
+        good: total > 0 ? (distribution.good / total * 100) : 0,
+        neutral: total > 0 ? (distribution.neutral / total * 100) : 0,
+        bad: total > 0 ? (distribution.bad / total * 100) : 0
+    };
+
+    if (distributionChart) distributionChart.destroy();
+
+    const ctx = document.getElementById('distributionChart').getContext('2d');
+    
+    distributionChart = new Chart(ctx, {
+        type: 'doughnut',
+        data: {
+            labels: ['Хорошее', 'Нейтральное', 'Плохое'],
+            datasets: [{
+                data: [percentages.good, percentages.neutral, percentages.bad],
+                backgroundColor: [chartColors.good, chartColors.neutral, chartColors.bad],
+                borderWidth: 2,
+                borderColor: '#fff'
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            cutout: '60%',
+            plugins: {
+                legend: {
+                    display: false
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            return `${context.label}: ${context.raw.toFixed(1)}% (${Math.round(context.raw * total / 100)} записей)`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+async function updateTimeChart() {
+    const noDataElement = document.getElementById('timeChartNoData');
+
+    if (currentView !== 'day') {
+        // Показываем только для дня
+        noDataElement.style.display = 'flex';
+        if (timeChart) timeChart.destroy();
+        return;
+    }
+
+    const dateStr = formatDate(currentDate);
+    const dayData = await loadHourlyData(dateStr);
+
+    if (!dayData || dayData.length === 0) {
+        noDataElement.style.display = 'flex';
+        if (timeChart) timeChart.destroy();
+        return;
+    } else {
+        noDataElement.style.display = 'none';
+    }
+
+    if (timeChart) timeChart.destroy();
+
+    // Считаем количество настроений по категориям
+    const distribution = { good: 0, neutral: 0, bad: 0 };
+    dayData.forEach(entry => {
+        const cat = getMoodCategory(entry.mood);
+        distribution[cat]++;
+    });
+
+    const total = dayData.length;
+
+    const ctx = document.getElementById('timeChart').getContext('2d');
+
+    timeChart = new Chart(ctx, {
+        type: 'doughnut',
+        data: {
+            labels: ['','',''], // убираем подписи
+            datasets: [{
+                data: [distribution.good, distribution.neutral, distribution.bad],
+                backgroundColor: ['#60F4E3', '#FF70EC', '#F44336'],
+                borderColor: '#fff',
+                borderWidth: 2
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            cutout: '60%',
+            plugins: {
+                legend: { display: false }, // убрали легенду
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            const value = context.raw;
+                            const percent = total > 0 ? ((value / total) * 100).toFixed(1) : 0;
+                            return `${percent}% (${value} записей)`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+
+
+function getCurrentPeriodData() {
+    if (currentView === "day") {
+        const dateStr = formatDate(currentDate);
+        return moodData.filter(entry => entry.date === dateStr);
+    } else if (currentView === "week") {
+        const dates = getWeekDates(currentDate);
+        const dateStrs = dates.map(d => formatDate(d));
+        return moodData.filter(entry => dateStrs.includes(entry.date));
+    } else if (currentView === "month") {
+        const monthStr = currentDate.toISOString().slice(0, 7);
+        return moodData.filter(entry => entry.date.startsWith(monthStr));
+    } else {
+        const yearStr = currentDate.getFullYear().toString();
+        return moodData.filter(entry => entry.date.startsWith(yearStr));
+    }
+}
+
+function updateStats() {
+    const currentData = getCurrentPeriodData();
+    const totalEntries = currentData.length;
+    
+    document.getElementById('totalEntries').textContent = totalEntries;
+    
+    // Хорошие дни (настроение >= 7)
+    const goodEntries = currentData.filter(entry => entry.mood >= 7);
+    const goodDays = new Set(goodEntries.map(entry => entry.date)).size;
+    const goodPercentage = totalEntries > 0 ? Math.round((goodEntries.length / totalEntries) * 100) : 0;
+    
+    document.getElementById('goodDays').textContent = goodEntries.length;
+    document.getElementById('goodDaysChange').textContent = `${goodPercentage}% от общего числа`;
+    
+    // Среднее настроение
+    const avgMood = totalEntries > 0 ? 
+        (currentData.reduce((sum, entry) => sum + entry.mood, 0) / totalEntries).toFixed(1) : '0.0';
+    document.getElementById('avgMood').textContent = avgMood;
+    
+    // Уровень активности
+    let totalDays = 0;
+    if (currentView === "day") totalDays = 1;
+    else if (currentView === "week") totalDays = 7;
+    else if (currentView === "month") totalDays = new Date(currentDate.getFullYear(), currentDate.getMonth() + 1, 0).getDate();
+    else totalDays = 12;
+    
+    const uniqueDays = new Set(currentData.map(entry => entry.date)).size;
+    const activityLevel = Math.round((uniqueDays / totalDays) * 100);
+    document.getElementById('activityLevel').textContent = `${activityLevel}%`;
+    
+    updateInsights(currentData, goodPercentage, avgMood);
+}
+
+function updateInsights(data, goodPercentage, avgMood) {
+    if (data.length === 0) {
+        document.getElementById('trendText').textContent = 'Недостаточно данных для анализа';
+        document.getElementById('bestPeriodText').textContent = 'Заполните данные для получения инсайтов';
+        document.getElementById('peakTimeText').textContent = 'Нет данных о времени';
+        return;
+    }
+    
+    // Анализ тренда
+    const recentData = data.slice(-5);
+    let trend = 'стабильное';
+    if (recentData.length >= 2) {
+        const first = recentData[0].mood;
+        const last = recentData[recentData.length - 1].mood;
+        if (last > first + 1) trend = 'положительное';
+        else if (last < first - 1) trend = 'отрицательное';
+    }
+    document.getElementById('trendText').textContent = `Ваше настроение показывает ${trend} направление`;
+    
+    // Лучший период
+    if (goodPercentage > 60) {
+        document.getElementById('bestPeriodText').textContent = 'Отличный период! Преобладает хорошее настроение';
+    } else if (goodPercentage > 30) {
+        document.getElementById('bestPeriodText').textContent = 'Сбалансированный период с разным настроением';
+    } else {
+        document.getElementById('bestPeriodText').textContent = 'Период требует больше позитивных моментов';
+    }
+    
+    // Пиковое время
+    const hourCounts = {};
+    data.forEach(entry => {
+        if (entry.hour !== undefined) {
+            hourCounts[entry.hour] = (hourCounts[entry.hour] || 0) + 1;
+        }
+    });
+    
+    let peakHour = null;
+    let maxCount = 0;
+    Object.entries(hourCounts).forEach(([hour, count]) => {
+        if (count > maxCount) {
+            maxCount = count;
+            peakHour = hour;
+        }
+    });
+    
+    if (peakHour !== null) {
+        const period = peakHour < 12 ? 'утро' : peakHour < 18 ? 'день' : 'вечер';
+        document.getElementById('peakTimeText').textContent = `Наиболее активное время для записей: ${period} (${peakHour}:00)`;
+    } else {
+        document.getElementById('peakTimeText').textContent = 'Недостаточно данных для определения пикового времени';
+    }
+}
+
+async function updateCharts() {
+    console.log('🔄 Обновление диаграмм...');
+    showLoading(true);
+    try {
+        await updateMainChart();
+        updateDistributionChart();
+        updateTimeChart();
+        updateStats();
+    } catch (error) {
+        console.error('Ошибка обновления диаграмм:', error);
+    } finally {
+        showLoading(false);
+    }
+}
+
+function changePeriod(offset) {
+    if (currentView === "day") {
+        currentDate.setDate(currentDate.getDate() + offset);
+    } else if (currentView === "week") {
+        currentDate.setDate(currentDate.getDate() + offset * 7);
+    } else if (currentView === "month") {
+        currentDate.setMonth(currentDate.getMonth() + offset);
+    } else if (currentView === "year") {
+        currentDate.setFullYear(currentDate.getFullYear() + offset);
+    }
+    updateCharts();
+}
+
+function goToday() {
+    currentDate = new Date();
+    updateCharts();
+}
+
+function setView(view) {
+    currentView = view;
+    document.querySelectorAll('.view-btn').forEach(btn => {
+        btn.classList.remove('btn-active');
+        btn.classList.add('btn-secondary');
+    });
+    document.getElementById(`${view}Btn`).classList.remove('btn-secondary');
+    document.getElementById(`${view}Btn`).classList.add('btn-active');
+    
+    updateCharts();
+}
+
+function showToast(message, type = 'success') {
+    const toast = document.createElement('div');
+    toast.className = `toast ${type === 'error' ? 'error' : ''}`;
+    toast.textContent = message;
+    document.body.appendChild(toast);
+    
+    setTimeout(() => {
+        toast.classList.add('show');
+    }, 10);
+    
+    setTimeout(() => {
+        toast.classList.remove('show');
+        setTimeout(() => {
+            document.body.removeChild(toast);
+        }, 300);
+    }, 3000);
+}
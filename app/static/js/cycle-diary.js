@@ -0,0 +1,1685 @@
+    // ==========================================================================
+    // КОНСТАНТЫ API
+    // ==========================================================================
+    const CYCLE_API = "/api/cycle_entries";
+    const MOOD_API = "/api/mood_entries";
+    const TODAY_MOOD_API = "/api/today_mood";
+    const CYCLE_STATS_API = "/api/cycle_stats";
+    const CYCLE_PREDICTIONS_API = "/api/cycle_predictions";
+
+    // Цвета фаз цикла
+    const CYCLE_PHASE_COLORS = {
+        'menstruation': { bg: 'rgba(255, 107, 107, 0.15)', border: '#FF6B6B' },
+        'follicular': { bg: 'rgba(96, 244, 227, 0.15)', border: '#60F4E3' },
+        'ovulation': { bg: 'rgba(255, 112, 236, 0.15)', border: '#FF70EC' },
+        'luteal': { bg: 'rgba(255, 209, 102, 0.15)', border: '#FFD166' },
+        'pms': { bg: 'rgba(184, 179, 233, 0.15)', border: '#B8B3E9' }
+    };
+
+    // ==========================================================================
+    // ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ
+    // ==========================================================================
+    let currentDate = new Date();
+    let currentChartDate = new Date();
+    let cycleData = [];
+    let moodData = [];
+    let moodChart = null;
+    let symptomsChart = null;
+    let moodOverTimeChart = null;
+    let currentSelectedDate = null;
+    let isEditMode = false;
+    let userCycleSettings = null;
+
+    // ==========================================================================
+    // ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
+    // ==========================================================================
+
+    function formatDate(date) {
+        const year = date.getFullYear();
+        const month = String(date.getMonth() + 1).padStart(2, '0');
+        const day = String(date.getDate()).padStart(2, '0');
+        return `${year}-${month}-${day}`;
+    }
+
+    function formatDateDisplay(dateStr) {
+        const date = new Date(dateStr);
+        return date.toLocaleDateString('ru-RU', {
+            day: 'numeric',
+            month: 'long',
+            year: 'numeric'
+        });
+    }
+
+    function getSymptomColor(symptom) {
+        const colorMap = {
+            'Головная боль': '#FF6B6B',
+            'Спазмы': '#FF70EC',
+            'Усталость': '#60F4E3',
+            'Набухание груди': '#FFD166',
+            'Перепады настроения': '#B8B3E9',
+            'Тревожность': '#FFA502',
+            'Вздутие': '#2ed573',
+            'Акне': '#ff4757',
+            'Тяга к сладкому': '#ff9ff3',
+            'Бессонница': '#54a0ff',
+            'Тошнота': '#00d2d3',
+            'Боль в спине': '#f368e0'
+        };
+        return colorMap[symptom] || '#60F4E3';
+    }
+
+    function getMoodEmoji(moodValue) {
+        if (moodValue >= 8) return '😊';
+        if (moodValue >= 5) return '😐';
+        if (moodValue >= 3) return '😕';
+        return '😞';
+    }
+
+    function getMoodColorForValue(moodValue) {
+        if (moodValue >= 7) return '#60F4E3';
+        if (moodValue >= 4) return '#FF70EC';
+        return '#F44336';
+    }
+
+    // ==========================================================================
+    // ФУНКЦИИ ДЛЯ РАБОТЫ С КАЛЕНДАРЕМ
+    // ==========================================================================
+
+    function renderCalendar() {
+        const calendar = document.getElementById('calendar');
+        const monthYear = document.getElementById('monthYear');
+
+        if (!calendar || !monthYear) {
+            console.error('❌ Не найдены элементы календаря');
+            return;
+        }
+
+        const monthNames = [
+            'Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь',
+            'Июль', 'Август', 'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь'
+        ];
+        monthYear.textContent = `${monthNames[currentDate.getMonth()]} ${currentDate.getFullYear()}`;
+        calendar.innerHTML = '';
+
+        const year = currentDate.getFullYear();
+        const month = currentDate.getMonth();
+        const firstDay = new Date(year, month, 1);
+        const lastDay = new Date(year, month + 1, 0);
+        const daysInMonth = lastDay.getDate();
+
+        let startDay = firstDay.getDay();
+        if (startDay === 0) startDay = 7;
+
+        const prevMonthDays = new Date(year, month, 0).getDate();
+        for (let i = startDay - 1; i > 0; i--) {
+            const day = createDayElement(prevMonthDays - i + 1, 'other-month', true);
+            calendar.appendChild(day);
+        }
+
+        const today = new Date();
+        today.setHours(0, 0, 0, 0);
+
+        for (let i = 1; i <= daysInMonth; i++) {
+            const date = new Date(year, month, i);
+            const dateStr = formatDate(date);
+            const day = createDayElement(i, '', false);
+
+            const isToday = date.getDate() === today.getDate() &&
+                date.getMonth() === today.getMonth() &&
+                date.getFullYear() === today.getFullYear();
+
+            if (isToday) day.classList.add('current-day');
+
+            const cycleEntry = cycleData.find(entry => entry && entry.date === dateStr);
+
+            if (cycleEntry) {
+                const hasMenstruation = cycleEntry.flow_intensity &&
+                    cycleEntry.flow_intensity !== 'none' &&
+                    cycleEntry.flow_intensity !== '';
+
+                if (hasMenstruation) {
+                    day.classList.add('menstruation');
+                    const menstruationIndicator = document.createElement('div');
+                    menstruationIndicator.className = 'menstruation-indicator';
+                    menstruationIndicator.innerHTML = '<i class="fas fa-droplet"></i>';
+                    day.appendChild(menstruationIndicator);
+                }
+
+                const symptoms = cycleEntry.symptoms || [];
+                if (symptoms.length > 0) {
+                    const symptomsContainer = document.createElement('div');
+                    symptomsContainer.className = 'symptoms-dots-compact';
+
+                    symptoms.slice(0, 6).forEach(symptom => {
+                        const dot = document.createElement('div');
+                        dot.className = 'symptom-dot-compact';
+                        dot.style.backgroundColor = getSymptomColor(symptom);
+                        dot.title = symptom;
+                        symptomsContainer.appendChild(dot);
+                    });
+
+                    day.appendChild(symptomsContainer);
+                }
+            }
+
+            day.addEventListener('click', function () {
+                if (!isValidDateForEntry(dateStr)) {
+                    showToast('Нельзя редактировать будущие дни', 'error');
+                    return;
+                }
+                document.querySelectorAll('.calendar-day.selected').forEach(day => {
+                    day.classList.remove('selected');
+                });
+                day.classList.add('selected');
+                openDayDetail(dateStr);
+            });
+
+            calendar.appendChild(day);
+        }
+
+        const totalCells = 35;
+        const filledCells = startDay - 1 + daysInMonth;
+        if (filledCells < totalCells) {
+            for (let i = 1; i <= totalCells - filledCells; i++) {
+                const day = createDayElement(i, 'other-month', true);
+                calendar.appendChild(day);
+            }
+        }
+    }
+
+    function createDayElement(dayNumber, className, isOtherMonth) {
+        const dayElement = document.createElement('div');
+        dayElement.className = 'calendar-day';
+
+        if (className) dayElement.classList.add(className);
+
+        const numberElement = document.createElement('div');
+        numberElement.className = 'day-number';
+        numberElement.textContent = dayNumber;
+        dayElement.appendChild(numberElement);
+
+        if (isOtherMonth) {
+            dayElement.style.cursor = 'default';
+            dayElement.style.pointerEvents = 'none';
+            dayElement.style.opacity = '0.5';
+        }
+
+        return dayElement;
+    }
+
+    function changeMonth(step) {
+        currentDate.setMonth(currentDate.getMonth() + step);
+        renderCalendar();
+        currentChartDate = new Date(currentDate);
+        updateChartTitle();
+        if (moodOverTimeChart) moodOverTimeChart.destroy();
+        createMoodOverTimeChart();
+        console.log(`📅 Переключился на месяц: ${currentChartDate.toLocaleString('ru-RU', { month: 'long', year: 'numeric' })}`);
+    }
+
+    function goToToday() {
+        currentDate = new Date();
+        currentChartDate = new Date(currentDate);
+        renderCalendar();
+        resetToToday();
+        if (moodOverTimeChart) moodOverTimeChart.destroy();
+        createMoodOverTimeChart();
+        showToast('Перешли к текущему месяцу', 'info');
+    }
+
+    function refreshMoodChart() {
+        if (moodOverTimeChart) moodOverTimeChart.destroy();
+        createMoodOverTimeChart();
+        console.log('📊 График настроения обновлен');
+    }
+
+    // ==========================================================================
+    // ФУНКЦИИ ДЛЯ ДЕЙСТВИЙ ПОЛЬЗОВАТЕЛЯ
+    // ==========================================================================
+
+    function goToMoodTracker() {
+        window.location.href = "/calendar";
+    }
+
+    async function markMenstruationStart() {
+        const dateStr = currentSelectedDate || formatDate(new Date());
+        const existingEntry = cycleData.find(entry => entry.date === dateStr);
+        const hasMenstruation = existingEntry?.flow_intensity && existingEntry.flow_intensity !== 'none';
+
+        try {
+            showLoading(true);
+
+            const requestData = {
+                date: dateStr,
+                symptoms: existingEntry?.symptoms || [],
+                notes: existingEntry?.notes || '',
+                flow_intensity: hasMenstruation ? 'none' : 'light',
+                cycle_day: existingEntry?.cycle_day || null,
+                mood: existingEntry?.mood || null
+            };
+
+            console.log('📤 Отправка запроса на менструацию:', requestData);
+
+            const response = await fetch(CYCLE_API, {
+                method: 'POST',
+                credentials: 'include',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/json'
+                },
+                body: JSON.stringify(requestData)
+            });
+
+            if (response.redirected) {
+                console.error('❌ Редирект на логин, сессия истекла');
+                showToast('Сессия истекла, пожалуйста, войдите снова', 'error');
+                window.location.href = '/auth/login';
+                return;
+            }
+
+            if (!response.ok) {
+                const errorText = await response.text();
+                console.error('❌ Ошибка сервера:', response.status, errorText);
+                if (errorText.trim().startsWith('<!DOCTYPE')) {
+                    showToast('Ошибка авторизации. Пожалуйста, обновите страницу', 'error');
+                } else {
+                    showToast('Ошибка: ' + errorText, 'error');
+                }
+                return;
+            }
+
+            const contentType = response.headers.get('content-type');
+            if (contentType && contentType.includes('application/json')) {
+                const result = await response.json();
+                showToast(hasMenstruation ? 'Менструация убрана' : 'Менструация отмечена', 'success');
+                await refreshAllData();
+            } else {
+                const text = await response.text();
+                console.error('❌ Ответ не JSON:', text);
+                showToast('Ошибка формата ответа', 'error');
+            }
+
+        } catch (error) {
+            console.error('❌ Ошибка отметки менструации:', error);
+            showToast('Ошибка отметки менструации: ' + error.message, 'error');
+        } finally {
+            showLoading(false);
+        }
+    }
+
+    async function saveCycleEntry() {
+        console.log('💾 Начинаю сохранение записи...');
+
+        let dateStr;
+        if (currentSelectedDate && isEditMode) {
+            dateStr = currentSelectedDate;
+        } else {
+            dateStr = formatDate(new Date());
+        }
+
+        console.log('📅 Сохраняем для даты:', dateStr);
+
+        const selected = new Date(dateStr);
+        const today = new Date();
+        today.setHours(0, 0, 0, 0);
+        selected.setHours(0, 0, 0, 0);
+
+        if (selected > today) {
+            showToast('Нельзя создать запись в будущем', 'error');
+            return;
+        }
+
+        const selectedSymptoms = Array.from(
+            document.querySelectorAll('input[name="symptoms"]:checked')
+        ).map(cb => cb.value);
+
+        const notes = document.getElementById('cycleNotes').value.trim();
+
+        if (selectedSymptoms.length === 0 && !notes) {
+            if (!confirm('Сохранить пустую запись?')) return;
+        }
+
+        const existingEntry = cycleData.find(entry => entry.date === dateStr);
+        const flowIntensity = existingEntry ? (existingEntry.flow_intensity || 'none') : 'none';
+
+        try {
+            showLoading(true);
+
+            const requestData = {
+                date: dateStr,
+                symptoms: selectedSymptoms,
+                notes: notes,
+                flow_intensity: flowIntensity,
+                cycle_day: null,
+                mood: null
+            };
+
+            const response = await fetch(CYCLE_API, {
+                method: 'POST',
+                credentials: 'include',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/json'
+                },
+                body: JSON.stringify(requestData)
+            });
+
+            if (response.ok) {
+                const result = await response.json();
+                showToast(existingEntry ? 'Запись обновлена!' : 'Запись сохранена!', 'success');
+                await refreshAllData();
+                if (!currentSelectedDate) clearForm();
+            } else {
+                const errorText = await response.text();
+                console.error('❌ Ошибка сервера:', errorText);
+                showToast('Ошибка сохранения записи', 'error');
+            }
+
+        } catch (error) {
+            console.error('❌ Ошибка сохранения:', error);
+            showToast('Ошибка сохранения записи: ' + error.message, 'error');
+        } finally {
+            showLoading(false);
+        }
+    }
+
+    async function deleteCycleEntry() {
+        if (!currentSelectedDate) {
+            showToast('Сначала выберите день в календаре', 'error');
+            return;
+        }
+
+        const existingEntry = cycleData.find(entry => entry.date === currentSelectedDate);
+        if (!existingEntry) {
+            showToast('Для этой даты нет записи', 'info');
+            return;
+        }
+
+        if (!confirm(`Удалить запись за ${formatDateDisplay(currentSelectedDate)}?`)) return;
+
+        console.log('🗑️ Удаляю запись за:', currentSelectedDate);
+
+        try {
+            showLoading(true);
+
+            const response = await fetch(`${CYCLE_API}/${currentSelectedDate}`, {
+                method: 'DELETE',
+                credentials: 'include',
+                headers: { 'Content-Type': 'application/json' }
+            });
+
+            if (response.ok) {
+                const result = await response.json();
+                if (result.success) {
+                    showToast(`Запись за ${formatDateDisplay(currentSelectedDate)} удалена!`, 'success');
+                    await refreshAllData();
+                    resetToToday();
+                } else {
+                    showToast('Ошибка удаления записи', 'error');
+                }
+            } else {
+                const errorText = await response.text();
+                console.error('❌ Ошибка удаления:', errorText);
+                showToast('Ошибка удаления записи', 'error');
+            }
+        } catch (error) {
+            console.error('❌ Ошибка удаления:', error);
+            showToast('Ошибка удаления записи: ' + error.message, 'error');
+        } finally {
+            showLoading(false);
+        }
+    }
+
+    function clearForm() {
+        console.log('🧹 Очищаю форму...');
+        document.querySelectorAll('input[name="symptoms"]:checked').forEach(checkbox => {
+            checkbox.checked = false;
+        });
+        document.getElementById('cycleNotes').value = '';
+        updateMenstruationButton('none');
+    }
+
+    function clearSelectedDate() {
+        if (!currentSelectedDate) {
+            showToast('Сначала выберите день в календаре', 'error');
+            return;
+        }
+        const existingEntry = cycleData.find(entry => entry.date === currentSelectedDate);
+        if (existingEntry) {
+            deleteCycleEntry();
+        } else {
+            resetToToday();
+            showToast('Форма очищена', 'info');
+        }
+    }
+
+    function resetToToday() {
+        console.log('🔄 Сбрасываю к сегодняшнему дню...');
+        currentSelectedDate = null;
+        isEditMode = false;
+
+        const formTitle = document.querySelector('.tracker-form h3');
+        if (formTitle) {
+            formTitle.innerHTML = `<i class="fas fa-edit"></i> Отметить сегодня`;
+        }
+
+        document.querySelectorAll('.calendar-day.selected').forEach(day => {
+            day.classList.remove('selected');
+        });
+
+        clearForm();
+        console.log('✅ Сброс выполнен');
+    }
+
+    async function openDayDetail(dateStr) {
+        if (!isValidDateForEntry(dateStr)) {
+            showToast('Нельзя редактировать будущие дни', 'error');
+            return;
+        }
+
+        console.log('📅 Открываю детали дня:', dateStr);
+        currentSelectedDate = dateStr;
+        isEditMode = true;
+
+        const existingEntry = await loadDayEntry(dateStr);
+        fillFormWithData(dateStr, existingEntry);
+
+        document.querySelector('.tracker-form').scrollIntoView({
+            behavior: 'smooth',
+            block: 'start'
+        });
+
+        showToast(`Редактирование дня ${formatDateDisplay(dateStr)}`, 'info');
+    }
+
+    function fillFormWithData(dateStr, entry) {
+        console.log('📝 Заполняю форму для даты:', dateStr, 'данные:', entry);
+
+        const formTitle = document.querySelector('.tracker-form h3');
+        if (formTitle) {
+            formTitle.innerHTML = `<i class="fas fa-edit"></i> ${formatDateDisplay(dateStr)}`;
+        }
+
+        clearForm();
+
+        if (entry) {
+            if (entry.symptoms && Array.isArray(entry.symptoms)) {
+                entry.symptoms.forEach(symptom => {
+                    const checkbox = Array.from(document.querySelectorAll('input[name="symptoms"]'))
+                        .find(cb => cb.value === symptom);
+                    if (checkbox) {
+                        checkbox.checked = true;
+                        console.log('✅ Отмечен симптом:', symptom);
+                    }
+                });
+            }
+
+            updateMenstruationButton(entry.flow_intensity);
+
+            const notesTextarea = document.getElementById('cycleNotes');
+            if (notesTextarea && entry.notes) notesTextarea.value = entry.notes;
+        }
+    }
+
+    function isValidDateForEntry(dateStr) {
+        try {
+            const selectedDate = new Date(dateStr);
+            const today = new Date();
+            selectedDate.setHours(0, 0, 0, 0);
+            today.setHours(0, 0, 0, 0);
+            return selectedDate <= today;
+        } catch (error) {
+            console.error('Ошибка проверки даты:', error);
+            return false;
+        }
+    }
+
+    // ==========================================================================
+    // ФУНКЦИИ ЗАГРУЗКИ ДАННЫХ
+    // ==========================================================================
+
+    async function checkAuth() {
+        try {
+            const response = await fetch('/api/check-auth', {
+                credentials: 'include',
+                headers: { 'Accept': 'application/json' }
+            });
+
+            if (response.ok) {
+                const data = await response.json();
+                console.log('✅ Авторизация подтверждена, user_id:', data.user_id);
+                return true;
+            } else if (response.status === 401) {
+                console.error('❌ Не авторизован, перенаправление на логин');
+                window.location.href = '/auth/login';
+                return false;
+            } else {
+                console.error('❌ Ошибка проверки авторизации:', response.status);
+                return false;
+            }
+        } catch (error) {
+            console.error('❌ Ошибка при проверке авторизации:', error);
+            return false;
+        }
+    }
+
+    async function loadUserCycleSettings() {
+        try {
+            const response = await fetch('/api/cycle_settings', {
+                credentials: 'include',
+                headers: { 'Accept': 'application/json' }
+            });
+            if (response.ok) {
+                userCycleSettings = await response.json();
+                console.log('⚙️ Настройки цикла загружены:', userCycleSettings);
+            }
+        } catch (error) {
+            console.error('Ошибка загрузки настроек цикла:', error);
+        }
+    }
+
+    async function loadCycleData() {
+        try {
+            console.log('📊 Загружаю данные цикла...');
+            const response = await fetch(`${CYCLE_API}?all=1`, {
+                credentials: 'include',
+                headers: { 'Accept': 'application/json' }
+            });
+
+            if (response.ok) {
+                cycleData = await response.json();
+                console.log('✅ Данные цикла загружены:', cycleData.length, 'записей');
+                updateSymptomsLegend();
+            } else {
+                console.error('❌ Ошибка загрузки данных цикла:', response.status);
+                showToast('Ошибка загрузки данных цикла', 'error');
+            }
+        } catch (error) {
+            console.error('Сетевая ошибка загрузки данных цикла:', error);
+            showToast('Сетевая ошибка', 'error');
+        }
+    }
+
+    async function loadMoodData() {
+        try {
+            console.log('📥 Загружаю данные настроения с:', MOOD_API);
+
+            const response = await fetch(`${MOOD_API}?all=1`, {
+                credentials: 'include',
+                headers: { 'Accept': 'application/json' }
+            });
+
+            if (response.ok) {
+                const contentType = response.headers.get('content-type');
+                if (contentType && contentType.includes('application/json')) {
+                    moodData = await response.json();
+                    console.log('✅ Данные настроения загружены:', moodData.length, 'записей');
+                } else {
+                    const text = await response.text();
+                    console.error('❌ Ответ сервера не JSON:', text.substring(0, 200));
+                }
+            } else {
+                console.error('❌ Ошибка загрузки настроения. Статус:', response.status);
+            }
+
+            await loadCycleStats();
+            await loadCyclePredictions();
+            await loadTodayMood();
+
+            console.log('✅ Все данные настроения загружены');
+        } catch (error) {
+            console.error('❌ Ошибка загрузки данных настроения:', error);
+        }
+    }
+
+    async function loadCycleStats() {
+        try {
+            const response = await fetch(CYCLE_STATS_API, {
+                credentials: 'include',
+                headers: { 'Accept': 'application/json' }
+            });
+
+            if (response.redirected) {
+                console.log('⚠️ Редирект на логин в loadCycleStats');
+                return;
+            }
+
+            if (response.ok) {
+                const contentType = response.headers.get('content-type');
+                if (contentType && contentType.includes('application/json')) {
+                    const stats = await response.json();
+                    updateStatsDisplay(stats);
+                } else {
+                    const text = await response.text();
+                    console.error('❌ Ответ сервера не JSON (loadCycleStats):', text.substring(0, 100));
+                }
+            } else {
+                console.error('❌ Ошибка загрузки статистики цикла:', response.status);
+            }
+        } catch (error) {
+            console.error('❌ Ошибка загрузки статистики цикла:', error);
+        }
+    }
+
+    async function loadCyclePredictions() {
+        try {
+            const response = await fetch(CYCLE_PREDICTIONS_API, { credentials: 'include' });
+            if (response.ok) {
+                const contentType = response.headers.get('content-type');
+                if (contentType && contentType.includes('application/json')) {
+                    const predictions = await response.json();
+                    updatePredictionsDisplay(predictions);
+                } else {
+                    const text = await response.text();
+                    console.error('Ответ сервера не JSON (loadCyclePredictions):', text);
+                }
+            } else if (response.status === 400) {
+                console.log('📅 Нет данных для прогноза цикла (нужно настроить цикл)');
+            } else {
+                console.error('Ошибка загрузки прогнозов:', response.status);
+            }
+        } catch (error) {
+            console.error('Ошибка загрузки прогнозов цикла:', error);
+        }
+    }
+
+    async function loadTodayMood() {
+        try {
+            const response = await fetch(TODAY_MOOD_API, {
+                credentials: 'include',
+                headers: { 'Accept': 'application/json' }
+            });
+
+            if (response.redirected) {
+                console.log('⚠️ Редирект на логин в loadTodayMood');
+                updateTodayMoodDisplay(null);
+                return;
+            }
+
+            if (response.ok) {
+                const contentType = response.headers.get('content-type');
+                if (contentType && contentType.includes('application/json')) {
+                    const todayMood = await response.json();
+                    updateTodayMoodDisplay(todayMood);
+                } else {
+                    const text = await response.text();
+                    console.error('❌ Ответ сервера не JSON (loadTodayMood):', text.substring(0, 100));
+                    updateTodayMoodDisplay(null);
+                }
+            } else if (response.status === 401) {
+                console.log('⚠️ Не авторизован в loadTodayMood');
+                updateTodayMoodDisplay(null);
+            } else {
+                console.error('❌ Ошибка загрузки сегодняшнего настроения:', response.status);
+                updateTodayMoodDisplay(null);
+            }
+        } catch (error) {
+            console.error('❌ Ошибка загрузки сегодняшнего настроения:', error);
+            updateTodayMoodDisplay(null);
+        }
+    }
+
+    async function loadDayEntry(dateStr) {
+        try {
+            const response = await fetch(`${CYCLE_API}?date=${dateStr}`, {
+                credentials: 'include',
+                headers: { 'Accept': 'application/json' }
+            });
+            if (response.ok) {
+                const entries = await response.json();
+                return entries.length > 0 ? entries[0] : null;
+            }
+            return null;
+        } catch (error) {
+            console.error('Ошибка загрузки записи:', error);
+            return null;
+        }
+    }
+
+    async function loadInitialData() {
+        try {
+            console.log('📥 Начинаю загрузку данных...');
+
+            const isAuth = await checkAuth();
+            if (!isAuth) return;
+
+            await loadCycleData();
+            renderCalendar();
+
+            await loadMoodData();
+            await new Promise(resolve => setTimeout(resolve, 300));
+
+            await loadCycleStats();
+            await new Promise(resolve => setTimeout(resolve, 300));
+
+            await loadTodayMood();
+            await new Promise(resolve => setTimeout(resolve, 300));
+
+            try {
+                await loadCyclePredictions();
+            } catch (error) {
+                console.log('ℹ️ Нет данных для прогнозов цикла');
+            }
+
+            initCharts();
+            console.log('✅ Все данные загружены');
+        } catch (error) {
+            console.error('❌ Ошибка загрузки данных:', error);
+            showToast('Ошибка загрузки данных', 'error');
+        }
+    }
+
+    async function refreshAllData() {
+        console.log('🔄 Обновляю все данные...');
+
+        try {
+            showLoading(true);
+
+            await loadCycleData();
+            await new Promise(resolve => setTimeout(resolve, 300));
+
+            await loadMoodData();
+            await new Promise(resolve => setTimeout(resolve, 300));
+
+            await loadCycleStats();
+            await new Promise(resolve => setTimeout(resolve, 300));
+
+            await loadCyclePredictions();
+            await new Promise(resolve => setTimeout(resolve, 300));
+
+            await loadTodayMood();
+
+            renderCalendar();
+            updateSymptomsLegend();
+            initCharts();
+
+            console.log('✅ Все данные обновлены');
+        } catch (error) {
+            console.error('❌ Ошибка при обновлении данных:', error);
+            showToast('Ошибка при обновлении данных', 'error');
+        } finally {
+            showLoading(false);
+        }
+    }
+
+    // ==========================================================================
+    // ФУНКЦИИ ДЛЯ ГРАФИКОВ
+    // ==========================================================================
+
+    function initCharts() {
+        console.log('📊 Инициализирую графики...');
+        currentChartDate = new Date(currentDate);
+        createMoodOverTimeChart();
+        createSymptomsChart();
+    }
+
+    function getMoodOverTimeDataForCurrentMonth() {
+        console.log(`📈 Собираю данные за ${currentChartDate.toLocaleString('ru-RU', { month: 'long', year: 'numeric' })}...`);
+        console.log('📊 moodData содержит:', moodData ? moodData.length : 0, 'записей');
+
+        const year = currentChartDate.getFullYear();
+        const month = currentChartDate.getMonth();
+        const daysInMonth = new Date(year, month + 1, 0).getDate();
+        const labels = [];
+        const values = [];
+        const dates = [];
+        let hasData = false;
+
+        for (let day = 1; day <= daysInMonth; day++) {
+            const date = new Date(year, month, day);
+            const dateStr = formatDate(date);
+            dates.push(dateStr);
+            labels.push(day.toString());
+
+            if (moodData && Array.isArray(moodData)) {
+                const moodEntry = moodData.find(m => m && m.date === dateStr);
+                if (moodEntry && moodEntry.mood !== undefined && moodEntry.mood !== null) {
+                    values.push(parseFloat(moodEntry.mood));
+                    hasData = true;
+                } else {
+                    values.push(null);
+                }
+            } else {
+                values.push(null);
+            }
+        }
+
+        console.log(`📊 Данные за ${month + 1}.${year}:`, {
+            labels,
+            values: values.filter(v => v !== null),
+            hasData,
+            count: values.filter(v => v !== null).length
+        });
+
+        return { labels, values, dates, hasData };
+    }
+
+function createMoodOverTimeChart() {
+    const canvas = document.getElementById('moodOverTimeChart');
+    if (!canvas) {
+        console.error('❌ Canvas для линейного графика не найден');
+        return;
+    }
+
+    if (moodOverTimeChart) moodOverTimeChart.destroy();
+
+    const moodOverTimeData = getMoodOverTimeDataForCurrentMonth();
+    const noMoodTimeData = document.getElementById('noMoodTimeData');
+    
+    const cyclePhases = getCyclePhasesForChart();
+    console.log('🔄 Фазы цикла для графика:', cyclePhases);
+
+    if (moodOverTimeData.hasData) {
+        if (noMoodTimeData) noMoodTimeData.style.display = 'none';
+
+        const ctx = canvas.getContext('2d');
+
+        moodOverTimeChart = new Chart(ctx, {
+            type: 'line',
+            data: {
+                labels: moodOverTimeData.labels,
+                datasets: [
+                    {
+                        label: 'Настроение',
+                        data: moodOverTimeData.values,
+                        borderColor: '#60F4E3',
+                        backgroundColor: 'transparent',
+                        tension: 0.4,
+                        fill: false,
+                        pointBackgroundColor: moodOverTimeData.values.map((val, index) => {
+                            if (val === null) return '#ccc';
+                            const day = index + 1;
+                            const phase = cyclePhases.find(p => p && p.day === day);
+                            
+                            // Возвращаем цвет в зависимости от фазы
+                            switch(phase?.type) {
+                                case 'menstruation': return '#FF6B6B';
+                                case 'follicular': return '#60F4E3';
+                                case 'ovulation': return '#FF70EC';
+                                case 'luteal': return '#FFD166';
+                                case 'pms': return '#B8B3E9';
+                                default: return getMoodColorForValue(val);
+                            }
+                        }),
+                        pointBorderColor: '#fff',
+                        pointRadius: 8,
+                        pointHoverRadius: 10,
+                        borderWidth: 3,
+                        order: 1,
+                        spanGaps: false
+                    }
+                ]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                scales: {
+                    y: {
+                        beginAtZero: true,
+                        min: 0,
+                        max: 10,
+                        ticks: {
+                            stepSize: 1,
+                            font: { size: 12 },
+                            callback: function (value) {
+                                const emojis = ['', '😞', '', '', '😐', '', '', '😊', '', '🤩'];
+                                return emojis[value] || value;
+                            }
+                        },
+                        grid: { color: 'rgba(0, 0, 0, 0.05)' },
+                        title: {
+                            display: true,
+                            text: 'Настроение (1-10)',
+                            font: { size: 14, weight: 'bold' }
+                        }
+                    },
+                    x: {
+                        grid: { display: false },
+                        ticks: { font: { size: 11 }, maxRotation: 0 }
+                    }
+                },
+                plugins: {
+                    legend: { display: true, position: 'top' },
+                    tooltip: {
+                        mode: 'index',
+                        intersect: false,
+                        backgroundColor: 'rgba(0, 0, 0, 0.9)',
+                        callbacks: {
+                            title: function (tooltipItems) {
+                                const dateStr = moodOverTimeData.dates[tooltipItems[0].dataIndex];
+                                const date = new Date(dateStr);
+                                return date.toLocaleDateString('ru-RU', {
+                                    weekday: 'long',
+                                    day: 'numeric',
+                                    month: 'long'
+                                });
+                            },
+                            label: function (context) {
+                                const value = context.raw;
+                                if (value === null) return 'Настроение: Нет данных';
+                                const emoji = getMoodEmoji(value);
+                                const day = context.dataIndex + 1;
+                                const phase = cyclePhases.find(p => p && p.day === day);
+                                const phaseNames = {
+                                    'menstruation': '🩸 Менструация',
+                                    'follicular': '🌱 Фолликулярная фаза',
+                                    'ovulation': '🥚 Овуляция',
+                                    'luteal': '🌙 Лютеиновая фаза',
+                                    'pms': '💫 ПМС'
+                                };
+                                return [
+                                    `${emoji} Настроение: ${value.toFixed(1)}/10`,
+                                    `${phaseNames[phase?.type] || 'Неизвестно'}`
+                                ];
+                            }
+                        }
+                    }
+                }
+            }
+        });
+
+        console.log('✅ Линейный график настроения с фазами цикла создан');
+    } else {
+        if (noMoodTimeData) noMoodTimeData.style.display = 'flex';
+        console.log('ℹ️ Нет данных для линейного графика настроения');
+    }
+}
+
+    function getSymptomsChartData() {
+        console.log('📊 Собираю данные для графика симптомов...');
+
+        const symptomStats = {};
+        let totalEntries = 0;
+
+        cycleData.forEach(entry => {
+            if (entry.symptoms && Array.isArray(entry.symptoms)) {
+                entry.symptoms.forEach(symptom => {
+                    symptomStats[symptom] = (symptomStats[symptom] || 0) + 1;
+                    totalEntries++;
+                });
+            }
+        });
+
+        if (totalEntries === 0) {
+            return { labels: [], values: [], colors: [], hasData: false };
+        }
+
+        const sorted = Object.entries(symptomStats)
+            .sort((a, b) => b[1] - a[1])
+            .slice(0, 8);
+
+        return {
+            labels: sorted.map(([symptom]) => symptom),
+            values: sorted.map(([, count]) => count),
+            colors: sorted.map(([symptom]) => getSymptomColor(symptom)),
+            hasData: sorted.length > 0
+        };
+    }
+
+    function createSymptomsChart() {
+        const canvas = document.getElementById('symptomsChart');
+        if (!canvas) return;
+
+        if (symptomsChart) symptomsChart.destroy();
+
+        const symptomsDataForChart = getSymptomsChartData();
+        const noSymptomsData = document.getElementById('noSymptomsData');
+
+        if (symptomsDataForChart.hasData) {
+            if (noSymptomsData) noSymptomsData.style.display = 'none';
+
+            symptomsChart = new Chart(canvas, {
+                type: 'doughnut',
+                data: {
+                    labels: symptomsDataForChart.labels,
+                    datasets: [{
+                        data: symptomsDataForChart.values,
+                        backgroundColor: symptomsDataForChart.colors,
+                        borderColor: symptomsDataForChart.colors.map(color => color.replace('0.6', '1')),
+                        borderWidth: 2
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    plugins: {
+                        legend: {
+                            position: 'right',
+                            labels: { boxWidth: 15, padding: 15, font: { size: 12 } }
+                        },
+                        tooltip: {
+                            callbacks: {
+                                label: function (context) {
+                                    const label = context.label || '';
+                                    const value = context.raw || 0;
+                                    const total = symptomsDataForChart.values.reduce((a, b) => a + b, 0);
+                                    const percentage = total > 0 ? Math.round((value / total) * 100) : 0;
+                                    return `${label}: ${value} раз (${percentage}%)`;
+                                }
+                            }
+                        }
+                    }
+                }
+            });
+        } else {
+            if (noSymptomsData) noSymptomsData.style.display = 'flex';
+        }
+    }
+
+    // ==========================================================================
+    // ФУНКЦИИ ДЛЯ ФАЗ ЦИКЛА
+    // ==========================================================================
+
+function getCyclePhasesForChart() {
+    console.log('🔄 Получаю фазы цикла для графика...');
+    console.log('📊 cycleData:', cycleData);
+    console.log('📊 userCycleSettings:', userCycleSettings);
+
+    const year = currentChartDate.getFullYear();
+    const month = currentChartDate.getMonth();
+    const daysInMonth = new Date(year, month + 1, 0).getDate();
+
+    // Сначала проверяем реальные данные из cycle_entries
+    const phasesFromEntries = calculatePhasesFromCycleEntries(year, month, daysInMonth);
+    if (phasesFromEntries) {
+        console.log('✅ Фазы рассчитаны из cycle_entries');
+        return phasesFromEntries;
+    }
+
+    // Если есть настройки цикла, используем их для расчета предполагаемых фаз
+    if (userCycleSettings && userCycleSettings.last_period_start) {
+        const phasesFromSettings = calculatePhasesFromSettings(year, month, daysInMonth);
+        if (phasesFromSettings) {
+            console.log('✅ Фазы рассчитаны из настроек (предполагаемые)');
+            return phasesFromSettings;
+        }
+    }
+
+    // Если совсем нет данных, возвращаем "нейтральные" фазы (все фолликулярная)
+    console.log('⚠️ Нет данных о цикле, использую нейтральные фазы');
+    return getNeutralPhasesForMonth(daysInMonth);
+}
+
+// Добавьте после функции getCyclePhasesForChart()
+function debugCyclePhases() {
+    console.log('🔍 ОТЛАДКА ФАЗ ЦИКЛА:');
+    console.log('currentDate:', currentDate);
+    console.log('currentChartDate:', currentChartDate);
+    console.log('cycleData:', cycleData);
+    
+    const phases = getCyclePhasesForChart();
+    console.log('phasеs для текущего месяца:', phases);
+    
+    // Проверим цвета для каждого дня
+    phases.forEach(p => {
+        console.log(`День ${p.day}: ${p.type} - ${p.color}`);
+    });
+    
+    return phases;
+}
+
+
+    function calculatePhasesFromCycleEntries(year, month, daysInMonth) {
+        if (!cycleData || cycleData.length === 0) {
+            console.log('ℹ️ Нет данных cycle_entries');
+            return null;
+        }
+
+        const periodDaysInMonth = [];
+
+        cycleData.forEach(entry => {
+            const entryDate = new Date(entry.date);
+            if (entryDate.getFullYear() === year &&
+                entryDate.getMonth() === month &&
+                entry.flow_intensity &&
+                entry.flow_intensity !== 'none') {
+                periodDaysInMonth.push(entryDate.getDate());
+            }
+        });
+
+        console.log('📅 Дни с менструацией в этом месяце:', periodDaysInMonth);
+
+        if (periodDaysInMonth.length > 0) {
+            periodDaysInMonth.sort((a, b) => a - b);
+            let startDay = periodDaysInMonth[0];
+            let endDay = periodDaysInMonth[0];
+
+            for (let i = 1; i < periodDaysInMonth.length; i++) {
+                if (periodDaysInMonth[i] === periodDaysInMonth[i - 1] + 1) {
+                    endDay = periodDaysInMonth[i];
+                } else {
+                    break;
+                }
+            }
+
+            const periodLength = endDay - startDay + 1;
+            console.log(`📅 Основной период: дни ${startDay}-${endDay} (${periodLength} дней)`);
+
+            return generatePhasesFromPeriod(startDay, periodLength, daysInMonth);
+        }
+
+        return null;
+    }
+
+    function calculatePhasesFromSettings(year, month, daysInMonth) {
+        try {
+            const lastPeriod = new Date(userCycleSettings.last_period_start);
+            const cycleLength = userCycleSettings.cycle_length || 28;
+            const periodLength = userCycleSettings.period_length || 5;
+
+            let cycleStartInMonth = null;
+            let currentDate = new Date(year, month, 1);
+
+            for (let day = 1; day <= daysInMonth; day++) {
+                const date = new Date(year, month, day);
+                const daysSinceLastPeriod = Math.floor((date - lastPeriod) / (1000 * 60 * 60 * 24));
+
+                if (daysSinceLastPeriod >= 0 && daysSinceLastPeriod < periodLength) {
+                    cycleStartInMonth = day - daysSinceLastPeriod;
+                    break;
+                }
+            }
+
+            if (cycleStartInMonth) {
+                return generatePhasesFromStartDay(cycleStartInMonth, cycleLength, periodLength, daysInMonth);
+            }
+
+            const daysSinceLastPeriod = Math.floor((new Date(year, month, 1) - lastPeriod) / (1000 * 60 * 60 * 24));
+            if (daysSinceLastPeriod > 0) {
+                const dayInCycle = (daysSinceLastPeriod % cycleLength) + 1;
+                const cycleStartDay = 1 - (dayInCycle - 1);
+                return generatePhasesFromStartDay(cycleStartDay, cycleLength, periodLength, daysInMonth);
+            }
+
+        } catch (error) {
+            console.error('❌ Ошибка расчета фаз из настроек:', error);
+        }
+
+        return null;
+    }
+
+    function generatePhasesFromStartDay(startDay, cycleLength, periodLength, daysInMonth) {
+        const phases = [];
+
+        for (let day = 1; day <= daysInMonth; day++) {
+            const cycleDay = ((day - startDay) % 28 + 28) % 28 + 1;
+            let phaseType = 'follicular';
+
+            if (cycleDay >= 1 && cycleDay <= periodLength) {
+                phaseType = 'menstruation';
+            } else if (cycleDay >= periodLength + 1 && cycleDay <= 13) {
+                phaseType = 'follicular';
+            } else if (cycleDay >= 14 && cycleDay <= 15) {
+                phaseType = 'ovulation';
+            } else if (cycleDay >= 16 && cycleDay <= 23) {
+                phaseType = 'luteal';
+            } else if (cycleDay >= 24 && cycleDay <= 28) {
+                phaseType = 'pms';
+            }
+
+            phases.push({
+                day: day,
+                type: phaseType,
+                color: getPhaseColor(phaseType, 0.2)
+            });
+        }
+
+        return phases;
+    }
+
+function generatePhasesFromPeriod(startDay, periodLength, daysInMonth) {
+    const phases = [];
+    const cycleLength = 28; // стандартная длина цикла
+    
+    console.log(`🔄 Генерация фаз от дня ${startDay}, длительность менструации ${periodLength} дней`);
+    
+    for (let day = 1; day <= daysInMonth; day++) {
+        let phaseType = 'follicular';
+        
+        // Рассчитываем день цикла относительно начала менструации
+        // День начала менструации = день 1 цикла
+        let cycleDay = day - startDay + 1;
+        
+        // Если день меньше начала менструации, значит это дни после ПМС из следующего цикла
+        if (cycleDay < 1) {
+            cycleDay = cycleDay + 28; // Добавляем 28 дней для перехода к следующему циклу
+        }
+        
+        // Определяем фазу по дню цикла (стандартный 28-дневный цикл)
+        if (cycleDay >= 1 && cycleDay <= periodLength) {
+            // Дни менструации (1-5 дни цикла)
+            phaseType = 'menstruation';
+        } 
+        else if (cycleDay >= periodLength + 1 && cycleDay <= 13) {
+            // Фолликулярная фаза (после менструации до овуляции)
+            phaseType = 'follicular';
+        }
+        else if (cycleDay >= 14 && cycleDay <= 15) {
+            // Овуляция (14-15 дни цикла)
+            phaseType = 'ovulation';
+        }
+        else if (cycleDay >= 16 && cycleDay <= 23) {
+            // Лютеиновая фаза (16-23 дни цикла)
+            phaseType = 'luteal';
+        }
+        else if (cycleDay >= 24 && cycleDay <= 28) {
+            // ПМС (24-28 дни цикла)
+            phaseType = 'pms';
+        }
+        
+        phases.push({
+            day: day,
+            type: phaseType,
+            color: getPhaseColor(phaseType, 0.2)
+        });
+        
+        // Отладка для первых 5 дней и дней вокруг менструации
+        if (day <= 5 || (day >= startDay - 2 && day <= startDay + 10)) {
+            console.log(`День ${day}: cycleDay=${cycleDay}, фаза=${phaseType}`);
+        }
+    }
+    
+    return phases;
+}
+
+// Нейтральные фазы, когда нет данных о цикле
+function getNeutralPhasesForMonth(daysInMonth) {
+    const phases = [];
+    
+    console.log('🔄 Генерация нейтральных фаз (без менструации)');
+    
+    for (let day = 1; day <= daysInMonth; day++) {
+        // По умолчанию все дни - фолликулярная фаза (нейтральная)
+        phases.push({
+            day: day,
+            type: 'follicular',
+            color: getPhaseColor('follicular', 0.2)
+        });
+    }
+    
+    return phases;
+}
+
+function testPhaseCalculation() {
+    console.log('🔍 ТЕСТ РАСЧЕТА ФАЗ:');
+    console.log('📊 Текущие данные:');
+    console.log('- cycleData:', cycleData);
+    console.log('- userCycleSettings:', userCycleSettings);
+    console.log('- currentChartDate:', currentChartDate);
+    
+    // Получаем фазы для текущего месяца
+    const phases = getCyclePhasesForChart();
+    console.log('\n📅 Фазы для текущего месяца:');
+    
+    // Группируем по дням для наглядности
+    const phasesByDay = {};
+    phases.forEach(p => {
+        phasesByDay[p.day] = p.type;
+    });
+    
+    // Выводим первые 10 дней для примера
+    console.log('Первые 10 дней:');
+    for (let day = 1; day <= 10; day++) {
+        console.log(`  День ${day}: ${phasesByDay[day] || 'не определено'}`);
+    }
+    
+    // Находим дни с менструацией
+    const menstruationDays = phases.filter(p => p.type === 'menstruation').map(p => p.day);
+    console.log(`\n🩸 Дни менструации: ${menstruationDays.join(', ') || 'нет'}`);
+    
+    // Находим дни с овуляцией
+    const ovulationDays = phases.filter(p => p.type === 'ovulation').map(p => p.day);
+    console.log(`🥚 Дни овуляции: ${ovulationDays.join(', ') || 'нет'}`);
+    
+    // Находим дни с ПМС
+    const pmsDays = phases.filter(p => p.type === 'pms').map(p => p.day);
+    console.log(`💫 Дни ПМС: ${pmsDays.join(', ') || 'нет'}`);
+    
+    return phases;
+}
+
+    function getDefaultPhasesForMonth(daysInMonth) {
+        const phases = [];
+
+        for (let day = 1; day <= daysInMonth; day++) {
+            if (day <= 5) {
+                phases.push({ day: day, type: 'menstruation', color: 'rgba(255, 107, 107, 0.2)' });
+            } else if (day <= 13) {
+                phases.push({ day: day, type: 'follicular', color: 'rgba(96, 244, 227, 0.2)' });
+            } else if (day <= 15) {
+                phases.push({ day: day, type: 'ovulation', color: 'rgba(255, 112, 236, 0.2)' });
+            } else if (day <= 23) {
+                phases.push({ day: day, type: 'luteal', color: 'rgba(255, 209, 102, 0.2)' });
+            } else {
+                phases.push({ day: day, type: 'pms', color: 'rgba(184, 179, 233, 0.2)' });
+            }
+        }
+
+        return phases;
+    }
+
+    function getPhaseColor(phaseType, opacity = 0.2) {
+        const colors = {
+            'menstruation': `rgba(255, 107, 107, ${opacity})`,
+            'follicular': `rgba(96, 244, 227, ${opacity})`,
+            'ovulation': `rgba(255, 112, 236, ${opacity})`,
+            'luteal': `rgba(255, 209, 102, ${opacity})`,
+            'pms': `rgba(184, 179, 233, ${opacity})`
+        };
+        return colors[phaseType] || `rgba(200, 200, 200, ${opacity})`;
+    }
+
+    // ==========================================================================
+    // ФУНКЦИИ ДЛЯ ЛЕГЕНДЫ И ИНТЕРФЕЙСА
+    // ==========================================================================
+
+    function initSymptomsGrid() {
+        const symptomsGrid = document.getElementById('symptomsGrid');
+        if (!symptomsGrid) return;
+
+        const defaultSymptoms = [
+            'Головная боль', 'Спазмы', 'Усталость', 'Набухание груди',
+            'Перепады настроения', 'Тревожность', 'Вздутие', 'Акне',
+            'Тяга к сладкому', 'Бессонница', 'Тошнота', 'Боль в спине'
+        ];
+
+        symptomsGrid.innerHTML = defaultSymptoms.map(symptom => `
+            <label class="symptom-checkbox">
+                <input type="checkbox" name="symptoms" value="${symptom}">
+                ${symptom}
+            </label>
+        `).join('');
+    }
+
+    function updateSymptomsLegend() {
+        const legendContainer = document.getElementById('symptomsLegend');
+        if (!legendContainer) return;
+
+        const symptomStats = {};
+        cycleData.forEach(entry => {
+            if (entry.symptoms && Array.isArray(entry.symptoms)) {
+                entry.symptoms.forEach(symptom => {
+                    symptomStats[symptom] = (symptomStats[symptom] || 0) + 1;
+                });
+            }
+        });
+
+        const sortedSymptoms = Object.entries(symptomStats).sort((a, b) => b[1] - a[1]);
+
+        if (sortedSymptoms.length === 0) {
+            legendContainer.innerHTML = '<p style="text-align: center; color: var(--gray);">Симптомы еще не добавлены</p>';
+            return;
+        }
+
+        legendContainer.innerHTML = sortedSymptoms.map(([symptom, count]) => `
+            <div class="legend-item">
+                <div class="legend-color" style="background: ${getSymptomColor(symptom)}"></div>
+                <div class="legend-name">${symptom}</div>
+                <div class="legend-count">${count}</div>
+            </div>
+        `).join('');
+    }
+
+    function toggleLegend() {
+        const content = document.getElementById('symptomsLegend');
+        const toggleBtn = document.querySelector('.legend-toggle i');
+
+        if (!content || !toggleBtn) return;
+
+        content.classList.toggle('collapsed');
+
+        if (content.classList.contains('collapsed')) {
+            toggleBtn.classList.remove('fa-chevron-up');
+            toggleBtn.classList.add('fa-chevron-down');
+        } else {
+            toggleBtn.classList.remove('fa-chevron-down');
+            toggleBtn.classList.add('fa-chevron-up');
+        }
+    }
+
+    function updateStatsDisplay(stats) {
+        if (stats && stats.avg_mood) {
+            document.getElementById('avgMoodCycle').textContent = `${parseFloat(stats.avg_mood).toFixed(1)}/10`;
+        }
+        if (stats && stats.total_entries) {
+            document.getElementById('cycleLength').textContent = `${stats.total_entries} записей`;
+        }
+    }
+
+    function updatePredictionsDisplay(predictions) {
+        if (!predictions || predictions.error) return;
+
+        if (predictions.next_period) {
+            const nextPeriod = new Date(predictions.next_period);
+            const today = new Date();
+            const daysDiff = Math.ceil((nextPeriod - today) / (1000 * 60 * 60 * 24));
+            if (daysDiff > 0) {
+                document.getElementById('nextPeriod').textContent = `через ${daysDiff} дней`;
+            } else if (daysDiff === 0) {
+                document.getElementById('nextPeriod').textContent = 'сегодня';
+            } else {
+                document.getElementById('nextPeriod').textContent = `${Math.abs(daysDiff)} дней назад`;
+            }
+        }
+
+        if (predictions.current_cycle_day) {
+            document.getElementById('cycleLength').textContent = `${predictions.current_cycle_day} день`;
+        }
+    }
+
+    function updateTodayMoodDisplay(moodData) {
+        const moodDisplay = document.getElementById('todayMood');
+        const moodLoading = document.getElementById('moodLoading');
+
+        if (moodLoading) moodLoading.style.display = 'none';
+
+        if (moodData && moodData.mood !== undefined && moodData.mood !== null) {
+            const emoji = getMoodEmoji(moodData.mood);
+            moodDisplay.innerHTML = `
+                <div class="mood-value">${moodData.mood}/10</div>
+                <div class="mood-emoji">${emoji}</div>
+                <div class="mood-note">${moodData.note || 'Без заметки'}</div>
+            `;
+        } else {
+            moodDisplay.innerHTML = `
+                <div class="mood-value">-/-</div>
+                <div class="mood-emoji">😐</div>
+                <div class="mood-note">Настроение не отмечено</div>
+            `;
+        }
+    }
+
+    function updateMenstruationButton(flowIntensity) {
+        const menstruationBtn = document.querySelector('.btn-menstruation');
+        if (!menstruationBtn) return;
+
+        const hasMenstruation = flowIntensity && flowIntensity !== 'none' && flowIntensity !== '';
+
+        if (hasMenstruation) {
+            menstruationBtn.innerHTML = `<i class="fas fa-minus-circle"></i> Убрать менструацию`;
+            menstruationBtn.style.background = 'linear-gradient(135deg, #60F4E3, #48cbbd) !important';
+            menstruationBtn.onclick = markMenstruationStart;
+        } else {
+            menstruationBtn.innerHTML = `<i class="fas fa-plus-circle"></i> Отметить менструацию`;
+            menstruationBtn.style.background = 'linear-gradient(135deg, var(--menstruation), #FF8E8E) !important';
+            menstruationBtn.onclick = markMenstruationStart;
+        }
+    }
+
+    function updateChartTitle() {
+        const chartTitle = document.querySelector('.analytics-block .section-title');
+        if (chartTitle) {
+            const monthNames = [
+                'Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь',
+                'Июль', 'Август', 'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь'
+            ];
+            const month = monthNames[currentChartDate.getMonth()];
+            const year = currentChartDate.getFullYear();
+
+            chartTitle.innerHTML = `<i class="fas fa-chart-line"></i> Настроение за ${month} ${year}`;
+        }
+    }
+
+    function debugMonthSync() {
+        console.log('🔍 Синхронизация месяцев:');
+        console.log('- Календарь:', currentDate.toLocaleString('ru-RU', { month: 'long', year: 'numeric' }));
+        console.log('- График:', currentChartDate.toLocaleString('ru-RU', { month: 'long', year: 'numeric' }));
+
+        const monthData = getMoodOverTimeDataForCurrentMonth();
+        console.log('- Данные графика:', monthData);
+
+        return { calendarMonth: currentDate, chartMonth: currentChartDate, data: monthData };
+    }
+
+    // ==========================================================================
+    // ФУНКЦИИ ДЛЯ ЗАГРУЗКИ И УВЕДОМЛЕНИЙ
+    // ==========================================================================
+
+    function showLoading(isLoading) {
+        let overlay = document.getElementById('loading-overlay');
+
+        if (!overlay) {
+            overlay = document.createElement('div');
+            overlay.id = 'loading-overlay';
+            overlay.style.cssText = `
+                position: fixed;
+                top: 0;
+                left: 0;
+                width: 100%;
+                height: 100%;
+                background: rgba(255, 255, 255, 0.8);
+                display: flex;
+                justify-content: center;
+                align-items: center;
+                z-index: 9999;
+                opacity: 0;
+                transition: opacity 0.3s;
+                pointer-events: none;
+            `;
+
+            const spinner = document.createElement('div');
+            spinner.style.cssText = `
+                width: 60px;
+                height: 60px;
+                border: 4px solid var(--primary);
+                border-top-color: transparent;
+                border-radius: 50%;
+                animation: spin 1s linear infinite;
+            `;
+
+            overlay.appendChild(spinner);
+            document.body.appendChild(overlay);
+        }
+
+        if (isLoading) {
+            overlay.style.opacity = '1';
+            overlay.style.pointerEvents = 'auto';
+        } else {
+            overlay.style.opacity = '0';
+            setTimeout(() => {
+                overlay.style.pointerEvents = 'none';
+            }, 300);
+        }
+    }
+
+    function showToast(message, type = 'info') {
+        const oldToasts = document.querySelectorAll('.toast-notification');
+        oldToasts.forEach(toast => toast.remove());
+
+        const toast = document.createElement('div');
+        toast.className = `toast-notification toast-${type}`;
+        toast.innerHTML = `
+            <div class="toast-message">${message}</div>
+            <button class="toast-close" onclick="this.parentElement.remove()">×</button>
+        `;
+
+        toast.style.cssText = `
+            position: fixed;
+            top: 20px;
+            right: 20px;
+            background: ${type === 'error' ? '#F44336' : type === 'success' ? '#4CAF50' : '#2196F3'};
+            color: white;
+            padding: 15px 20px;
+            border-radius: 8px;
+            display: flex;
+            align-items: center;
+            justify-content: space-between;
+            gap: 15px;
+            min-width: 300px;
+            max-width: 400px;
+            z-index: 10000;
+            animation: slideIn 0.3s ease;
+        `;
+
+        document.body.appendChild(toast);
+
+        setTimeout(() => {
+            if (toast.parentElement) {
+                toast.style.animation = 'slideOut 0.3s ease';
+                setTimeout(() => toast.remove(), 300);
+            }
+        }, 5000);
+    }
+
+    // Добавляем стили для анимаций
+    const style = document.createElement('style');
+    style.textContent = `
+        @keyframes spin {
+            to { transform: rotate(360deg); }
+        }
+        
+        @keyframes slideIn {
+            from {
+                transform: translateX(100%);
+                opacity: 0;
+            }
+            to {
+                transform: translateX(0);
+                opacity: 1;
+            }
+        }
+        
+        @keyframes slideOut {
+            from {
+                transform: translateX(0);
+                opacity: 1;
+            }
+            to {
+                transform: translateX(100%);
+                opacity: 0;
+            }
+        }
+        
+        .toast-close {
+            background: none;
+            border: none;
+            color: white;
+            font-size: 20px;
+            cursor: pointer;
+            padding: 0;
+            width: 24px;
+            height: 24px;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+        }
+        
+        .toast-message {
+            flex-grow: 1;
+        }
+    `;
+    document.head.appendChild(style);
+
+    // ==========================================================================
+    // ИНИЦИАЛИЗАЦИЯ (В САМОМ КОНЦЕ)
+    // ==========================================================================
+    document.addEventListener('DOMContentLoaded', async function () {
+        console.log('🚀 Инициализация дневника цикла...');
+
+        const isAuth = await checkAuth();
+        if (!isAuth) return;
+
+        initSymptomsGrid();
+        await loadUserCycleSettings();
+        await loadInitialData();
+    });
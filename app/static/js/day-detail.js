@@ -0,0 +1,527 @@
+let currentDate = null;
+let currentMood = null;
+let hourlyMoods = {};
+let isSaving = false;
+let hourPromptOpen = false;
+let hourlyInitialized = false;
+let renderScheduled = false;
+const hourElements = {};
+
+// КЭШ
+const cache = {
+  moods: {},
+  hourly: {},
+  goals: {},
+  joys: {}
+};
+
+// Все изменения дня уходят одним запросом в /api/batch (одна транзакция);
+// возвращает результаты операций в том же порядке
+async function saveBatch(operations) {
+  const response = await fetch(BATCH_API, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ operations })
+  });
+  const data = await response.json();
+  if (!response.ok) {
+    const details = (data.errors || []).map(e => e.error).join('; ');
+    throw new Error(details || data.error || 'Ошибка сохранения');
+  }
+  return data.results;
+}
+
+// Нормализация даты (исправляет проблему с часовым поясом)
+function toLocalDateString(dateStr) {
+  if (!dateStr) return '';
+  const d = new Date(dateStr);
+  if (isNaN(d.getTime())) return dateStr.split('T')[0] || '';
+  return d.getFullYear() + '-' +
+    String(d.getMonth() + 1).padStart(2, '0') + '-' +
+    String(d.getDate()).padStart(2, '0');
+}
+
+function escapeHtml(str) {
+  if (!str) return '';
+  return str.replace(/[&<>]/g, m => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;' }[m]));
+}
+
+function showToast(message, type = 'success') {
+  document.querySelectorAll('.toast').forEach(t => t.remove());
+  const toast = document.createElement('div');
+  toast.className = `toast ${type === 'error' ? 'error' : ''}`;
+  toast.textContent = message;
+  document.body.appendChild(toast);
+  setTimeout(() => toast.classList.add('show'), 10);
+  setTimeout(() => { toast.classList.remove('show'); setTimeout(() => toast.remove(), 300); }, 3000);
+}
+
+function getDateFromUrl() {
+  const path = window.location.pathname;
+  const match = path.match(/\/calendar\/day\/(\d{4}-\d{1,2}-\d{1,2})/);
+  return match ? match[1] : null;
+}
+
+// ======================== НАСТРОЕНИЕ ДНЯ ========================
+async function loadDayData() {
+  const date = getDateFromUrl();
+  if (!date) { showError('Дата не найдена'); return; }
+  currentDate = date;
+  
+  const [year, month, day] = currentDate.split('-');
+  const dateObj = new Date(year, month - 1, day);
+  document.getElementById('dayTitle').textContent = dateObj.toLocaleDateString("ru-RU", {
+    weekday: 'long', year: 'numeric', month: 'long', day: 'numeric'
+  });
+  
+  try {
+    const response = await fetch(`${API_BASE}?date=${date}`);
+    if (response.ok) {
+      const dayMoods = await response.json();
+      if (dayMoods.length > 0) {
+        currentMood = dayMoods[0];
+        showMoodDisplay(currentMood);
+        // Показываем заметку о влиянии на настроение
+        if (currentMood.note) {
+          document.getElementById('moodInfluenceDisplay').innerHTML = `<i class="fas fa-comment"></i> ${escapeHtml(currentMood.note)}`;
+        } else {
+          document.getElementById('moodInfluenceDisplay').innerHTML = '';
+        }
+        document.getElementById('moodInfluenceNote').value = currentMood.note || '';
+      } else {
+        showNoMood();
+        document.getElementById('moodInfluenceDisplay').innerHTML = '';
+        document.getElementById('moodInfluenceNote').value = '';
+      }
+    } else throw new Error('Ошибка загрузки');
+  } catch (error) {
+    console.error(error);
+    showNoMood();
+  }
+  
+  initHourlyIfNeeded();
+  await Promise.all([updateHourlyMoods(), loadGoals(), loadJoys()]);
+}
+
+function showMoodDisplay(mood) {
+  document.getElementById('noMood').style.display = 'none';
+  document.getElementById('moodDisplayContent').style.display = 'block';
+  document.getElementById('moodValue').textContent = `${mood.mood}/10`;
+  document.getElementById('moodEmoji').textContent = getMoodEmoji(mood.mood);
+  document.getElementById('moodSlider').value = mood.mood;
+  updateMoodPreview();
+}
+
+function showNoMood() {
+  document.getElementById('noMood').style.display = 'block';
+  document.getElementById('moodDisplayContent').style.display = 'none';
+  document.getElementById('moodSlider').value = 5;
+  updateMoodPreview();
+}
+
+function getMoodEmoji(moodValue) {
+  if (moodValue >= 8) return '😊';
+  if (moodValue >= 5) return '😐';
+  if (moodValue >= 3) return '😕';
+  return '😞';
+}
+
+function getMoodColorClass(moodValue) {
+  if (moodValue >= 7) return 'mood-good';
+  if (moodValue >= 4) return 'mood-neutral';
+  return 'mood-bad';
+}
+
+function updateMoodPreview() {
+  const moodValue = document.getElementById('moodSlider').value;
+  document.getElementById('moodPreview').textContent = `${moodValue}/10 - ${getMoodEmoji(parseInt(moodValue))}`;
+}
+
+function debounce(fn, delay = 400) {
+  let t;
+  return (...args) => { clearTimeout(t); t = setTimeout(() => fn(...args), delay); };
+}
+
+const saveMoodDebounced = debounce(async function() {
+  if (isSaving) return;
+  isSaving = true;
+  const moodValue = parseInt(document.getElementById('moodSlider').value);
+  const note = document.getElementById('moodInfluenceNote').value.trim();
+
+  try {
+    const [result] = await saveBatch([
+      { resource: 'mood_entries', op: 'upsert', data: { date: currentDate, mood: moodValue, note: note } }
+    ]);
+    
+    currentMood = { ...currentMood, id: result.id, mood: moodValue, note: note, date: currentDate };
+    showMoodDisplay(currentMood);
+    if (note) {
+      document.getElementById('moodInfluenceDisplay').innerHTML = `<i class="fas fa-comment"></i> ${escapeHtml(note)}`;
+    } else {
+      document.getElementById('moodInfluenceDisplay').innerHTML = '';
+    }
+    showToast('Настроение сохранено!', 'success');
+  } catch (error) {
+    console.error(error);
+    showToast('Ошибка: ' + error.message, 'error');
+  } finally {
+    isSaving = false;
+  }
+});
+
+async function saveMood() { saveMoodDebounced(); }
+
+// Отдельное сохранение заметки о влиянии на настроение
+async function saveMoodInfluence() {
+  if (!currentMood) {
+    showToast("Сначала сохраните настроение", "error");
+    return;
+  }
+  const note = document.getElementById('moodInfluenceNote').value.trim();
+  try {
+    await saveBatch([{ resource: 'mood_entries', op: 'update', data: { id: currentMood.id, note: note } }]);
+    currentMood.note = note;
+    if (note) {
+      document.getElementById('moodInfluenceDisplay').innerHTML = `<i class="fas fa-comment"></i> ${escapeHtml(note)}`;
+    } else {
+      document.getElementById('moodInfluenceDisplay').innerHTML = '';
+    }
+    showToast("Заметка сохранена!", "success");
+  } catch (error) {
+    console.error(error);
+    showToast("Ошибка сохранения", "error");
+  }
+}
+
+async function deleteMood() {
+  if (!currentMood || !confirm('Удалить запись о настроении?')) return;
+  try {
+    await saveBatch([{ resource: 'mood_entries', op: 'delete', data: { id: currentMood.id } }]);
+    currentMood = null;
+    showNoMood();
+    document.getElementById('moodInfluenceDisplay').innerHTML = '';
+    document.getElementById('moodInfluenceNote').value = '';
+    showToast('Настроение удалено', 'success');
+  } catch (error) {
+    console.error(error);
+    showToast('Ошибка удаления', 'error');
+  }
+}
+
+// ======================== РАДОСТИ ========================
+async function loadJoys() {
+  try {
+    const res = await fetch(`${JOYS_API}?date=${currentDate}`);
+    const data = await res.json();
+    const filtered = data.filter(j => {
+      if (!j.date) return false;
+      const localDate = toLocalDateString(j.date);
+      return localDate === currentDate;
+    }).sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+    
+    cache.joys[currentDate] = filtered;
+    renderJoyList();
+  } catch (e) {
+    console.error(e);
+    showToast("Ошибка загрузки радостей", "error");
+  }
+}
+
+function renderJoyList() {
+  const container = document.getElementById("joyList");
+  const joys = cache.joys[currentDate] || [];
+  
+  if (joys.length === 0) {
+    container.innerHTML = '<div class="empty-positive"><i class="fas fa-heart"></i><p>Пока нет радостей</p><small>Добавьте что-то, что вас порадовало сегодня</small></div>';
+    return;
+  }
+  
+  container.innerHTML = joys.map(joy => `
+    <div class="positive-item" id="joy-${joy.id}">
+      <div class="positive-item-content">🌟 ${escapeHtml(joy.text)}</div>
+      <div class="positive-item-actions">
+        <button class="positive-item-btn edit-btn" onclick="editJoy(${joy.id})"><i class="fas fa-pencil-alt"></i></button>
+        <button class="positive-item-btn delete-btn" onclick="deleteJoy(${joy.id})"><i class="fas fa-trash"></i></button>
+      </div>
+    </div>
+  `).join('');
+}
+
+async function addJoy() {
+  const text = document.getElementById("joyInput").value.trim();
+  if (!text) return showToast("Введите радость", "error");
+  try {
+    const [result] = await saveBatch([{ resource: 'joys', op: 'create', data: { text, date: currentDate } }]);
+    const newJoy = { id: result.id, text, date: currentDate, created_at: new Date().toISOString() };
+    document.getElementById("joyInput").value = "";
+    if (!cache.joys[currentDate]) cache.joys[currentDate] = [];
+    cache.joys[currentDate].unshift(newJoy);
+    renderJoyList();
+    showToast("Радость добавлена! 🌟", "success");
+  } catch (e) {
+    console.error(e);
+    showToast("Ошибка добавления", "error");
+  }
+}
+
+async function editJoy(joyId) {
+  const joy = cache.joys[currentDate]?.find(j => j.id === joyId);
+  if (!joy) return;
+  const newText = prompt("Редактировать радость:", joy.text);
+  if (!newText || newText === joy.text) return;
+  
+  try {
+    await saveBatch([{ resource: 'joys', op: 'update', data: { id: joyId, text: newText } }]);
+    joy.text = newText;
+    renderJoyList();
+    showToast("Радость обновлена", "success");
+  } catch (e) {
+    console.error(e);
+    showToast("Ошибка обновления", "error");
+  }
+}
+
+async function deleteJoy(joyId) {
+  if (!confirm('Удалить эту радость?')) return;
+  try {
+    await saveBatch([{ resource: 'joys', op: 'delete', data: { id: joyId } }]);
+    if (cache.joys[currentDate]) {
+      cache.joys[currentDate] = cache.joys[currentDate].filter(j => j.id !== joyId);
+    }
+    renderJoyList();
+    showToast("Запись удалена", "success");
+  } catch (e) {
+    console.error(e);
+    showToast("Ошибка удаления", "error");
+  }
+}
+
+// ======================== ЦЕЛИ ========================
+async function loadGoals() {
+  try {
+    const res = await fetch(`${GOALS_API}?date=${currentDate}`);
+    const data = await res.json();
+    const filtered = data.filter(g => {
+      if (!g.date) return false;
+      const localDate = toLocalDateString(g.date);
+      return localDate === currentDate;
+    }).sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+    
+    cache.goals[currentDate] = filtered;
+    renderGoalList();
+  } catch (e) {
+    console.error(e);
+    showToast("Ошибка загрузки целей", "error");
+  }
+}
+
+function renderGoalList() {
+  const container = document.getElementById("goalList");
+  const goals = cache.goals[currentDate] || [];
+  
+  if (goals.length === 0) {
+    container.innerHTML = '<div class="empty-positive"><i class="fas fa-bullseye"></i><p>Пока нет целей</p><small>Добавьте цель на сегодня</small></div>';
+    return;
+  }
+  
+  container.innerHTML = goals.map(goal => `
+    <div class="positive-item" id="goal-${goal.id}">
+      <div class="positive-item-content">
+        <label style="display:flex; align-items:center; gap:12px; cursor:pointer;">
+          <input type="checkbox" ${goal.completed ? "checked" : ""} onchange="toggleGoalStatus(${goal.id}, this.checked)" style="width:18px; height:18px; cursor:pointer;">
+          <span style="${goal.completed ? 'text-decoration: line-through; color: var(--gray);' : ''}">${escapeHtml(goal.text)}</span>
+        </label>
+      </div>
+      <div class="positive-item-actions">
+        <button class="positive-item-btn edit-btn" onclick="editGoal(${goal.id})"><i class="fas fa-pencil-alt"></i></button>
+        <button class="positive-item-btn delete-btn" onclick="deleteGoal(${goal.id})"><i class="fas fa-trash"></i></button>
+      </div>
+    </div>
+  `).join('');
+}
+
+async function addGoal() {
+  const text = document.getElementById("goalInput").value.trim();
+  if (!text) return showToast("Введите цель", "error");
+  try {
+    const [result] = await saveBatch([{ resource: 'goals', op: 'create', data: { text, date: currentDate } }]);
+    const newGoal = { id: result.id, text, completed: false, date: currentDate, created_at: new Date().toISOString() };
+    document.getElementById("goalInput").value = "";
+    if (!cache.goals[currentDate]) cache.goals[currentDate] = [];
+    cache.goals[currentDate].unshift(newGoal);
+    renderGoalList();
+    showToast("Цель добавлена!", "success");
+  } catch (e) {
+    console.error(e);
+    showToast("Ошибка добавления", "error");
+  }
+}
+
+async function editGoal(goalId) {
+  const goal = cache.goals[currentDate]?.find(g => g.id === goalId);
+  if (!goal) return;
+  const newText = prompt("Редактировать цель:", goal.text);
+  if (!newText || newText === goal.text) return;
+  
+  try {
+    await saveBatch([{ resource: 'goals', op: 'update', data: { id: goalId, text: newText } }]);
+    goal.text = newText;
+    renderGoalList();
+    showToast("Цель обновлена", "success");
+  } catch (e) {
+    console.error(e);
+    showToast("Ошибка обновления", "error");
+  }
+}
+
+async function deleteGoal(goalId) {
+  if (!confirm('Удалить эту цель?')) return;
+  try {
+    await saveBatch([{ resource: 'goals', op: 'delete', data: { id: goalId } }]);
+    if (cache.goals[currentDate]) {
+      cache.goals[currentDate] = cache.goals[currentDate].filter(g => g.id !== goalId);
+    }
+    renderGoalList();
+    showToast("Цель удалена", "success");
+  } catch (e) {
+    console.error(e);
+    showToast("Ошибка удаления", "error");
+  }
+}
+
+async function toggleGoalStatus(goalId, isDone) {
+  try {
+    await saveBatch([{ resource: 'goals', op: 'update', data: { id: goalId, completed: isDone } }]);
+    
+    if (cache.goals[currentDate]) {
+      const goal = cache.goals[currentDate].find(g => g.id === goalId);
+      if (goal) goal.completed = isDone;
+    }
+    renderGoalList();
+    showToast(isDone ? "Цель выполнена! 🎉" : "Цель отмечена как невыполненная", "success");
+  } catch (e) {
+    console.error(e);
+    showToast("Ошибка при обновлении цели", "error");
+  }
+}
+
+// ======================== ПОЧАСОВОЕ НАСТРОЕНИЕ ========================
+function scheduleRender() {
+  if (renderScheduled) return;
+  renderScheduled = true;
+  requestAnimationFrame(() => {
+    renderHourlyMoods();
+    renderScheduled = false;
+  });
+}
+
+function renderHourlyMoods() {
+  for (let hour = 0; hour < 24; hour++) {
+    const el = hourElements[hour];
+    if (!el) continue;
+    const data = hourlyMoods[hour];
+    if (data) {
+      el.mood.textContent = getMoodEmoji(data.mood);
+      el.note.textContent = data.note || '';
+      el.container.className = 'hour-item ' + getMoodColorClass(data.mood);
+    } else {
+      el.mood.textContent = '-';
+      el.note.textContent = '';
+      el.container.className = 'hour-item';
+    }
+  }
+}
+
+async function updateHourlyMoods() {
+  if (cache.hourly[currentDate]) {
+    hourlyMoods = cache.hourly[currentDate];
+    scheduleRender();
+    return;
+  }
+
+  try {
+    const res = await fetch(`${HOURLY_MOODS_API}?date=${currentDate}`);
+    const data = await res.json();
+    hourlyMoods = {};
+    data.forEach(e => { 
+      const localDate = toLocalDateString(e.date);
+      if (localDate === currentDate) {
+        hourlyMoods[e.hour] = e;
+      }
+    });
+    cache.hourly[currentDate] = hourlyMoods;
+    scheduleRender();
+  } catch (e) {
+    showToast("Ошибка загрузки почасовых данных", "error");
+  }
+}
+
+function initHourlyIfNeeded() {
+  if (hourlyInitialized) return;
+  const hoursGrid = document.getElementById('hoursGrid');
+  if (!hoursGrid) return;
+  
+  let html = '';
+  for (let hour = 0; hour < 24; hour++) {
+    const hourDisplay = hour.toString().padStart(2, '0');
+    html += `<div class="hour-item" data-hour="${hour}" onclick="selectHour(${hour})">
+               <div class="hour-time">${hourDisplay}:00</div>
+               <div class="hour-mood" id="hourMood${hour}">-</div>
+               <div class="time-note" id="hourNote${hour}"></div>
+             </div>`;
+  }
+  hoursGrid.innerHTML = html;
+  
+  for (let hour = 0; hour < 24; hour++) {
+    hourElements[hour] = {
+      container: document.querySelector(`[data-hour="${hour}"]`),
+      mood: document.getElementById(`hourMood${hour}`),
+      note: document.getElementById(`hourNote${hour}`)
+    };
+  }
+  hourlyInitialized = true;
+}
+
+async function selectHour(hour) {
+  if (hourPromptOpen) return;
+  hourPromptOpen = true;
+  
+  const moodInput = prompt(`Введите настроение для ${hour.toString().padStart(2, '0')}:00 (1-10):`);
+  if (moodInput) {
+    const mood = parseInt(moodInput);
+    if (!Number.isInteger(mood) || mood < 1 || mood > 10) {
+      showToast("Введите число от 1 до 10", "error");
+      hourPromptOpen = false;
+      return;
+    }
+    const note = prompt('Добавьте заметку (необязательно):') || '';
+    try {
+      await saveBatch([
+        { resource: 'hourly_moods', op: 'upsert', data: { date: currentDate, hour: hour, mood: mood, note: note } }
+      ]);
+      delete cache.hourly[currentDate];
+      await updateHourlyMoods();
+      showToast(`Настроение для ${hour.toString().padStart(2, '0')}:00 сохранено!`);
+    } catch (error) {
+      console.error(error);
+      showToast('Ошибка сохранения настроения', 'error');
+    }
+  }
+  hourPromptOpen = false;
+}
+
+// ======================== ОБЩИЕ ФУНКЦИИ ========================
+function goBack() { window.location.href = CALENDAR_URL; }
+function showError(message) {
+  document.getElementById('dayTitle').textContent = 'Ошибка';
+}
+
+// ======================== ИНИЦИАЛИЗАЦИЯ ========================
+document.addEventListener('DOMContentLoaded', async function() {
+  initHourlyIfNeeded();
+  await Promise.all([
+    loadDayData(),
+    loadGoals(),
+    loadJoys()
+  ]);
+});
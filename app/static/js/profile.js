@@ -0,0 +1,207 @@
+// Обработка загрузки аватара
+document.getElementById('avatarUpload').addEventListener('change', async function(e) {
+    const file = e.target.files[0];
+    if (file) {
+        if (file.size > 5 * 1024 * 1024) {
+            showToast('Файл слишком большой (макс. 5MB)', 'error');
+            return;
+        }
+        
+        const formData = new FormData();
+        formData.append('avatar', file);
+        
+        try {
+            const response = await fetch('/api/upload_avatar', {
+                method: 'POST',
+                body: formData
+            });
+            
+            const result = await response.json();
+            
+            if (response.ok) {
+                // Уменьшенные копии готовятся на сервере в фоне — до перезагрузки показываем выбранный файл
+                const preview = document.getElementById('avatarPreview');
+                const source = preview.parentElement.querySelector('source');
+                if (source) source.remove();
+                preview.src = URL.createObjectURL(file);
+                updateAvatarDeleteButton(true);
+                showToast('Аватар успешно обновлен!', 'success');
+            } else {
+                showToast(result.error || 'Ошибка загрузки аватара', 'error');
+            }
+        } catch (error) {
+            console.error('Ошибка загрузки аватара:', error);
+            showToast('Ошибка загрузки аватара', 'error');
+        }
+    }
+});
+
+// Функция удаления аватара
+async function deleteAvatar() {
+    if (!confirm('Вы уверены, что хотите удалить аватар?')) {
+        return;
+    }
+    
+    try {
+        const response = await fetch('/api/delete_avatar', {
+            method: 'DELETE'
+        });
+        
+        const result = await response.json();
+        
+        if (response.ok) {
+            const defaultAvatar = DEFAULT_AVATAR_URL;
+            document.getElementById('avatarPreview').src = defaultAvatar;
+            updateAvatarDeleteButton(false);
+            showToast('Аватар успешно удален!', 'success');
+            setTimeout(() => {
+                window.location.reload();
+            }, 1000);
+        } else {
+            showToast(result.error || 'Ошибка удаления аватара', 'error');
+        }
+    } catch (error) {
+        console.error('Ошибка удаления аватара:', error);
+        showToast('Ошибка удаления аватара', 'error');
+    }
+}
+
+// Обновление кнопки удаления аватара
+function updateAvatarDeleteButton(show) {
+    const deleteBtn = document.querySelector('.avatar-btn.delete');
+    if (show) {
+        if (!deleteBtn) {
+            const avatarActions = document.querySelector('.avatar-actions');
+            const deleteButton = document.createElement('button');
+            deleteButton.className = 'avatar-btn delete';
+            deleteButton.innerHTML = '<i class="fas fa-trash"></i>';
+            deleteButton.onclick = deleteAvatar;
+            deleteButton.title = 'Удалить аватар';
+            avatarActions.appendChild(deleteButton);
+        }
+    } else {
+        if (deleteBtn) {
+            deleteBtn.remove();
+        }
+    }
+}
+
+// Сохранение профиля
+document.getElementById('saveBtn').addEventListener('click', async function() {
+    const data = {
+        first_name: document.getElementById('first_name').value,
+        last_name: document.getElementById('last_name').value,
+        gender: document.getElementById('gender').value 
+    };
+    
+    try {
+        const response = await fetch('/api/profile', {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(data)
+        });
+        
+        const result = await response.json();
+        
+        if (response.ok) {
+            showToast('Профиль успешно обновлен!', 'success');
+            document.getElementById('username').textContent = data.first_name || 'Пользователь';
+        } else {
+            showToast(result.error || 'Ошибка обновления профиля', 'error');
+        }
+    } catch (error) {
+        console.error('Ошибка:', error);
+        showToast('Ошибка сохранения профиля', 'error');
+    }
+});
+
+// Отмена изменений
+document.getElementById('cancelBtn').addEventListener('click', function() {
+    document.getElementById('profileForm').reset();
+    showToast('Изменения отменены', 'info');
+});
+
+// Загрузка статистики
+async function loadStats() {
+    try {
+        const response = await fetch('/api/stats');
+        if (response.ok) {
+            const stats = await response.json();
+            document.getElementById('totalEntries').textContent = stats.total_entries || 0;
+            document.getElementById('avgMood').textContent = stats.avg_mood || '0.0';
+            document.getElementById('goodDays').textContent = stats.good_days || 0;
+            document.getElementById('streak').textContent = stats.current_streak || 0;
+        }
+    } catch (error) {
+        console.error('Ошибка загрузки статистики:', error);
+    }
+}
+
+// Функции для модального окна смены пароля
+function openPasswordModal() {
+    document.getElementById('passwordModal').style.display = 'flex';
+    document.getElementById('passwordForm').reset();
+}
+
+function closePasswordModal() {
+    document.getElementById('passwordModal').style.display = 'none';
+}
+
+async function changePassword() {
+    const data = {
+        current_password: document.getElementById('current_password').value,
+        new_password: document.getElementById('new_password').value,
+        confirm_password: document.getElementById('confirm_password').value
+    };
+    
+    try {
+        const response = await fetch('/api/change_password', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(data)
+        });
+        
+        const result = await response.json();
+        
+        if (response.ok) {
+            showToast('Пароль успешно изменен!', 'success');
+            closePasswordModal();
+        } else {
+            showToast(result.error || 'Ошибка смены пароля', 'error');
+        }
+    } catch (error) {
+        console.error('Ошибка:', error);
+        showToast('Ошибка смены пароля', 'error');
+    }
+}
+
+// Утилиты
+function showToast(message, type) {
+    const toast = document.getElementById('toast');
+    toast.textContent = message;
+    toast.className = `toast ${type} show`;
+    
+    setTimeout(() => {
+        toast.classList.remove('show');
+    }, 3000);
+}
+
+function deleteAccount() {
+    if (confirm('Вы уверены, что хотите удалить аккаунт? Это действие нельзя отменить.')) {
+        showToast('Функция удаления аккаунта в разработке', 'info');
+    }
+}
+
+// Загружаем статистику при загрузке страницы
+document.addEventListener('DOMContentLoaded', loadStats);
+
+// Закрытие модального окна при клике вне его
+document.getElementById('passwordModal').addEventListener('click', function(e) {
+    if (e.target === this) {
+        closePasswordModal();
+    }
+});
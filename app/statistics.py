@@ -0,0 +1,333 @@
+import re
+
+# Ключевые слова для анализа заметок
+POSITIVE_KEYWORDS = ['рад', 'счастлив', 'хорошо', 'отлично', 'прекрасно', 'ура', 'успех', 'люблю', 'доволен', 'восторг']
+NEGATIVE_KEYWORDS = ['стресс', 'устал', 'плохо', 'грустно', 'тревог', 'злой', 'раздраж', 'беспокоит', 'уныло', 'тоска']
+NEUTRAL_KEYWORDS = ['норм', 'обычно', 'стабильно', 'так себе', 'ничего', 'окей']
+
+# Флаги mood_entries.note_sentiment; NULL — заметки нет или она короче
+# NOTE_MIN_BYTES (как LENGTH(note) > 5 в MySQL: длина в байтах)
+SENTIMENT_POSITIVE = 1
+SENTIMENT_NEGATIVE = 2
+SENTIMENT_NEUTRAL = 4
+NOTE_MIN_BYTES = 6
+_SENTIMENT_PATTERNS = [
+    (flag, re.compile('|'.join(re.escape(keyword) for keyword in keywords)))
+    for flag, keywords in ((SENTIMENT_POSITIVE, POSITIVE_KEYWORDS),
+                           (SENTIMENT_NEGATIVE, NEGATIVE_KEYWORDS),
+                           (SENTIMENT_NEUTRAL, NEUTRAL_KEYWORDS))
+]
+
+DAY_NAMES_RUSSIAN = {
+    1: 'воскресенье', 2: 'понедельник', 3: 'вторник',
+    4: 'среда', 5: 'четверг', 6: 'пятница', 7: 'суббота'
+}
+
+# Все агрегаты одним запросом. Строки различаются по kind, колонки c1..c9
+# заполняются в зависимости от вида строки. Результат ограничен ~40 строками.
+AGGREGATES_SQL = """
+    SELECT 'mood' AS kind, NULL AS k,
+        COUNT(*) AS c1,
+        AVG(mood) AS c2,
+        MIN(mood) AS c3,
+        MAX(mood) AS c4,
+        COUNT(CASE WHEN mood >= 7 THEN 1 END) AS c5,
+        COUNT(CASE WHEN mood <= 4 THEN 1 END) AS c6,
+        AVG(CASE WHEN date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY) THEN mood END) AS c7,
+        AVG(CASE WHEN date >= DATE_SUB(CURDATE(), INTERVAL 14 DAY)
+                 AND date < DATE_SUB(CURDATE(), INTERVAL 7 DAY) THEN mood END) AS c8,
+        COUNT(CASE WHEN date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY) THEN 1 END) AS c9
+    FROM mood_entries
+    WHERE user_id = %(user_id)s AND date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+    UNION ALL
+    SELECT 'dow', weekday, entries, mood_sum / entries, NULL, NULL, NULL, NULL, NULL, NULL, NULL
+    FROM mood_rollup_weekdays
+    WHERE user_id = %(user_id)s AND entries > 0
+    UNION ALL
+    SELECT 'hour', hour, COUNT(*), AVG(mood), NULL, NULL, NULL, NULL, NULL, NULL, NULL
+    FROM hourly_moods
+    WHERE user_id = %(user_id)s
+    GROUP BY hour
+    UNION ALL
+    SELECT 'cycle', NULL, COUNT(*), AVG(mood),
+        COUNT(CASE WHEN flow_intensity IN ('light', 'medium', 'heavy') THEN 1 END),
+        NULL, NULL, NULL, NULL, NULL, NULL
+    FROM cycle_entries
+    WHERE user_id = %(user_id)s
+    UNION ALL
+    SELECT 'joys', NULL, COUNT(*), NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL
+    FROM joys
+    WHERE user_id = %(user_id)s
+    UNION ALL
+    SELECT 'notes', NULL, COUNT(*),
+        SUM(note_sentiment & 1 > 0),
+        SUM(note_sentiment & 2 > 0),
+        SUM(note_sentiment & 4 > 0),
+        SUM(date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY) AND note_sentiment & 1 > 0),
+        SUM(date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY) AND note_sentiment & 2 > 0),
+        NULL, NULL, NULL
+    FROM (SELECT date, note_sentiment
+          FROM mood_entries
+          WHERE user_id = %(user_id)s AND note_sentiment IS NOT NULL
+          ORDER BY date DESC
+          LIMIT 100) AS recent_notes
+    UNION ALL
+    SELECT CONCAT('gender:', IFNULL(gender, '')), NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL
+    FROM users
+    WHERE id = %(user_id)s
+"""
+
+# Последние заметки (только для примеров в промпте) и радости одним запросом
+RECENT_ROWS_SQL = """
+    (SELECT 'note' AS kind, note AS text, mood, date AS at
+     FROM mood_entries
+     WHERE user_id = %(user_id)s
+     AND note IS NOT NULL
+     AND note != ''
+     AND LENGTH(note) > 5
+     ORDER BY date DESC
+     LIMIT 5)
+    UNION ALL
+    (SELECT 'joy', text, NULL, created_at
+     FROM joys
+     WHERE user_id = %(user_id)s
+     ORDER BY created_at DESC
+     LIMIT 5)
+"""
+
+
+def note_sentiment(note):
+    """Флаги тональности заметки (SENTIMENT_*) или None для пустой/короткой заметки.
+
+    Считается один раз при сохранении записи; статистика только суммирует флаги.
+    """
+    if not note or len(note.encode('utf-8')) < NOTE_MIN_BYTES:
+        return None
+    text = note.lower()
+    flags = 0
+    for flag, pattern in _SENTIMENT_PATTERNS:
+        if pattern.search(text):
+            flags |= flag
+    return flags
+
+
+def backfill_note_sentiment(cursor, recompute=False, batch_size=500):
+    """Заполняет note_sentiment для записей, сохранённых без флагов.
+
+    recompute=True пересчитывает все заметки (после изменения списков
+    ключевых слов). Возвращает число обработанных строк.
+    """
+    query = "SELECT id, note FROM mood_entries WHERE id > %s AND LENGTH(note) >= %s"
+    if not recompute:
+        query += " AND note_sentiment IS NULL"
+    query += " ORDER BY id LIMIT %s"
+    last_id = 0
+    total = 0
+    while True:
+        cursor.execute(query, (last_id, NOTE_MIN_BYTES, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return total
+        cursor.executemany(
+            "UPDATE mood_entries SET note_sentiment = %s WHERE id = %s",
+            [(note_sentiment(note), entry_id) for entry_id, note in rows]
+        )
+        last_id = rows[-1][0]
+        total += len(rows)
+
+
+def generate_user_statistics(conn, user_id):
+    """Генерация статистики пользователя для AI-анализа.
+
+    Два запроса к БД вместо девяти: агрегаты и последние записи, дальше
+    все показатели считаются за один проход по строкам.
+    """
+    params = {'user_id': user_id}
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(AGGREGATES_SQL, params)
+        aggregate_rows = cursor.fetchall()
+        cursor.execute(RECENT_ROWS_SQL, params)
+        recent_rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    mood_row = {}
+    hours_data = []
+    days_data = []
+    cycle_row = {}
+    notes_row = {}
+    joys_count = 0
+    gender = None
+
+    for row in aggregate_rows:
+        kind = row['kind']
+        if kind == 'mood':
+            mood_row = row
+        elif kind == 'dow':
+            if row['c1'] >= 3:
+                days_data.append({'day_of_week': int(row['k']), 'count': int(row['c1']), 'avg_mood': row['c2']})
+        elif kind == 'hour':
+            if row['c1'] >= 2:
+                hours_data.append({'hour': int(row['k']), 'avg_mood': row['c2'], 'entries': int(row['c1'])})
+        elif kind == 'cycle':
+            cycle_row = row
+        elif kind == 'notes':
+            notes_row = row
+        elif kind == 'joys':
+            joys_count = int(row['c1'] or 0)
+        elif kind.startswith('gender:'):
+            gender = kind[len('gender:'):] or None
+
+    # 1. Среднее настроение за 30 дней
+    total_entries = int(mood_row.get('c1') or 0)
+    avg_mood_30 = mood_row.get('c2')
+
+    # 2. Тренд настроения (последние 7 дней vs предыдущие 7 дней)
+    avg_recent = mood_row.get('c7')
+    avg_previous = mood_row.get('c8')
+    recent_count = int(mood_row.get('c9') or 0)
+    trend = "stable"
+    trend_value = 0
+    if avg_recent and avg_previous and recent_count >= 3:
+        diff = float(avg_recent) - float(avg_previous)
+        trend_value = diff
+        if diff > 0.5:
+            trend = "improving"
+        elif diff < -0.5:
+            trend = "declining"
+
+    # 3. Лучшее и худшее время дня
+    worst_hour = None
+    best_hour = None
+    hourly_analysis = ""
+    if hours_data:
+        hours_data.sort(key=lambda x: x['hour'])
+        worst_hour = min(hours_data, key=lambda x: x['avg_mood'])
+        best_hour = max(hours_data, key=lambda x: x['avg_mood'])
+        low_hours = [h for h in hours_data if h['avg_mood'] < 5]
+        high_hours = [h for h in hours_data if h['avg_mood'] > 7]
+        if low_hours:
+            hourly_analysis += f"Низкое настроение часто в {', '.join(str(h['hour']) for h in low_hours)}:00. "
+        if high_hours:
+            hourly_analysis += f"Высокое настроение обычно в {', '.join(str(h['hour']) for h in high_hours)}:00."
+
+    # 4. Тональность заметок — флаги посчитаны при сохранении, здесь только суммы
+    keyword_counts = {
+        'positive': int(notes_row.get('c2') or 0),
+        'negative': int(notes_row.get('c3') or 0),
+        'neutral': int(notes_row.get('c4') or 0),
+    }
+    recent_positive = int(notes_row.get('c5') or 0)
+    recent_negative = int(notes_row.get('c6') or 0)
+    notes_sample = []
+    recent_joys = []
+    for row in recent_rows:
+        if row['kind'] == 'joy':
+            recent_joys.append(row['text'])
+        else:
+            notes_sample.append((row['text'] or '').lower())
+
+    # 5. Дни недели
+    worst_day = None
+    best_day = None
+    if days_data:
+        days_data.sort(key=lambda x: x['avg_mood'])
+        worst_day_data = days_data[0]
+        best_day_data = max(days_data, key=lambda x: x['avg_mood'])
+        worst_day = {
+            'name': DAY_NAMES_RUSSIAN.get(worst_day_data['day_of_week'], ''),
+            'avg_mood': float(worst_day_data['avg_mood']),
+            'count': worst_day_data['count']
+        }
+        best_day = {
+            'name': DAY_NAMES_RUSSIAN.get(best_day_data['day_of_week'], ''),
+            'avg_mood': float(best_day_data['avg_mood']),
+            'count': best_day_data['count']
+        }
+
+    # 6. Циклы
+    cycle_count = int(cycle_row.get('c1') or 0)
+    avg_mood_cycle = cycle_row.get('c2')
+    period_days = int(cycle_row.get('c3') or 0)
+    cycle_analysis = ""
+    if gender == 'female' and cycle_count >= 5:
+        cycle_analysis = f"У вас {cycle_count} записей в дневнике цикла. "
+        if avg_mood_cycle:
+            cycle_analysis += f"Среднее настроение в дни цикла: {float(avg_mood_cycle):.1f}/10."
+
+    stats = {
+        # Основные показатели
+        "avg_mood": round(float(avg_mood_30), 1) if avg_mood_30 else 0.0,
+        "min_mood": float(mood_row.get('c3') or 0),
+        "max_mood": float(mood_row.get('c4') or 0),
+        "total_entries": total_entries,
+        "good_days": int(mood_row.get('c5') or 0),
+        "bad_days": int(mood_row.get('c6') or 0),
+
+        # Тренды
+        "trend": trend,
+        "trend_value": trend_value,
+        "avg_recent": float(avg_recent or 0),
+        "avg_previous": float(avg_previous or 0),
+
+        # Временной анализ
+        "worst_hour": worst_hour,
+        "best_hour": best_hour,
+        "hourly_analysis": hourly_analysis,
+
+        # Анализ заметок
+        "keyword_counts": keyword_counts,
+        "recent_positive": recent_positive,
+        "recent_negative": recent_negative,
+        "notes_sample": notes_sample,
+
+        # Дни недели
+        "worst_day": worst_day,
+        "best_day": best_day,
+
+        # Циклы
+        "cycle_analysis": cycle_analysis,
+
+        # Радости
+        "joys_count": joys_count,
+        "recent_joys": recent_joys,
+
+        # Статистика цикла (общая)
+        "cycle_entries": cycle_count,
+        "period_days": period_days,
+        "avg_mood_cycle": float(avg_mood_cycle) if avg_mood_cycle else 0,
+
+        # Общая оценка
+        "mood_score": 0
+    }
+
+    # Вычисляем общий балл настроения (0-100)
+    mood_score = 0
+
+    # Балл за среднее настроение (50%)
+    if stats['avg_mood'] > 0:
+        mood_score += min(50, stats['avg_mood'] * 5)
+
+    # Балл за тренд (20%)
+    if trend == "improving":
+        mood_score += 20
+    elif trend == "declining":
+        mood_score += 5
+    else:
+        mood_score += 10
+
+    # Балл за соотношение хороших/плохих дней (20%)
+    if stats['total_entries'] > 0:
+        good_ratio = stats['good_days'] / stats['total_entries']
+        mood_score += min(20, good_ratio * 20)
+
+    # Балл за заметки (10%)
+    if keyword_counts['positive'] > keyword_counts['negative']:
+        mood_score += 10
+    elif keyword_counts['positive'] == keyword_counts['negative']:
+        mood_score += 5
+
+    stats['mood_score'] = min(100, max(0, int(mood_score)))
+
+    return stats